@@ -1,12 +1,21 @@
 import streamlit as st
-import yfinance as yf
-import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+import pandas as pd
+from datetime import datetime
+import functools
 import time
-import pytz
-import threading
-import concurrent.futures
+
+from refresh_queue import REFRESH_TICK_SECONDS, REQUEST_BUDGET_PER_MINUTE, RefreshQueue, estimate_requests
+from scan_cache import SharedScanCache
+from scan_engine import (
+    DEFAULT_BATCH_SIZE, DEFAULT_MAX_WORKERS, ET, EXTENDED_UNIVERSE, FETCH_MODES, LiveRanking, ScanEngine, ScanResults,
+    get_market_session, rank_results
+)
+from scan_history import ScanHistory
+from scan_metrics import METRICS_HOST, METRICS_PORT, PHASES, start_metrics_server
+from scan_scheduler import ScanScheduler
+from scan_shards import SHARD_QUEUE_DIR, ShardedScanner
+from universe import UniverseStore, read_universe, universe_kind
 
 # Configure page for 24/7 operation
 st.set_page_config(
@@ -340,42 +349,17 @@ if 'auto_scan_active' not in st.session_state:
     st.session_state.auto_scan_active = False
 if 'last_scan_time' not in st.session_state:
     st.session_state.last_scan_time = None
-if 'scan_results' not in st.session_state:
-    st.session_state.scan_results = []
+if 'scan_record' not in st.session_state:
+    # A reference into the shared scan history, not a copy of the rows
+    st.session_state.scan_record = None
 if 'scan_count' not in st.session_state:
     st.session_state.scan_count = 0
+if 'snapshot_version' not in st.session_state:
+    st.session_state.snapshot_version = 0
 
-# Set timezone
-ET = pytz.timezone('US/Eastern')
+# Current ET time for the session banners
 current_et = datetime.now(ET)
 
-def get_market_session():
-    """Determine current market session with full 24/7 coverage"""
-    now = datetime.now(ET)
-    hour = now.hour
-    minute = now.minute
-    weekday = now.weekday()  # 0=Monday, 6=Sunday
-    
-    # Weekend handling
-    if weekday == 5 and hour >= 18:  # Saturday after 6 PM
-        return "WEEKEND", "🏠", "weekend"
-    elif weekday == 6:  # Sunday
-        return "WEEKEND", "🏠", "weekend"
-    elif weekday == 0 and hour < 4:  # Monday before 4 AM
-        return "WEEKEND", "🏠", "weekend"
-    
-    # Weekday sessions
-    if hour < 4:
-        return "OVERNIGHT", "🌙", "overnight"
-    elif 4 <= hour < 9 or (hour == 9 and minute < 30):
-        return "PRE-MARKET", "🌅", "premarket"
-    elif (hour == 9 and minute >= 30) or (10 <= hour < 16):
-        return "REGULAR HOURS", "🔔", "regular"
-    elif 16 <= hour < 20:
-        return "AFTER-HOURS", "🌆", "afterhours"
-    else:
-        return "OVERNIGHT", "🌙", "overnight"
-
 session, session_emoji, session_class = get_market_session()
 
 # Header with 24/7 branding
@@ -403,180 +387,208 @@ QuantScore™ = (Change% × Volume^1.3) / (MarketCap^0.7)<br>
 </div>
 """, unsafe_allow_html=True)
 
-# Comprehensive ticker universe for all sessions
-EXTENDED_UNIVERSE = [
-    # High-volume stocks for extended hours
-    "AAPL", "MSFT", "GOOGL", "AMZN", "TSLA", "META", "NVDA", "NFLX",
-    
-    # Popular small caps with extended trading
-    "PHUN", "SNTI", "HUBC", "BBIG", "PROG", "ATER", "SPRT", "IRNT", "RDBX", "NILE",
-    "MULN", "GFAI", "BMRA", "RELI", "BGFV", "CLOV", "WISH", "WKHS", "RIDE", "GOEV",
-    "ARVL", "NAKD", "SNDL", "EXPR", "AMC", "GME", "MMAT", "TRCH", "VERB", "VXRT",
-    "OCGN", "XELA", "GNUS", "JAGX", "INPX", "MARK", "UAMY", "TOPS", "SHIP", "GLBS",
-    
-    # Tech/AI with active extended hours
-    "CXAI", "HOLO", "TRNR", "QUBT", "RGTI", "RR", "BNAI", "BOX", "APLD", "SERV",
-    "SOFI", "PLTR", "HOOD", "RBLX", "DKNG", "FUBO", "SKLZ", "OPEN", "UPST", "AFRM",
-    "COIN", "SQ", "PYPL", "ROKU", "ZM", "SHOP", "NET", "SNOW", "CRWD", "ZS",
-    
-    # Biotech with news-driven extended activity
-    "ADTX", "ADMA", "AGIO", "AKRO", "ALEC", "ANAB", "ANIK", "APLS", "ARDX", "ARQT",
-    "ASND", "AUPH", "AVIR", "BEAM", "BCAB", "BCRX", "BFRI", "BNGO", "BOLD", "BPMC",
-    "BTTX", "CAPR", "CARA", "CBAY", "CDNA", "CDTX", "CHRS", "CTIC", "CTMX", "CPRX",
-    
-    # Energy/Mining with overnight futures correlation
-    "TELL", "FCEL", "PLUG", "BE", "BLDP", "HYMC", "GOLD", "AG", "HL", "PAAS",
-    "CDE", "SSRM", "WPM", "FNV", "SAND", "GORO", "FSM", "EGO", "AUY", "NEM",
-    
-    # Cannabis with international influence
-    "TLRY", "CRON", "ACB", "HEXO", "OGI", "CGC", "GRWG", "SMG", "HYFM",
-    
-    # Crypto miners with 24/7 correlation
-    "MARA", "RIOT", "HUT", "BITF", "EBON", "CAN", "BTBT", "WULF", "CIFR", "CORZ",
-    "GRIID", "LGHL", "ANY", "BTCS", "DPRO", "ARBK", "EQOS", "HVBT", "IDEX"
-]
-
-def get_session_specific_data(ticker, session_type):
-    """Get session-specific stock data with extended hours"""
-    try:
-        stock = yf.Ticker(ticker)
-        
-        # Get extended hours data based on session
-        if session_type in ["premarket", "afterhours"]:
-            # Get intraday data with prepost for extended hours
-            hist = stock.history(period="2d", interval="1m", prepost=True, timeout=3)
-            daily = stock.history(period="5d", interval="1d", timeout=3)
-        elif session_type == "regular":
-            # Get standard market hours data
-            hist = stock.history(period="1d", interval="1m", timeout=3)
-            daily = stock.history(period="5d", interval="1d", timeout=3)
-        elif session_type == "overnight":
-            # Use previous day's data and futures correlation
-            daily = stock.history(period="5d", interval="1d", timeout=3)
-            hist = daily  # Use daily data for overnight
-        else:  # weekend
-            # Use weekly data for analysis
-            daily = stock.history(period="5d", interval="1d", timeout=3)
-            hist = daily
-        
-        if daily.empty or len(daily) < 2:
+@st.cache_resource
+def get_universe_store():
+    """Process-wide named, versioned ticker universes (the built-in list included)"""
+    return UniverseStore(builtin=EXTENDED_UNIVERSE)
+
+universe_store = get_universe_store()
+
+@st.cache_data(show_spinner=False)
+def load_universe(name, version):
+    """Tickers of a universe version; stored versions never change, so they are cached by (name, version)"""
+    return universe_store.load(name, version)
+
+@st.cache_resource
+def get_scan_engine():
+    """Process-wide scan engine with a background daily fundamentals refresh of every known universe"""
+    engine = ScanEngine()
+    engine.fundamentals_cache.start_daily_refresh(universe_store.all_tickers)
+    return engine
+
+scan_engine = get_scan_engine()
+
+@st.cache_resource
+def get_metrics_server():
+    """Process-wide /metrics (Prometheus text) and /metrics.json endpoint for the engine's scan metrics"""
+    return start_metrics_server(scan_engine.metrics_registry)
+
+metrics_server = get_metrics_server()
+
+@st.cache_resource
+def get_sharded_scanner(shards):
+    """Process-wide coordinator for scans split across worker processes (or queue workers when
+    QUANTSCORE_SHARD_QUEUE_DIR is set); it reports into the engine's metrics"""
+    return ShardedScanner(shards, SHARD_QUEUE_DIR, metrics_registry=scan_engine.metrics_registry)
+
+@st.cache_resource
+def get_scan_cache():
+    """Process-wide scan results shared by every viewer"""
+    return SharedScanCache()
+
+scan_cache = get_scan_cache()
+
+@st.cache_resource
+def get_scan_history():
+    """Process-wide ring buffers of the last finished scans per session class, shared by every viewer"""
+    return ScanHistory()
+
+scan_history = get_scan_history()
+
+# Manual and scheduled scans reuse a shared result this recent instead of rescanning
+SCAN_REUSE_SECONDS = 15
+
+# Share of the refresh interval a scan may spend before it stops starting fetches, so auto-scan never falls behind
+SCAN_BUDGET_FRACTION = 0.8
+
+@st.cache_resource
+def get_scan_scheduler():
+    """Process-wide background scanner; it keeps its schedule with no tab open"""
+    return ScanScheduler()
+
+scan_scheduler = get_scan_scheduler()
+
+@st.cache_resource
+def get_refresh_queue():
+    """Process-wide per-ticker refresh schedule for the priority refresh strategy"""
+    return RefreshQueue()
+
+refresh_queue = get_refresh_queue()
+
+# How often an open tab checks the background scanner for a new snapshot
+SNAPSHOT_POLL_SECONDS = 2
+
+# How often a streamed scan redraws its live ranking (rows arrive faster than that)
+LIVE_REFRESH_SECONDS = 1.0
+
+# printf formats of the numeric result columns; the browser applies them to the numeric tables,
+# format_results() to the text of the top-pick cards and the downloads
+RESULT_FORMATS = {
+    'QuantScore™': "%.8f",
+    'Price': "$%.2f",
+    'Change%': "%+.2f%%",
+    'Gap%': "%+.2f%%",
+    'Volume': "%,d",
+    'Float (M)': "%.1fM",
+    'RSI': "%.0f",
+}
+
+# Result tables stay numeric; the browser formats the cells
+RESULT_COLUMN_CONFIG = {column: st.column_config.NumberColumn(format=number_format)
+                        for column, number_format in RESULT_FORMATS.items()}
+
+# Where the "," flag puts thousands separators in a string of digits (Python's printf has no such flag)
+THOUSANDS_SEPARATOR = r'\B(?=(\d{3})+(?!\d))'
+
+def format_results(ranked):
+    """Format a ranked results frame as display strings, with vectorized string operations per column"""
+    formatted = ranked.copy()
+    for column, number_format in RESULT_FORMATS.items():
+        text = pd.Series(np.char.mod(number_format.replace('%,', '%'), ranked[column].to_numpy()), index=ranked.index)
+        if '%,' in number_format:
+            text = text.str.replace(THOUSANDS_SEPARATOR, ',', regex=True)
+        formatted[column] = text
+    return formatted
+
+def show_ranking(ranked, container=st, **kwargs):
+    """Show a ranked results frame as a numeric table formatted by column config"""
+    container.dataframe(ranked, use_container_width=True, column_config=RESULT_COLUMN_CONFIG, **kwargs)
+
+def get_results_view(results, top_k):
+    """Top-K ranking of this viewer's results, its top-10 cards and CSV export, rebuilt only when the results change"""
+    view_key = (st.session_state.scan_count, st.session_state.last_scan_time, len(results), top_k)
+    view = st.session_state.get('results_view')
+    if view is None or view[0] != view_key:
+        ranked = rank_results(results, top_k)
+        formatted = format_results(ranked)
+        view = (view_key, ranked, formatted.head(10), formatted.to_csv())
+        st.session_state.results_view = view
+    return view[1:]
+
+def make_scheduled_scan_job(scanner, scan_tickers, fetch_mode, batch_size, max_workers, time_budget):
+    """Build the background scan job for the current sidebar settings"""
+    def scan_job(report, publish):
+        # The session is re-detected every cycle because the scheduler outlives page views
+        job_session, _, job_session_class = get_market_session()
+        scan_key = SharedScanCache.make_key(job_session_class, scan_tickers, fetch_mode=fetch_mode, time_budget=time_budget)
+        results, _ = scan_cache.get_or_scan(
+            scan_key,
+            lambda progress, rows: scanner.run_quantscore_scan(
+                scan_tickers, job_session_class, fetch_mode, batch_size, max_workers, progress, on_results=rows,
+                time_budget=time_budget
+            ),
+            SCAN_REUSE_SECONDS,
+            report,
+            publish
+        )
+        return job_session, job_session_class, results, len(scan_tickers)
+    
+    return scan_job
+
+def make_priority_refresh_job(scanner, refresh_queue, scan_tickers, fetch_mode, batch_size, max_workers, shards):
+    """Build the background job that rescans only the tickers due for a refresh, within the request budget"""
+    def refresh_job(report, publish):
+        job_session, _, job_session_class = get_market_session()
+        refresh_queue.set_universe(scan_tickers, job_session_class)
+        resolved_mode, resolved_batch_size, _ = scan_engine.resolve_fetch_strategy(fetch_mode, batch_size, max_workers)
+        due = refresh_queue.take_due(
+            lambda tickers: estimate_requests(tickers, job_session_class, resolved_mode, resolved_batch_size, shards)
+        )
+        if not due:
             return None
-        
-        # Calculate current/latest price
-        if not hist.empty and session_type in ["premarket", "afterhours", "regular"]:
-            current_price = hist['Close'].iloc[-1]
-            current_volume = hist['Volume'].iloc[-1] if hist['Volume'].iloc[-1] > 0 else daily['Volume'].iloc[-1]
-        else:
-            current_price = daily['Close'].iloc[-1]
-            current_volume = daily['Volume'].iloc[-1]
-        
-        prev_close = daily['Close'].iloc[-2]
-        change_pct = ((current_price - prev_close) / prev_close) * 100
-        
-        # Calculate gap based on session
-        if session_type in ["premarket", "regular"] and not hist.empty:
-            try:
-                today_open = hist['Open'].iloc[0]
-                gap_pct = ((today_open - prev_close) / prev_close) * 100
-            except:
-                gap_pct = change_pct
-        else:
-            gap_pct = change_pct
-        
-        # Get fundamental data
         try:
-            info = stock.info
-            market_cap = info.get('marketCap', 0)
-            float_shares = info.get('floatShares', 0)
-            shares_outstanding = info.get('sharesOutstanding', 0)
-            
-            if market_cap == 0 and shares_outstanding > 0:
-                market_cap = current_price * shares_outstanding
-                
-            if float_shares == 0:
-                float_shares = shares_outstanding * 0.75 if shares_outstanding > 0 else 0
-                
-        except:
-            return None
-        
-        # Calculate RSI
-        if len(daily) >= 14:
-            delta = daily['Close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-            rs = gain / loss
-            rsi = (100 - (100 / (1 + rs))).iloc[-1]
-        else:
-            rsi = 50
-            
-        return {
-            'ticker': ticker,
-            'current_price': float(current_price),
-            'change_pct': float(change_pct),
-            'gap_pct': float(gap_pct),
-            'volume': int(current_volume) if current_volume > 0 else 0,
-            'market_cap': int(market_cap) if market_cap > 0 else 0,
-            'float_shares': int(float_shares) if float_shares > 0 else 0,
-            'rsi': float(rsi) if not pd.isna(rsi) else 50,
-            'session': session,
-            'last_updated': datetime.now(ET)
-        }
-        
-    except Exception:
-        return None
-
-def calculate_quantscore_24_7(data, session_type):
-    """Calculate QuantScore with session-specific adjustments"""
-    try:
-        change_pct = abs(data['change_pct'])
-        volume = data['volume']
-        market_cap = data['market_cap']
-        
-        if market_cap <= 0 or volume <= 0:
-            return 0
-        
-        # Base QuantScore formula
-        base_score = (change_pct * (volume ** 1.3)) / (market_cap ** 0.7)
-        
-        # Session-specific multipliers for different trading conditions
-        if session_type == "premarket":
-            return base_score * 1.5  # Premium for pre-market moves
-        elif session_type == "afterhours":
-            return base_score * 1.3  # Premium for after-hours moves
-        elif session_type == "overnight":
-            return base_score * 0.8  # Discounted for overnight (limited data)
-        elif session_type == "weekend":
-            return base_score * 0.5  # Heavily discounted for weekend analysis
-        else:  # regular hours
-            return base_score
-            
-    except:
-        return 0
-
-def apply_quantscore_filters_24_7(data, session_type):
-    """Apply QuantScore filters with session awareness"""
-    try:
-        base_filters = (
-            data['float_shares'] < 10_000_000 and  # Float < 10M
-            data['rsi'] > 55 and                   # RSI > 55
-            data['volume'] > 0 and                # Volume check
-            data['market_cap'] > 0                # Market cap check
-        )
-        
-        # Adjust gap requirement based on session
-        if session_type in ["premarket", "regular"]:
-            gap_filter = abs(data['gap_pct']) > 2.0  # Standard gap requirement
-        elif session_type == "afterhours":
-            gap_filter = abs(data['gap_pct']) > 1.5  # Slightly lower for after-hours
-        elif session_type == "overnight":
-            gap_filter = abs(data['change_pct']) > 1.0  # Use change instead of gap
-        else:  # weekend
-            gap_filter = abs(data['change_pct']) > 0.5  # Very low threshold for weekend
-        
-        return base_filters and gap_filter
+            results = scanner.run_quantscore_scan(due, job_session_class, fetch_mode, batch_size, max_workers, report,
+                                                  on_results=publish, time_budget=REFRESH_TICK_SECONDS * SCAN_BUDGET_FRACTION)
+        except Exception:
+            refresh_queue.release(due)
+            raise
+        # Near misses stay warm; session data is only at hand when the scan ran in this process
+        delta_tracker = getattr(scanner, "delta_tracker", None)
+        session_data = functools.partial(delta_tracker.latest, job_session_class) if delta_tracker else None
+        # Tickers the time budget cut off keep their board row and are due again straight away
+        refresh_queue.record(due, job_session_class, results, session_data, results.skipped)
+        return job_session, job_session_class, ScanResults(refresh_queue.rows(), len(due), results.skipped), len(due)
+    
+    return refresh_job
+
+def load_latest_snapshot(scheduler):
+    """Point this viewer's session state at a newer background snapshot, kept in the shared scan history"""
+    snapshot = scheduler.latest()
+    if snapshot and snapshot.version != st.session_state.snapshot_version:
+        st.session_state.snapshot_version = snapshot.version
+        st.session_state.last_scan_time = snapshot.finished_at
+        st.session_state.scan_record = scan_history.add(snapshot.session_class, snapshot.results, snapshot.finished_at,
+                                                        snapshot.scanned, snapshot.skipped)
+        st.session_state.scan_count += 1
+
+@st.fragment(run_every=SNAPSHOT_POLL_SECONDS)
+def show_scheduler_status(scheduler, refresh_queue=None):
+    """Poll the background scanner without blocking the page; rerun once a new snapshot lands"""
+    snapshot = scheduler.latest()
+    if snapshot and snapshot.version != st.session_state.snapshot_version:
+        st.rerun()
+    
+    if refresh_queue:
+        queue_state = refresh_queue.summary()
+        st.markdown(f'<div class="countdown">🧭 Priority refresh: 🔥 {queue_state["hot"]} hot · ❄️ {queue_state["cold"]} cold of {queue_state["tracked"]} tickers · ⏳ {queue_state["due"]} due · 📶 {queue_state["tokens"]} requests left this minute</div>', unsafe_allow_html=True)
+    
+    progress = scheduler.progress
+    if progress:
+        done, total, current = progress
+        st.markdown(f'<div class="auto-refresh">🔄 AUTO-SCANNING {session}... {current} — {done}/{total} done</div>', unsafe_allow_html=True)
+        st.progress(done / total if total else 0.0)
         
-    except:
-        return False
+        # Qualified tickers show up while the scan is still running
+        live = scheduler.live_ranking
+        if live and live.qualified:
+            st.markdown(f'<div class="section-header">📡 LIVE TOP {live.limit} — {live.qualified} qualified so far</div>', unsafe_allow_html=True)
+            show_ranking(rank_results(live.rows()))
+    else:
+        time_until_next = max(0, (scheduler.next_run_at - datetime.now()).total_seconds())
+        st.markdown(f'<div class="countdown">⏱️ Next Auto-Scan in: {int(time_until_next)} seconds</div>', unsafe_allow_html=True)
+    
+    if scheduler.last_error:
+        st.markdown(f'<div class="warning-box">⚠️ Last background scan failed: {scheduler.last_error}</div>', unsafe_allow_html=True)
 
 # Sidebar with 24/7 controls
 st.sidebar.markdown(f"""
@@ -604,12 +616,66 @@ interval_map = {
     "10 minutes": 600
 }
 refresh_seconds = interval_map[refresh_interval]
+scan_budget = refresh_seconds * SCAN_BUDGET_FRACTION
+
+REFRESH_STRATEGIES = {
+    "universe": "🌐 Whole universe every interval",
+    "priority": "🧭 Per ticker by priority",
+}
+refresh_strategy = st.sidebar.selectbox("🧭 Refresh Strategy", list(REFRESH_STRATEGIES), format_func=REFRESH_STRATEGIES.get,
+    help="Per ticker: hot tickers (qualified, or close to the filters) refresh every few seconds and the cold tail rarely, within a request budget"
+)
+request_budget = st.sidebar.number_input("📶 Request Budget (per minute)", 10, 10000, REQUEST_BUDGET_PER_MINUTE, 50,
+    disabled=refresh_strategy != "priority"
+)
 
 # Session-specific settings
 st.sidebar.markdown("---")
 st.sidebar.subheader("🎯 Session Settings")
 
-max_tickers = st.sidebar.slider("🔍 Max Tickers per Scan", 50, 300, 150, 25)
+universe_names = universe_store.names()
+universe_name = st.sidebar.selectbox("🌐 Ticker Universe", universe_names)
+universe_versions = universe_store.versions(universe_name)[::-1]
+universe_version = st.sidebar.selectbox(
+    "🏷️ Universe Version", universe_versions,
+    format_func=lambda version: f"v{version}" + (" (latest)" if version == universe_versions[0] else "")
+) if universe_versions else None
+universe_tickers = load_universe(universe_name, universe_version)
+max_tickers = st.sidebar.number_input(
+    "🔍 Max Tickers per Scan", 1, len(universe_tickers), min(150, len(universe_tickers)), 25
+)
+
+with st.sidebar.expander("📥 Import Universe"):
+    universe_upload = st.file_uploader("Ticker list (.csv, .parquet or .txt)", type=["csv", "parquet", "pq", "txt"])
+    import_name = st.text_input("Universe name", value=universe_name if universe_versions else "")
+    import_note = st.text_input("Note", value="")
+    if st.button("💾 Save as New Version", disabled=universe_upload is None or not import_name):
+        try:
+            saved_version, saved_tickers = universe_store.save(
+                import_name.strip(), read_universe(universe_upload, universe_kind(universe_upload.name)), import_note
+            )
+            st.success(f"Saved {import_name} v{saved_version} ({len(saved_tickers)} tickers)")
+        except Exception as e:
+            st.error(f"Import failed: {e}")
+
+FETCH_MODE_LABELS = {
+    "auto": "⚡ Auto (fastest for the data provider)",
+    "batched": "📦 Batched downloads",
+    "per-ticker": "🎯 Per-ticker requests",
+}
+fetch_mode = st.sidebar.selectbox("⚙️ Fetch Mode", FETCH_MODES, format_func=FETCH_MODE_LABELS.get)
+batch_size = st.sidebar.slider("📦 Tickers per Batch Request", 10, 100, DEFAULT_BATCH_SIZE, 10)
+max_workers = st.sidebar.slider("🧵 Max Concurrent Fetches", 1, 32, DEFAULT_MAX_WORKERS, 1)
+scan_shards = st.sidebar.number_input("🧩 Scan Shards (worker processes)", 1, 32, 1, 1,
+    help="Split each scan across worker processes; Max Concurrent Fetches applies to every shard"
+)
+scanner = get_sharded_scanner(scan_shards) if scan_shards > 1 or SHARD_QUEUE_DIR else scan_engine
+results_top_k = st.sidebar.number_input("🏆 Ranked Results Shown", 10, 5000, 100, 10,
+    help="Only the best-scoring tickers are ranked and displayed; the qualified count covers all of them"
+)
+stream_results = st.sidebar.checkbox("📡 Stream Results", value=True,
+    help="Show a live top ranking of qualified tickers while a manual scan is still running"
+)
 session_priority = st.sidebar.multiselect(
     "📅 Priority Sessions",
     ["PRE-MARKET", "REGULAR HOURS", "AFTER-HOURS", "OVERNIGHT"],
@@ -624,7 +690,8 @@ st.sidebar.markdown(f"""
 🕐 ET Time: {current_et.strftime('%H:%M:%S')}<br>
 🔄 Auto-Scan: {"ON" if auto_mode else "OFF"}<br>
 ⏱️ Interval: {refresh_interval}<br>
-🎯 Tickers: {max_tickers}<br>
+🌐 Universe: {universe_name} {f'v{universe_version}' if universe_version else ''}<br>
+🎯 Tickers: {max_tickers} of {len(universe_tickers)}<br>
 📊 Last Scan: {st.session_state.last_scan_time or "Never"}
 </div>
 """, unsafe_allow_html=True)
@@ -632,73 +699,30 @@ st.sidebar.markdown(f"""
 # Update session state
 st.session_state.auto_scan_active = auto_mode
 
-# Auto-refresh logic
+# Auto-refresh logic: scans run on the background scheduler, this page only reads its snapshots
 if auto_mode:
     st.markdown('<div class="auto-refresh">🔄 24/7 AUTO-SCAN MODE ACTIVE</div>', unsafe_allow_html=True)
     
-    # Countdown display
-    if st.session_state.last_scan_time:
-        time_since_scan = (datetime.now() - st.session_state.last_scan_time).total_seconds()
-        time_until_next = max(0, refresh_seconds - time_since_scan)
-        st.markdown(f'<div class="countdown">⏱️ Next Auto-Scan in: {int(time_until_next)} seconds</div>', unsafe_allow_html=True)
-    
-    # Auto-scan trigger
-    should_scan = False
-    if st.session_state.last_scan_time is None:
-        should_scan = True
-    elif (datetime.now() - st.session_state.last_scan_time).total_seconds() >= refresh_seconds:
-        should_scan = True
-    
-    if should_scan:
-        # Auto-scan execution
-        st.markdown(f'<div class="auto-refresh">🔄 AUTO-SCANNING {session}...</div>', unsafe_allow_html=True)
-        
-        # Get session-specific tickers
-        scan_tickers = EXTENDED_UNIVERSE[:max_tickers]
-        
-        start_time = time.time()
-        qualified_stocks = []
-        scanned_count = 0
-        
-        # Progress for auto-scan
-        progress_bar = st.progress(0)
-        status_placeholder = st.empty()
-        
-        for i, ticker in enumerate(scan_tickers):
-            status_placeholder.markdown(f'<div class="auto-refresh">🔍 Auto-scanning: {ticker} [{session}]</div>', unsafe_allow_html=True)
-            progress_bar.progress((i + 1) / len(scan_tickers))
-            
-            data = get_session_specific_data(ticker, session_class)
-            scanned_count += 1
-            
-            if data and apply_quantscore_filters_24_7(data, session_class):
-                quantscore = calculate_quantscore_24_7(data, session_class)
-                
-                if quantscore > 0:
-                    qualified_stocks.append({
-                        'Ticker': data['ticker'],
-                        'QuantScore™': quantscore,
-                        'Price': data['current_price'],
-                        'Change%': data['change_pct'],
-                        'Gap%': data['gap_pct'],
-                        'Volume': data['volume'],
-                        'Float (M)': data['float_shares'] / 1_000_000,
-                        'RSI': data['rsi'],
-                        'Session': data['session'],
-                        'Updated': data['last_updated'].strftime('%H:%M:%S')
-                    })
-        
-        scan_time = time.time() - start_time
-        progress_bar.empty()
-        status_placeholder.empty()
-        
-        # Update session state
-        st.session_state.last_scan_time = datetime.now()
-        st.session_state.scan_results = qualified_stocks
-        st.session_state.scan_count += 1
-        
-        # Auto-rerun for continuous operation
-        time.sleep(2)  # Brief pause before rerun
+    scan_tickers = universe_tickers[:max_tickers]
+    if refresh_strategy == "priority":
+        refresh_queue.set_budget(request_budget)
+        scan_scheduler.configure(
+            make_priority_refresh_job(scanner, refresh_queue, scan_tickers, fetch_mode, batch_size, max_workers, scan_shards),
+            REFRESH_TICK_SECONDS
+        )
+    else:
+        scan_scheduler.configure(
+            make_scheduled_scan_job(scanner, scan_tickers, fetch_mode, batch_size, max_workers, scan_budget),
+            refresh_seconds
+        )
+    scan_scheduler.start()
+    
+    load_latest_snapshot(scan_scheduler)
+    show_scheduler_status(scan_scheduler, refresh_queue if refresh_strategy == "priority" else None)
+elif scan_scheduler.running:
+    # The scanner is shared by every viewer, so leaving auto mode does not stop it for everyone
+    if st.sidebar.button("⏹️ Stop Background Scanner"):
+        scan_scheduler.stop()
         st.rerun()
 
 # Manual scan button
@@ -706,53 +730,70 @@ if st.sidebar.button("🚀 MANUAL SCAN NOW", type="primary"):
     st.markdown(f'<div class="session-{session_class}">🔍 MANUAL QUANTSCORE™ SCAN - {session}</div>', unsafe_allow_html=True)
     
     # Manual scan execution (same logic as auto-scan)
-    scan_tickers = EXTENDED_UNIVERSE[:max_tickers]
+    scan_tickers = universe_tickers[:max_tickers]
     start_time = time.time()
-    qualified_stocks = []
-    scanned_count = 0
+    scan_key = SharedScanCache.make_key(session_class, scan_tickers, fetch_mode=fetch_mode, time_budget=scan_budget)
     
     progress_bar = st.progress(0)
     status_text = st.empty()
+    scan_label = "Joining shared scan" if scan_cache.is_scanning(scan_key) else "Scanning"
+    
+    def show_manual_progress(done, total, current):
+        status_text.markdown(f'<div class="session-{session_class}">🔍 {scan_label}: {current} — {done}/{total} done</div>', unsafe_allow_html=True)
+        progress_bar.progress(done / total if total else 0.0)
+    
+    live_ranking = LiveRanking()
+    live_header = st.empty()
+    live_table = st.empty()
+    first_result_at = [None]
+    last_render = [float("-inf")]
+    
+    def show_live_results(rows):
+        live_ranking.add(rows)
+        if first_result_at[0] is None:
+            first_result_at[0] = time.time() - start_time
+        # Rows land several times a second; redrawing the table that often only costs the browser
+        if time.monotonic() - last_render[0] < LIVE_REFRESH_SECONDS:
+            return
+        last_render[0] = time.monotonic()
+        live_header.markdown(f'<div class="section-header">📡 LIVE TOP {live_ranking.limit} — {live_ranking.qualified} qualified so far (first after {first_result_at[0]:.1f}s)</div>', unsafe_allow_html=True)
+        show_ranking(rank_results(live_ranking.rows()), live_table)
     
     with st.spinner(f"🔍 Manual scanning {session}..."):
-        for i, ticker in enumerate(scan_tickers):
-            status_text.markdown(f'<div class="session-{session_class}">🔍 Scanning: {ticker}</div>', unsafe_allow_html=True)
-            progress_bar.progress((i + 1) / len(scan_tickers))
-            
-            data = get_session_specific_data(ticker, session_class)
-            scanned_count += 1
-            
-            if data and apply_quantscore_filters_24_7(data, session_class):
-                quantscore = calculate_quantscore_24_7(data, session_class)
-                
-                if quantscore > 0:
-                    qualified_stocks.append({
-                        'Ticker': data['ticker'],
-                        'QuantScore™': quantscore,
-                        'Price': data['current_price'],
-                        'Change%': data['change_pct'],
-                        'Gap%': data['gap_pct'],
-                        'Volume': data['volume'],
-                        'Float (M)': data['float_shares'] / 1_000_000,
-                        'RSI': data['rsi'],
-                        'Session': data['session'],
-                        'Updated': data['last_updated'].strftime('%H:%M:%S')
-                    })
-            
-            time.sleep(0.01)
+        qualified_stocks, finished_at = scan_cache.get_or_scan(
+            scan_key,
+            lambda report, publish: scanner.run_quantscore_scan(
+                scan_tickers, session_class, fetch_mode, batch_size, max_workers, report,
+                on_results=publish if stream_results else None, time_budget=scan_budget
+            ),
+            SCAN_REUSE_SECONDS,
+            show_manual_progress,
+            show_live_results if stream_results else None
+        )
     
     scan_time = time.time() - start_time
     progress_bar.empty()
     status_text.empty()
+    live_header.empty()
+    live_table.empty()
+    if first_result_at[0] is not None:
+        st.caption(f"📡 First qualified ticker after {first_result_at[0]:.1f}s of a {scan_time:.1f}s scan")
     
     # Update session state
-    st.session_state.last_scan_time = datetime.now()
-    st.session_state.scan_results = qualified_stocks
+    st.session_state.last_scan_time = finished_at
+    st.session_state.scan_record = scan_history.add(session_class, qualified_stocks, finished_at)
     st.session_state.scan_count += 1
 
+# A scan that ran out of its time budget shows what it covered; the next scan starts with the rest
+if st.session_state.scan_record and st.session_state.scan_record.skipped:
+    skipped = st.session_state.scan_record.skipped
+    st.markdown(f'<div class="warning-box">⏳ PARTIAL SCAN: {st.session_state.scan_record.coverage:.0%} coverage — the time budget ran out before {len(skipped)} tickers were scanned; the next scan takes them first</div>', unsafe_allow_html=True)
+    with st.expander(f"⏭️ Skipped tickers ({len(skipped)})"):
+        st.markdown(", ".join(skipped))
+
 # Display results (either from auto-scan or manual scan)
-if st.session_state.scan_results:
-    qualified_stocks = st.session_state.scan_results
+if st.session_state.scan_record and st.session_state.scan_record.results:
+    qualified_stocks = st.session_state.scan_record.results
     
     st.markdown(f'<div class="section-header">🏆 {session} QUANTSCORE™ RESULTS</div>', unsafe_allow_html=True)
     
@@ -771,32 +812,20 @@ if st.session_state.scan_results:
         st.metric("⚡ Auto-Mode", "ON" if auto_mode else "OFF")
     
     if qualified_stocks:
-        # Sort by QuantScore
-        df = pd.DataFrame(qualified_stocks)
-        df = df.sort_values('QuantScore™', ascending=False)
-        
-        # Format for display
-        display_df = df.copy()
-        display_df['QuantScore™'] = display_df['QuantScore™'].apply(lambda x: f"{x:.8f}")
-        display_df['Price'] = display_df['Price'].apply(lambda x: f"${x:.2f}")
-        display_df['Change%'] = display_df['Change%'].apply(lambda x: f"{x:+.2f}%")
-        display_df['Gap%'] = display_df['Gap%'].apply(lambda x: f"{x:+.2f}%")
-        display_df['Volume'] = display_df['Volume'].apply(lambda x: f"{x:,.0f}")
-        display_df['Float (M)'] = display_df['Float (M)'].apply(lambda x: f"{x:.1f}M")
-        display_df['RSI'] = display_df['RSI'].apply(lambda x: f"{x:.0f}")
-        
-        display_df.index = range(1, len(display_df) + 1)
-        display_df.index.name = 'Rank'
+        # Keep the top results by QuantScore; formatting happens once per new result set
+        ranked_df, top_picks, csv = get_results_view(qualified_stocks, results_top_k)
         
         st.markdown(f'<div class="success-box">🎉 {session} SUCCESS: Found {len(qualified_stocks)} QuantScore™ opportunities!</div>', unsafe_allow_html=True)
+        if len(ranked_df) < len(qualified_stocks):
+            st.caption(f"Showing the top {len(ranked_df)} of {len(qualified_stocks)} by QuantScore™")
         
         # Display table
-        st.dataframe(display_df, use_container_width=True, height=400)
+        show_ranking(ranked_df, height=400)
         
         # Top picks with session-specific styling
         st.markdown(f'<div class="section-header">🏆 TOP {session} PICKS</div>', unsafe_allow_html=True)
         
-        for i, (idx, row) in enumerate(display_df.head(10).iterrows()):
+        for i, (idx, row) in enumerate(zip(top_picks.index, top_picks.to_dict('records'))):
             result_class = f"{session_class}-result"
             
             if i == 0:
@@ -811,7 +840,6 @@ if st.session_state.scan_results:
         # Export 24/7 results
         col1, col2 = st.columns(2)
         with col1:
-            csv = display_df.to_csv()
             st.download_button(
                 f"📊 Download {session} Results",
                 csv,
@@ -842,7 +870,7 @@ QUALITY FILTERS:
 
 TOP 5 {session} PICKS:
 """
-            for i, (idx, row) in enumerate(display_df.head(5).iterrows()):
+            for i, row in enumerate(top_picks.head(5).to_dict('records')):
                 summary += f"{i+1}. {row['Ticker']} - QuantScore™: {row['QuantScore™']} | Price: {row['Price']} | Session: {row['Session']}\n"
             
             st.download_button(
@@ -908,6 +936,118 @@ else:
     </div>
     """, unsafe_allow_html=True)
 
+# The scans of the current session class still in the shared history
+with st.expander(f"🕰️ Recent {session} Scans"):
+    recent_scans = scan_history.scans(session_class)
+    
+    if not recent_scans:
+        st.markdown(f"No {session} scan has finished in this process yet.")
+    else:
+        st.markdown(f"The last {len(recent_scans)} {session} scans (up to {scan_history.size} are kept in memory, shared by every viewer)")
+        recent_rows = []
+        for record in recent_scans:
+            top_pick = max(record.results, key=lambda row: row.quantscore, default=None)
+            recent_rows.append({
+                'Finished': record.finished_at.strftime('%H:%M:%S'),
+                'Tickers': record.tickers,
+                'Coverage': f"{record.coverage:.0%}",
+                'Qualified': len(record.results),
+                'Top Pick': top_pick.ticker if top_pick else "—",
+                'Top QuantScore™': top_pick.quantscore if top_pick else None,
+            })
+        st.dataframe(pd.DataFrame(recent_rows), hide_index=True,
+                     column_config={'Top QuantScore™': st.column_config.NumberColumn(format="%.8f")})
+
+# Per-phase timings of the last scan in this process, whichever viewer or scheduler ran it
+with st.expander("🩺 Scan Diagnostics"):
+    last_scan = scan_engine.metrics_registry.to_dict()["last_scan"]
+    
+    if last_scan is None:
+        st.markdown("No scan has finished in this process yet.")
+    else:
+        st.markdown(f"**Last scan:** {last_scan['tickers']} tickers in {last_scan['seconds']:.2f}s "
+                    f"({last_scan['session']}, {last_scan['fetch_mode']} fetching), {last_scan['qualified']} qualified")
+        
+        phase_order = {phase: position for position, phase in enumerate(PHASES)}
+        phase_rows = [{
+            'Phase': phase,
+            'Calls': stats['calls'],
+            'Total (s)': round(stats['total_seconds'], 3),
+            'Mean (ms)': round(stats['mean_seconds'] * 1000, 1),
+            'p50 (ms)': round(stats['p50_seconds'] * 1000, 1),
+            'p99 (ms)': round(stats['p99_seconds'] * 1000, 1),
+            'Max (ms)': round(stats['max_seconds'] * 1000, 1),
+        } for phase, stats in sorted(last_scan['phases'].items(), key=lambda item: phase_order.get(item[0], len(PHASES)))]
+        st.markdown("**⏱️ Time by phase** (fetch and scoring work done for a batch is shared among its tickers)")
+        st.dataframe(pd.DataFrame(phase_rows), hide_index=True)
+        
+        if last_scan['stages']:
+            st.markdown("**🪜 Pipeline stages** (cheapest first; a ticker dropped at a stage skips every later fetch)")
+            st.dataframe(pd.DataFrame([
+                {'Stage': stage, 'Entered': counts['entered'], 'Eliminated': counts['eliminated'],
+                 'Passed': counts['entered'] - counts['eliminated']}
+                for stage, counts in last_scan['stages'].items()
+            ]), hide_index=True)
+        
+        if last_scan['delta']:
+            delta = last_scan['delta']
+            st.markdown(f"**♻️ Delta scan:** {delta.get('changed', 0)} tickers rebuilt, "
+                        f"{delta.get('unchanged', 0)} unchanged since the last scan (previous QuantScore™ reused), "
+                        f"{delta.get('fetch_skipped', 0)} bar fetches skipped (bars already final)")
+        
+        if last_scan['errors']:
+            st.markdown("**⚠️ Errors** (including ones the scan skipped past)")
+            st.dataframe(pd.DataFrame(last_scan['errors']).rename(columns={'phase': 'Phase', 'type': 'Error', 'count': 'Count'}),
+                         hide_index=True)
+            if last_scan['timeouts']:
+                st.markdown("**⌛ Timeouts:** " + ", ".join(f"{phase} {count}" for phase, count in last_scan['timeouts'].items()))
+        else:
+            st.markdown("**✅ No errors or timeouts**")
+        
+        st.markdown("**🐢 Slowest tickers**")
+        st.dataframe(pd.DataFrame([
+            {'Ticker': row['ticker'], 'Total (ms)': round(row['seconds'] * 1000, 1),
+             **{phase: round(seconds * 1000, 1) for phase, seconds in row['phases'].items()}}
+            for row in last_scan['slowest_tickers']
+        ]), hide_index=True)
+
+        if last_scan['failures']:
+            st.markdown("**📉 Provider failures:** " + ", ".join(f"{kind.replace('_', ' ')} {count}"
+                                                                for kind, count in last_scan['failures'].items()))
+
+    # Shard workers keep their own quarantine and breaker; the coordinator has their last reports
+    if scanner is scan_engine:
+        quarantined = scan_engine.quarantine.entries()
+        circuits = [scan_engine.circuit_breaker.status()]
+    else:
+        quarantined = scanner.quarantine_entries()
+        circuits = [health['circuit'] for health in scanner.provider_health.values()]
+    open_circuits = [circuit for circuit in circuits if circuit['state'] != "closed"]
+    if open_circuits:
+        st.markdown(f"**🔌 Circuit breaker {open_circuits[0]['state']}:** provider requests paused after a "
+                    f"{open_circuits[0]['error_rate']:.0%} error rate, retrying in {open_circuits[0]['retry_in']:.0f}s")
+    else:
+        st.markdown("**🔌 Circuit breaker closed:** provider requests flowing")
+
+    if quarantined:
+        now = time.time()
+        st.markdown(f"**🚫 Quarantined symbols ({len(quarantined)})** (left out of scans until their backoff ends)")
+        st.dataframe(pd.DataFrame([{
+            'Ticker': entry['ticker'],
+            'Reason': entry['reason'].replace('_', ' '),
+            'Failures': entry['failures'],
+            'Retry in (min)': round((entry['until'] - now) / 60, 1),
+            'Last error': entry['detail'],
+        } for entry in quarantined]), hide_index=True)
+    else:
+        st.markdown("**🚫 No quarantined symbols**")
+
+    if metrics_server:
+        st.markdown(f"📡 Metrics endpoint: `http://{METRICS_HOST}:{metrics_server.server_address[1]}/metrics` (Prometheus) and `/metrics.json`")
+    else:
+        st.markdown("📡 Metrics endpoint is off (set QUANTSCORE_METRICS_PORT to serve it)" if not METRICS_PORT else
+                    f"📡 Metrics endpoint is off (port {METRICS_PORT} on {METRICS_HOST} is in use)")
+
 # Information section
 with st.expander("🌍 24/7 QuantScore™ Technology"):
     st.markdown(f"""
@@ -977,9 +1117,3 @@ st.markdown(f"""
 </div>
 """, unsafe_allow_html=True)
 
-# Auto-refresh mechanism for 24/7 operation
-if auto_mode and st.session_state.last_scan_time:
-    time_since_scan = (datetime.now() - st.session_state.last_scan_time).total_seconds()
-    if time_since_scan >= refresh_seconds:
-        time.sleep(1)
-        st.rerun()
@@ -0,0 +1,175 @@
+"""Incremental on-disk OHLCV bar store for QuantScore™ scans"""
+import os
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pytz
+
+from fundamentals_cache import CACHE_DIR
+
+ET = pytz.timezone('US/Eastern')
+
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# history() period used the first time a ticker/interval is fetched; the daily backfill
+# is long enough to seed the Wilder RSI state in a single request
+BACKFILL_PERIODS = {
+    "1d": "3mo",
+    "1m": "2d",
+}
+
+# Stores with fewer bars than this are backfilled again (15 daily closes seed a 14-period RSI)
+MIN_STORED_BARS = {
+    "1d": 15,
+    "1m": 0,
+}
+
+# Yahoo only serves 1-minute bars for the last few days; older stores are backfilled instead
+MAX_INCREMENTAL_GAP = {
+    "1d": timedelta(days=365),
+    "1m": timedelta(days=6),
+}
+
+# Bars older than this are pruned on write so intraday files stay small
+RETENTION = {
+    "1d": None,
+    "1m": timedelta(days=7),
+}
+
+SCHEMA = pa.schema([
+    ('ts', pa.int64()),  # Bar start, UTC nanoseconds
+    ('Open', pa.float64()),
+    ('High', pa.float64()),
+    ('Low', pa.float64()),
+    ('Close', pa.float64()),
+    ('Volume', pa.float64()),
+])
+
+
+def _to_utc_index(index):
+    """Normalize a bar index to tz-aware UTC (naive timestamps are treated as ET)"""
+    index = pd.DatetimeIndex(index)
+    if index.tz is None:
+        index = index.tz_localize(ET)
+    return index.tz_convert('UTC')
+
+
+class BarStore:
+    """Arrow IPC files of OHLCV bars keyed by ticker and interval, updated append-only"""
+
+    def __init__(self, root=None, retention=None):
+        self.root = root or os.path.join(CACHE_DIR, "bars")
+        # Per-interval retention; pass {"1m": None} to keep minute bars indefinitely for replays
+        self.retention = {**RETENTION, **(retention or {})}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, ticker, interval):
+        with self._locks_guard:
+            return self._locks.setdefault((ticker, interval), threading.Lock())
+
+    def path(self, ticker, interval):
+        """Return the Arrow file holding a ticker's bars for one interval"""
+        return os.path.join(self.root, interval, f"{ticker.replace('/', '_')}.arrow")
+
+    def _read_table(self, ticker, interval):
+        path = self.path(ticker, interval)
+        if not os.path.exists(path):
+            return None
+        with pa.memory_map(path, 'r') as source:
+            return pa.ipc.open_file(source).read_all()
+
+    def read(self, ticker, interval):
+        """Return all stored bars as a DataFrame indexed by ET timestamp"""
+        try:
+            table = self._read_table(ticker, interval)
+        except (OSError, pa.ArrowInvalid):
+            table = None
+        if table is None or table.num_rows == 0:
+            return pd.DataFrame(columns=BAR_COLUMNS, dtype=float)
+
+        frame = table.to_pandas()
+        index = pd.to_datetime(frame.pop('ts'), utc=True).dt.tz_convert(ET)
+        frame.index = pd.DatetimeIndex(index).rename(None)
+        return frame[BAR_COLUMNS]
+
+    def last_timestamp(self, ticker, interval):
+        """Return the start of the newest stored bar, or None"""
+        return self._stored_extent(ticker, interval)[1]
+
+    def _stored_extent(self, ticker, interval):
+        """Return (bar count, newest bar start) for a ticker/interval"""
+        try:
+            table = self._read_table(ticker, interval)
+        except (OSError, pa.ArrowInvalid):
+            return 0, None
+        if table is None or table.num_rows == 0:
+            return 0, None
+        return table.num_rows, pd.Timestamp(table.column('ts')[-1].as_py(), unit='ns', tz='UTC').tz_convert(ET)
+
+    def fetch_args(self, ticker, interval, now=None):
+        """Return the history() arguments that fetch only bars newer than the store"""
+        count, last_ts = self._stored_extent(ticker, interval)
+        now = now or datetime.now(ET)
+        if last_ts is None or count < MIN_STORED_BARS[interval] or now - last_ts > MAX_INCREMENTAL_GAP[interval]:
+            return {"period": BACKFILL_PERIODS[interval]}
+        # Start at the last stored bar so a late revision of it is picked up
+        return {"start": last_ts.to_pydatetime()}
+
+    def merge(self, ticker, interval, bars):
+        """Append newly fetched bars, replacing any stored bars they overlap"""
+        if bars is None or bars.empty:
+            return
+        bars = bars.dropna(subset=['Close'])
+        if bars.empty:
+            return
+
+        new_ts = _to_utc_index(bars.index).as_unit('ns').asi8
+        new_table = pa.table({
+            'ts': new_ts,
+            **{column: bars[column].to_numpy(dtype='float64') for column in BAR_COLUMNS}
+        }, schema=SCHEMA)
+
+        with self._lock(ticker, interval):
+            existing = self._read_table(ticker, interval)
+            if existing is not None and existing.num_rows:
+                ts = existing.column('ts').to_numpy()
+                # Stored bars at or after the first new bar are superseded (last-bar revisions)
+                keep = int((ts < new_ts.min()).sum())
+                combined = pa.concat_tables([existing.slice(0, keep), new_table])
+            else:
+                combined = new_table
+
+            # Sort by time and keep the newest copy of any duplicated timestamp
+            frame = combined.to_pandas().drop_duplicates('ts', keep='last').sort_values('ts')
+            retention = self.retention.get(interval)
+            if retention is not None:
+                cutoff = pd.Timestamp.now(tz='UTC') - retention
+                frame = frame[frame['ts'] >= cutoff.value]
+            combined = pa.Table.from_pandas(frame, schema=SCHEMA, preserve_index=False)
+
+            path = self.path(ticker, interval)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with pa.OSFile(tmp_path, 'wb') as sink:
+                with pa.ipc.new_file(sink, SCHEMA) as writer:
+                    writer.write_table(combined)
+            os.replace(tmp_path, path)
+
+    def read_period(self, ticker, interval, period, prepost=True):
+        """Return the bars history(period=..., prepost=...) would return, served from disk"""
+        bars = self.read(ticker, interval)
+        if bars.empty:
+            return bars
+
+        if not prepost and interval != "1d":
+            minutes = bars.index.hour * 60 + bars.index.minute
+            bars = bars[(minutes >= 9 * 60 + 30) & (minutes < 16 * 60)]
+
+        # "Nd" periods cover the last N trading dates present in the store
+        days = int(period.rstrip('d'))
+        dates = bars.index.normalize()
+        recent = dates.unique()[-days:]
+        return bars[dates.isin(recent)]
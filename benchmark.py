@@ -0,0 +1,276 @@
+"""Reproducible QuantScore™ scan benchmarks against fixture data instead of live Yahoo
+
+Each run scans a universe through the full ScanEngine pipeline (bar store, fundamentals cache,
+RSI state, vectorized scoring) against a FakeMarketData provider, in a fresh subprocess and
+cache directory so peak RSS and cold-cache timings are comparable between runs. With --via-http
+the provider sits behind the local HTTP stand-in server.
+Error-free runs are checked against golden rankings so performance work cannot silently change
+QuantScores.
+
+Example:
+    python benchmark.py --sizes 150 300 3000 10000 --latency 0.05
+    python benchmark.py --sizes 300 --via-http --fetch-mode per-ticker
+    python benchmark.py --sizes 10000 --shards 4
+    python benchmark.py --record fixtures.pkl        # record fixtures from Yahoo once
+    python benchmark.py --fixtures fixtures.pkl --update-golden
+"""
+import argparse
+import concurrent.futures
+import functools
+import io
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import fake_market_data
+from bar_store import BarStore
+from fundamentals_cache import FundamentalsCache
+from market_data import HTTPProvider
+from market_data_server import start_server_thread
+from rsi_state import RSITracker
+from scan_engine import (
+    DEFAULT_BATCH_SIZE, DEFAULT_MAX_WORKERS, EXTENDED_UNIVERSE, FETCH_MODES, SESSION_LABELS, ScanEngine, rank_results
+)
+from scan_shards import ShardedScanner
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_SIZES = [150, 300, 3000, 10000]
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "golden")
+
+# Display-only columns that are left out of golden comparisons
+VOLATILE_COLUMNS = ['Session', 'Updated']
+
+
+def load_benchmark_fixtures(path=None):
+    """Load recorded fixtures, or synthesize deterministic ones for the built-in universe"""
+    if path:
+        return fake_market_data.load_fixtures(path)
+    return fake_market_data.synthesize_fixtures(EXTENDED_UNIVERSE)
+
+
+def golden_path(fixtures_path, session_type, size):
+    """Golden rankings file for a fixture set, session class and universe size"""
+    source = os.path.splitext(os.path.basename(fixtures_path))[0] if fixtures_path else "synthetic"
+    return os.path.join(GOLDEN_DIR, f"{source}_{session_type}_{size}.csv")
+
+
+def golden_frame(ranked):
+    """Normalize a ranking to what is stored in golden files (CSV round trip, no volatile columns)"""
+    # Equal scores (e.g. clones with tiny volumes) rank in completion order, so break ties by ticker
+    frame = ranked.drop(columns=VOLATILE_COLUMNS).sort_values(['QuantScore™', 'Ticker'], ascending=[False, True])
+    frame.index = pd.RangeIndex(1, len(frame) + 1, name='Rank')
+    buffer = io.StringIO()
+    frame.to_csv(buffer)
+    buffer.seek(0)
+    return read_golden(buffer)
+
+
+def read_golden(path_or_buffer):
+    # round_trip parsing reads back the exact floats to_csv wrote
+    return pd.read_csv(path_or_buffer, index_col='Rank', float_precision='round_trip')
+
+
+def compare_golden(ranked, path):
+    """Return None if ranked matches the golden file, else a short description of the first difference"""
+    if not os.path.exists(path):
+        return f"missing golden file {path} (run with --update-golden)"
+    current = golden_frame(ranked)
+    golden = read_golden(path)
+    if current.equals(golden):
+        return None
+    if len(current) != len(golden):
+        return f"{len(current)} qualified rows, golden has {len(golden)}"
+    for rank in golden.index:
+        if not current.loc[rank].equals(golden.loc[rank]):
+            return f"rank {rank}: got {current.loc[rank].to_dict()}, golden {golden.loc[rank].to_dict()}"
+    return "rankings differ"
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, or None where unsupported"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def benchmark_engine(provider_url, cache_dir, provider=None):
+    """A ScanEngine on provider (or the HTTP provider at provider_url) with caches under cache_dir"""
+    provider = provider or HTTPProvider(provider_url)
+    # Shard workers share cache_dir, so each process gets its own SQLite files
+    cache_dir = os.path.join(cache_dir, str(os.getpid()))
+    os.makedirs(cache_dir, exist_ok=True)
+    return ScanEngine(
+        provider=provider,
+        fundamentals_cache=FundamentalsCache(os.path.join(cache_dir, "fundamentals.sqlite"), fetch_info=provider.info),
+        # Fixture minute bars are older than the live retention window
+        bar_store=BarStore(os.path.join(cache_dir, "bars"), retention={"1m": None}),
+        rsi_tracker=RSITracker(os.path.join(cache_dir, "rsi_state.sqlite")),
+    )
+
+
+def run_benchmark(config):
+    """Run one scan described by config and return its stats and ranking
+
+    Meant to run in a fresh subprocess: the caches live in a temporary directory and peak RSS
+    covers only this run.
+    """
+    fixtures = load_benchmark_fixtures(config["fixtures"])
+    universe = fake_market_data.expand_universe(sorted(fixtures), config["size"])
+    provider = fake_market_data.FakeMarketData(fixtures, config["latency"], config["error_rate"], config["seed"])
+
+    completed_at = {}
+    last_completion = [None]
+
+    def record_progress(done, total, current):
+        # Batch announcements repeat the previous count; only an increment is a finished ticker
+        if done > len(completed_at):
+            last_completion[0] = completed_at[current] = time.perf_counter()
+
+    server = None
+    scan_provider = provider
+    url = None
+    if config["via_http"] or config["shards"] > 1:
+        # Same fixtures and counters, but every request goes through the stand-in server (the only
+        # way shard worker processes can share this process's provider)
+        server, url = start_server_thread(provider)
+        scan_provider = HTTPProvider(url)
+
+    with tempfile.TemporaryDirectory(prefix="quantscore-bench-") as cache_dir:
+        if config["shards"] > 1:
+            # Worker processes are started before the clock, like the dashboard's long-lived ones;
+            # only shard completions are reported, so per-ticker latency is not measured
+            engine = ShardedScanner(config["shards"], engine_factory=functools.partial(benchmark_engine, url, cache_dir))
+            engine.start()
+            scan_options = {}
+        else:
+            engine = benchmark_engine(None, cache_dir, scan_provider)
+            # Every completion is reported (no throttling) so each ticker's latency can be measured
+            scan_options = {"progress_interval": 0}
+        start = time.perf_counter()
+        results = engine.run_quantscore_scan(universe, config["session"], config["fetch_mode"],
+                                             config["batch_size"], config["max_workers"], record_progress,
+                                             **scan_options)
+        finished = time.perf_counter()
+        if config["shards"] > 1:
+            engine.close()
+    if server:
+        server.shutdown()
+
+    latencies = np.array([completed_at[ticker] - provider.first_request[ticker]
+                          for ticker in completed_at if ticker in provider.first_request])
+    elapsed = finished - start
+    stats = {
+        "size": config["size"],
+        "session": config["session"],
+        "fetch_mode": config["fetch_mode"],
+        "shards": config["shards"],
+        "provider": scan_provider.name,
+        "latency": config["latency"],
+        "error_rate": config["error_rate"],
+        "seconds": elapsed,
+        "tickers_per_second": len(universe) / elapsed if elapsed else 0.0,
+        "p50_ticker_ms": float(np.percentile(latencies, 50)) * 1000 if len(latencies) else None,
+        "p99_ticker_ms": float(np.percentile(latencies, 99)) * 1000 if len(latencies) else None,
+        # Scoring starts once the last ticker is in; everything after it is the vectorized pass
+        "scoring_ms": (finished - last_completion[0]) * 1000 if last_completion[0] else 0.0,
+        "requests": provider.requests,
+        "qualified": len(results),
+        "peak_rss_mb": peak_rss_bytes() / 2**20 if resource else None,
+    }
+    return stats, rank_results(results)
+
+
+def run_isolated(config):
+    """Run one benchmark in a fresh spawned process"""
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(run_benchmark, config).result()
+
+
+def format_stats(stats):
+    return (f"{stats['size']:>6} tickers  {stats['seconds']:8.2f}s  {stats['tickers_per_second']:8.1f} tickers/s  "
+            f"p50 {stats['p50_ticker_ms'] or 0:8.1f}ms  p99 {stats['p99_ticker_ms'] or 0:8.1f}ms  "
+            f"scoring {stats['scoring_ms']:7.1f}ms  rss {stats['peak_rss_mb'] or 0:7.1f}MB  "
+            f"{stats['requests']:>6} requests  {stats['qualified']:>4} qualified")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark QuantScore™ scans against fixture market data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="universe sizes to scan")
+    parser.add_argument("--session", default="regular", choices=list(SESSION_LABELS))
+    parser.add_argument("--fetch-mode", default="auto", choices=FETCH_MODES)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--max-workers", type=int, default=DEFAULT_MAX_WORKERS)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds slept per provider request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="chance a provider request fails")
+    parser.add_argument("--seed", type=int, default=0, help="seed for injected errors")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="split each scan across this many worker processes (implies --via-http)")
+    parser.add_argument("--via-http", action="store_true", help="serve the fixtures through the local HTTP stand-in")
+    parser.add_argument("--fixtures", help="recorded fixture file (default: synthetic fixtures)")
+    parser.add_argument("--record", metavar="PATH", help="record fixtures for the built-in universe from Yahoo and exit")
+    parser.add_argument("--update-golden", action="store_true", help="overwrite golden rankings with this run's output")
+    parser.add_argument("--output", "-o", help="write stats for every run as JSON")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.record:
+        fixtures = fake_market_data.record_fixtures(EXTENDED_UNIVERSE, args.record)
+        print(f"recorded {len(fixtures)} tickers to {args.record}", file=sys.stderr)
+        return 0
+
+    all_stats = []
+    failed = False
+    for size in args.sizes:
+        config = {
+            "fixtures": args.fixtures, "size": size, "session": args.session, "fetch_mode": args.fetch_mode,
+            "batch_size": args.batch_size, "max_workers": args.max_workers, "latency": args.latency,
+            "error_rate": args.error_rate, "seed": args.seed, "via_http": args.via_http,
+            "shards": args.shards,
+        }
+        stats, ranked = run_isolated(config)
+        path = golden_path(args.fixtures, args.session, size)
+
+        if args.update_golden:
+            if args.error_rate:
+                print("error: golden rankings must come from an error-free run", file=sys.stderr)
+                return 2
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            golden_frame(ranked).to_csv(path)
+            stats["golden"] = "updated"
+        elif args.error_rate:
+            # Injected failures drop tickers, so the ranking is not comparable
+            stats["golden"] = "skipped"
+        else:
+            mismatch = compare_golden(ranked, path)
+            stats["golden"] = "ok" if mismatch is None else "mismatch"
+            if mismatch:
+                failed = True
+                print(f"golden mismatch for {size} tickers: {mismatch}", file=sys.stderr)
+
+        all_stats.append(stats)
+        print(f"{format_stats(stats)}  golden {stats['golden']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(all_stats, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
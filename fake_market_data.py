@@ -0,0 +1,241 @@
+"""Offline market-data provider for QuantScore™ scans, served from fixtures
+
+Fixtures are {ticker: {"1d": bars, "1m": bars, "info": dict}}. They are either recorded once from
+Yahoo with record_fixtures() or synthesized deterministically with synthesize_fixtures(). Universes
+larger than the fixture set are served by cloning fixtures under suffixed names ("AAPL-3") with
+scaled volume, so 10,000-ticker benchmarks need only a few hundred recorded tickers.
+"""
+import random
+import threading
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from market_data import BAR_COLUMNS, ET, FUNDAMENTAL_FIELDS, MarketDataProvider, YFinanceProvider, empty_bars
+
+# Synthetic fixtures end on a fixed, already-completed trading day so their results never drift
+SYNTHETIC_END_DATE = "2026-10-09"
+SYNTHETIC_DAILY_BARS = 63
+SYNTHETIC_MINUTE_DAYS = 2
+
+# Trading days per month when a "Nmo" period is served from fixtures
+TRADING_DAYS_PER_MONTH = 21
+
+
+class FakeProviderError(Exception):
+    """Injected provider failure"""
+
+
+def _ticker_rng(ticker, salt=0):
+    return np.random.default_rng(zlib.crc32(ticker.encode()) + salt)
+
+
+def _synthesize_ticker(ticker, end_date):
+    """Build one ticker's daily bars, two days of pre/post minute bars and fundamentals"""
+    rng = _ticker_rng(ticker)
+    days = pd.bdate_range(end=end_date, periods=SYNTHETIC_DAILY_BARS)
+    price = float(rng.uniform(1, 60))
+    drift = rng.uniform(-0.01, 0.02)
+    base_volume = float(10 ** rng.uniform(4.5, 7.5))
+
+    # Completed days before the minute-bar window are plain daily bars
+    n_daily = SYNTHETIC_DAILY_BARS - SYNTHETIC_MINUTE_DAYS
+    closes = price * np.exp(np.cumsum(rng.normal(drift, 0.04, n_daily)))
+    opens = np.r_[price, closes[:-1]] * np.exp(rng.normal(0, 0.01, n_daily))
+    daily = pd.DataFrame({
+        'Open': opens,
+        'High': np.maximum(opens, closes) * (1 + rng.uniform(0, 0.03, n_daily)),
+        'Low': np.minimum(opens, closes) * (1 - rng.uniform(0, 0.03, n_daily)),
+        'Close': closes,
+        'Volume': np.round(base_volume * rng.lognormal(0, 0.5, n_daily)),
+    }, index=days[:n_daily].tz_localize(ET))
+
+    # The last days get 4:00-20:00 minute bars (with gaps for thin names) opening on a gap
+    minute_frames = []
+    last_close = closes[-1]
+    for day in days[n_daily:]:
+        session = pd.date_range(day + pd.Timedelta(hours=4), day + pd.Timedelta(hours=19, minutes=59), freq="1min")
+        session = session[rng.random(len(session)) < rng.uniform(0.3, 1.0)].tz_localize(ET)
+        gap = rng.normal(0, 0.05)
+        path = last_close * (1 + gap) * np.exp(np.cumsum(rng.normal(drift / 390, 0.002, len(session))))
+        opens = np.r_[last_close * (1 + gap), path[:-1]]
+        minute_frames.append(pd.DataFrame({
+            'Open': opens,
+            'High': np.maximum(opens, path) * (1 + rng.uniform(0, 0.002, len(session))),
+            'Low': np.minimum(opens, path) * (1 - rng.uniform(0, 0.002, len(session))),
+            'Close': path,
+            'Volume': np.round(base_volume / 390 * rng.lognormal(0, 1, len(session))),
+        }, index=session))
+        last_close = path[-1]
+    minute = pd.concat(minute_frames)
+
+    # Daily bars for the minute-bar days are the regular-hours aggregates, as Yahoo reports them
+    minutes_of_day = minute.index.hour * 60 + minute.index.minute
+    regular = minute[(minutes_of_day >= 9 * 60 + 30) & (minutes_of_day < 16 * 60)]
+    by_day = regular.groupby(regular.index.normalize())
+    daily = pd.concat([daily, pd.DataFrame({
+        'Open': by_day['Open'].first(),
+        'High': by_day['High'].max(),
+        'Low': by_day['Low'].min(),
+        'Close': by_day['Close'].last(),
+        'Volume': by_day['Volume'].sum(),
+    })])
+
+    shares_outstanding = float(np.round(10 ** rng.uniform(6, 8.5)))
+    info = {
+        'marketCap': float(np.round(shares_outstanding * last_close)) if rng.random() > 0.1 else None,
+        'floatShares': float(np.round(shares_outstanding * rng.uniform(0.3, 0.95))) if rng.random() > 0.1 else None,
+        'sharesOutstanding': shares_outstanding,
+    }
+    return {"1d": daily, "1m": minute, "info": info}
+
+
+def synthesize_fixtures(tickers, end_date=SYNTHETIC_END_DATE):
+    """Return deterministic synthetic fixtures for tickers (same ticker, same bars, every run)"""
+    return {ticker: _synthesize_ticker(ticker, end_date) for ticker in tickers}
+
+
+def record_fixtures(tickers, path, daily_period="3mo", minute_period="5d"):
+    """Record daily bars, pre/post minute bars and fundamentals from Yahoo into a fixture file"""
+    provider = YFinanceProvider(timeout=10)
+    fixtures = {}
+    for ticker in tickers:
+        try:
+            daily = provider.history(ticker, "1d", period=daily_period)
+            minute = provider.history(ticker, "1m", prepost=True, period=minute_period)
+            info = provider.info(ticker)
+        except Exception:
+            continue
+        if daily.empty:
+            continue
+        fixtures[ticker] = {
+            "1d": daily[BAR_COLUMNS],
+            "1m": minute[BAR_COLUMNS] if not minute.empty else minute,
+            "info": {field: info.get(field) for field in FUNDAMENTAL_FIELDS},
+        }
+    pd.to_pickle(fixtures, path)
+    return fixtures
+
+
+def load_fixtures(path):
+    """Load a fixture file written by record_fixtures()"""
+    return pd.read_pickle(path)
+
+
+def expand_universe(base_tickers, size):
+    """Return size ticker names: the fixture tickers first, then clones named TICKER-k"""
+    universe = list(base_tickers[:size])
+    clone = 1
+    while len(universe) < size:
+        universe.extend(f"{ticker}-{clone}" for ticker in base_tickers[:size - len(universe)])
+        clone += 1
+    return universe
+
+
+def _select_period(bars, period):
+    """Trim bars to a yfinance-style period ("2d", "5d", "3mo") counted in trading dates"""
+    if bars.empty or period is None:
+        return bars
+    if period.endswith("mo"):
+        days = int(period[:-2]) * TRADING_DAYS_PER_MONTH
+    elif period.endswith("d"):
+        days = int(period[:-1])
+    else:
+        return bars
+    dates = bars.index.normalize()
+    return bars[dates.isin(dates.unique()[-days:])]
+
+
+class FakeMarketData(MarketDataProvider):
+    """Provider serving fixtures, with injectable latency and failures
+
+    latency is slept once per request, error_rate is the chance a request (or one ticker of a
+    grouped download) fails. The first request time of every ticker is kept in first_request so
+    benchmarks can measure per-ticker latency.
+    """
+
+    name = "fixtures"
+
+    def __init__(self, fixtures, latency=0.0, error_rate=0.0, seed=0, capabilities=None):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.error_rate = error_rate
+        # Behaves like yfinance unless told otherwise, so benchmarks exercise the same strategy
+        self.capabilities = capabilities or YFinanceProvider.capabilities
+        self.requests = 0
+        self.first_request = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _resolve(self, ticker):
+        """Return (fixture, volume scale) for a fixture ticker or one of its clones"""
+        if ticker in self.fixtures:
+            return self.fixtures[ticker], 1.0
+        base, _, clone = ticker.rpartition("-")
+        if base in self.fixtures and clone.isdigit():
+            # Clones differ in volume so they rarely tie on score
+            return self.fixtures[base], 1.0 + int(clone) / 64
+        return None, 1.0
+
+    def _begin_request(self, tickers):
+        now = time.perf_counter()
+        with self._lock:
+            self.requests += 1
+            for ticker in tickers:
+                self.first_request.setdefault(ticker, now)
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _fails(self):
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+    def bars(self, ticker, interval, prepost=False, period=None, start=None):
+        """Return a ticker's fixture bars for these history() arguments, without latency or failures"""
+        fixture, volume_scale = self._resolve(ticker)
+        if fixture is None or interval not in fixture:
+            return empty_bars()
+
+        bars = fixture[interval]
+        if not prepost and interval != "1d" and not bars.empty:
+            minutes = bars.index.hour * 60 + bars.index.minute
+            bars = bars[(minutes >= 9 * 60 + 30) & (minutes < 16 * 60)]
+        if start is not None:
+            start = pd.Timestamp(start)
+            bars = bars[bars.index >= (start.tz_localize(ET) if start.tzinfo is None else start)]
+        else:
+            bars = _select_period(bars, period)
+
+        if volume_scale != 1.0:
+            bars = bars.assign(Volume=np.round(bars['Volume'] * volume_scale))
+        return bars
+
+    def history(self, ticker, interval, prepost=False, period=None, start=None):
+        self._begin_request([ticker])
+        if self._fails():
+            raise FakeProviderError(f"injected history failure for {ticker}")
+        return self.bars(ticker, interval, prepost, period, start)
+
+    def download(self, tickers, interval, prepost=False, period=None, start=None):
+        """One grouped request; failed or unknown tickers are left out like Yahoo's empty columns"""
+        tickers = list(tickers)
+        self._begin_request(tickers)
+        bars = {}
+        for ticker in tickers:
+            if self._fails():
+                continue
+            frame = self.bars(ticker, interval, prepost, period, start)
+            if not frame.empty:
+                bars[ticker] = frame
+        return bars
+
+    def info(self, ticker):
+        self._begin_request([ticker])
+        if self._fails():
+            raise FakeProviderError(f"injected info failure for {ticker}")
+        fixture, _ = self._resolve(ticker)
+        return dict(fixture["info"]) if fixture else {}
@@ -0,0 +1,163 @@
+"""Persistent fundamentals cache for QuantScore™ scans"""
+import os
+import sqlite3
+import threading
+import time
+import concurrent.futures
+
+import yfinance as yf
+
+# Cache files live next to the app unless QUANTSCORE_CACHE_DIR points elsewhere
+CACHE_DIR = os.environ.get(
+    "QUANTSCORE_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+)
+
+# How long each stock.info field stays fresh, in seconds
+FIELD_TTLS = {
+    'marketCap': 24 * 3600,             # Moves with price, refresh daily
+    'floatShares': 7 * 24 * 3600,       # Changes only on offerings/buybacks
+    'sharesOutstanding': 7 * 24 * 3600,
+}
+
+DAILY_REFRESH_SECONDS = 24 * 3600
+
+
+def fetch_yahoo_info(ticker):
+    """Fetch the raw stock.info dict from Yahoo Finance"""
+    return yf.Ticker(ticker).info
+
+
+class FundamentalsCache:
+    """SQLite-backed store of marketCap / floatShares / sharesOutstanding with per-field TTLs"""
+
+    def __init__(self, path=None, field_ttls=None, fetch_info=fetch_yahoo_info):
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, "fundamentals.sqlite")
+        self.path = path
+        self.field_ttls = dict(field_ttls or FIELD_TTLS)
+        self.fetch_info = fetch_info
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+        self._stop = threading.Event()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS fundamentals (
+                    ticker TEXT NOT NULL,
+                    field TEXT NOT NULL,
+                    value REAL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (ticker, field)
+                )
+            """)
+
+    def _read(self, ticker):
+        """Return {field: (value, fetched_at)} for a ticker"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT field, value, fetched_at FROM fundamentals WHERE ticker = ?", (ticker,)
+            ).fetchall()
+        return {field: (value, fetched_at) for field, value, fetched_at in rows}
+
+    def _is_fresh(self, stored, now, horizon=0):
+        """Check every tracked field is present and will not expire within horizon seconds"""
+        for field, ttl in self.field_ttls.items():
+            if field not in stored or stored[field][1] + ttl <= now + horizon:
+                return False
+        return True
+
+    @staticmethod
+    def _as_info(stored):
+        """Convert stored rows to a stock.info-style dict (missing values are left out)"""
+        return {field: value for field, (value, _) in stored.items() if value is not None}
+
+    def store(self, ticker, info, now=None):
+        """Write the tracked fields of a stock.info dict"""
+        now = time.time() if now is None else now
+        rows = []
+        for field in self.field_ttls:
+            value = info.get(field)
+            if value is not None:
+                try:
+                    value = float(value)
+                except (TypeError, ValueError):
+                    value = None
+            rows.append((ticker, field, value, now))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO fundamentals (ticker, field, value, fetched_at) VALUES (?, ?, ?, ?)",
+                rows
+            )
+
+    def get_cached(self, ticker):
+        """Return cached fundamentals for a ticker if they are all fresh, else None"""
+        stored = self._read(ticker)
+        if self._is_fresh(stored, time.time()):
+            return self._as_info(stored)
+        return None
+
+    def get_stored(self, ticker):
+        """Return whatever fundamentals are stored for a ticker, fresh or not (None if never fetched)"""
+        stored = self._read(ticker)
+        return self._as_info(stored) if stored else None
+
+    def get_info(self, ticker):
+        """Return fundamentals from the store, fetching only when missing or expired"""
+        stored = self._read(ticker)
+        if self._is_fresh(stored, time.time()):
+            return self._as_info(stored)
+
+        try:
+            info = self.fetch_info(ticker)
+        except Exception:
+            # Serve stale values rather than dropping the ticker from the scan
+            if stored:
+                return self._as_info(stored)
+            raise
+
+        self.store(ticker, info)
+        return self._as_info(self._read(ticker))
+
+    def stale_tickers(self, tickers, horizon=0):
+        """Return the tickers whose fundamentals are missing or expire within horizon seconds"""
+        now = time.time()
+        return [ticker for ticker in tickers if not self._is_fresh(self._read(ticker), now, horizon)]
+
+    def refresh(self, tickers, horizon=0, max_workers=4):
+        """Fetch fundamentals for every missing or expiring ticker; returns the number refreshed"""
+        stale = self.stale_tickers(tickers, horizon)
+        refreshed = 0
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self.fetch_info, ticker): ticker for ticker in stale}
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    self.store(futures[future], future.result())
+                    refreshed += 1
+                except Exception:
+                    continue
+        return refreshed
+
+    def start_daily_refresh(self, get_tickers, interval=DAILY_REFRESH_SECONDS):
+        """Start a daemon thread that refreshes the universe's fundamentals once per interval"""
+        if self._refresh_thread and self._refresh_thread.is_alive():
+            return
+
+        def refresh_loop():
+            while not self._stop.is_set():
+                try:
+                    # Refresh anything expiring before the next pass so scans rarely see expired rows
+                    self.refresh(get_tickers(), horizon=interval)
+                except Exception:
+                    pass
+                self._stop.wait(interval)
+
+        self._refresh_thread = threading.Thread(target=refresh_loop, name="fundamentals-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def stop(self):
+        """Stop the background refresh thread"""
+        self._stop.set()
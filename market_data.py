@@ -0,0 +1,180 @@
+"""Market-data providers QuantScore™ scans fetch bars and fundamentals from
+
+A provider serves OHLCV bars (daily, and 1-minute with pre/post-market) and the fundamentals a
+scan filters on. Each one declares its capabilities so the scan engine can pick the fastest
+fetch strategy for it: grouped downloads when the provider batches, per-ticker calls on a
+thread pool sized to what the provider tolerates otherwise.
+"""
+import json
+import os
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import pytz
+import yfinance as yf
+
+ET = pytz.timezone('US/Eastern')
+
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+FUNDAMENTAL_FIELDS = ['marketCap', 'floatShares', 'sharesOutstanding']
+
+# Point every scan at a market-data HTTP server instead of Yahoo
+PROVIDER_URL = os.environ.get("QUANTSCORE_PROVIDER_URL")
+
+# batch_bars: download() fetches many tickers in one request
+# max_batch_size: most tickers per download() request (None for no limit)
+# max_concurrency: most requests the provider should see in flight at once
+# concurrent_batches: several download() requests may run at the same time
+ProviderCapabilities = namedtuple('ProviderCapabilities', [
+    'batch_bars', 'max_batch_size', 'max_concurrency', 'concurrent_batches'
+])
+
+
+class MarketDataError(Exception):
+    """A provider request failed"""
+
+
+def empty_bars():
+    return pd.DataFrame(columns=BAR_COLUMNS, dtype=float)
+
+
+class MarketDataProvider:
+    """Base provider: per-ticker history() and info(), with download() looping over history()
+
+    Bars come back as a DataFrame of BAR_COLUMNS indexed by tz-aware timestamp, exactly like
+    yfinance's history(). period is a yfinance period ("5d", "3mo"); start, when given instead,
+    asks for bars at or after that time.
+    """
+
+    name = "base"
+    capabilities = ProviderCapabilities(batch_bars=False, max_batch_size=None, max_concurrency=8,
+                                        concurrent_batches=False)
+
+    def history(self, ticker, interval, prepost=False, period=None, start=None):
+        raise NotImplementedError
+
+    def download(self, tickers, interval, prepost=False, period=None, start=None):
+        """Return {ticker: bars} for a group of tickers; tickers that fail are left out"""
+        bars = {}
+        for ticker in tickers:
+            try:
+                bars[ticker] = self.history(ticker, interval, prepost, period, start)
+            except Exception:
+                continue
+        return bars
+
+    def info(self, ticker):
+        """Return a stock.info-style dict with at least FUNDAMENTAL_FIELDS where known"""
+        raise NotImplementedError
+
+
+def split_download_frame(frame, ticker):
+    """Extract one ticker's bars from a grouped yf.download() frame"""
+    if frame is None or frame.empty:
+        return pd.DataFrame()
+
+    if isinstance(frame.columns, pd.MultiIndex):
+        if ticker not in frame.columns.get_level_values(0):
+            return pd.DataFrame()
+        bars = frame[ticker]
+    else:
+        bars = frame
+
+    # Grouped downloads are outer-joined on time, so drop rows this ticker never traded
+    return bars.dropna(how='all')
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Yahoo Finance through yfinance"""
+
+    name = "yfinance"
+    # yf.download() keeps module-level state, so grouped downloads must run one at a time
+    capabilities = ProviderCapabilities(batch_bars=True, max_batch_size=None, max_concurrency=32,
+                                        concurrent_batches=False)
+
+    def __init__(self, timeout=3):
+        self.timeout = timeout
+
+    def history(self, ticker, interval, prepost=False, period=None, start=None):
+        fetch_args = {"start": start} if start is not None else {"period": period}
+        return yf.Ticker(ticker).history(interval=interval, prepost=prepost, timeout=self.timeout, **fetch_args)
+
+    def download(self, tickers, interval, prepost=False, period=None, start=None):
+        fetch_args = {"start": start} if start is not None else {"period": period}
+        frame = yf.download(list(tickers), interval=interval, prepost=prepost, group_by="ticker", auto_adjust=True,
+                            threads=True, progress=False, timeout=self.timeout, **fetch_args)
+        return {ticker: split_download_frame(frame, ticker) for ticker in tickers}
+
+    def info(self, ticker):
+        return yf.Ticker(ticker).info
+
+
+def bars_to_payload(bars):
+    """Serialize bars to a JSON-friendly dict of UTC nanosecond timestamps and column lists"""
+    if bars is None or bars.empty:
+        return {"ts": [], **{column: [] for column in BAR_COLUMNS}}
+    index = bars.index.tz_localize(ET) if bars.index.tz is None else bars.index
+    return {
+        "ts": index.tz_convert('UTC').as_unit('ns').asi8.tolist(),
+        **{column: bars[column].to_numpy(dtype=np.float64).tolist() for column in BAR_COLUMNS},
+    }
+
+
+def bars_from_payload(payload):
+    """Rebuild bars serialized by bars_to_payload(), indexed by ET timestamp"""
+    if not payload.get("ts"):
+        return empty_bars()
+    index = pd.DatetimeIndex(pd.to_datetime(payload["ts"], unit='ns', utc=True)).tz_convert(ET)
+    return pd.DataFrame({column: np.asarray(payload[column], dtype=np.float64) for column in BAR_COLUMNS}, index=index)
+
+
+class HTTPProvider(MarketDataProvider):
+    """Client for a market-data HTTP server such as the local stand-in in market_data_server.py
+
+    The server exposes GET /capabilities, GET /bars?tickers=A,B&interval=..&prepost=..&period=..|start=..
+    returning {ticker: bars payload}, and GET /info?ticker=A returning the fundamentals dict.
+    """
+
+    name = "http"
+
+    def __init__(self, base_url, timeout=10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.capabilities = ProviderCapabilities(**self._get("/capabilities"))
+
+    def _get(self, path, **params):
+        url = f"{self.base_url}{path}"
+        if params:
+            url += "?" + urllib.parse.urlencode({key: value for key, value in params.items() if value is not None})
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except (urllib.error.URLError, OSError, ValueError) as exc:
+            raise MarketDataError(f"{url}: {exc}") from exc
+
+    def _bars(self, tickers, interval, prepost, period, start):
+        payload = self._get("/bars", tickers=",".join(tickers), interval=interval, prepost=int(bool(prepost)),
+                            period=period if start is None else None,
+                            start=pd.Timestamp(start).isoformat() if start is not None else None)
+        return {ticker: bars_from_payload(bars) for ticker, bars in payload.items()}
+
+    def history(self, ticker, interval, prepost=False, period=None, start=None):
+        bars = self._bars([ticker], interval, prepost, period, start)
+        if ticker not in bars:
+            raise MarketDataError(f"no bars for {ticker}")
+        return bars[ticker]
+
+    def download(self, tickers, interval, prepost=False, period=None, start=None):
+        return self._bars(list(tickers), interval, prepost, period, start)
+
+    def info(self, ticker):
+        return self._get("/info", ticker=ticker)
+
+
+def default_provider():
+    """The HTTP provider at QUANTSCORE_PROVIDER_URL when set, else yfinance"""
+    return HTTPProvider(PROVIDER_URL) if PROVIDER_URL else YFinanceProvider()
@@ -0,0 +1,106 @@
+"""Local HTTP stand-in market-data server for load tests and latency experiments
+
+Serves any MarketDataProvider over the protocol HTTPProvider speaks; run as a script it serves
+benchmark fixtures (synthetic unless --fixtures is given) with optional injected latency/errors.
+
+Example:
+    python market_data_server.py --port 8765 --latency 0.05
+    python scan_cli.py --provider http://127.0.0.1:8765 --session regular
+"""
+import argparse
+import json
+import sys
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from market_data import ProviderCapabilities, YFinanceProvider, bars_to_payload
+
+
+class MarketDataHandler(BaseHTTPRequestHandler):
+    """Answers /capabilities, /bars and /info from the server's provider"""
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        params = {key: values[-1] for key, values in urllib.parse.parse_qs(url.query).items()}
+        provider = self.server.provider
+
+        try:
+            if url.path == "/capabilities":
+                body = provider.capabilities._asdict()
+            elif url.path == "/bars":
+                tickers = [ticker for ticker in params.get("tickers", "").split(",") if ticker]
+                bars = provider.download(tickers, params.get("interval", "1d"), params.get("prepost") == "1",
+                                         params.get("period"), params.get("start"))
+                body = {ticker: bars_to_payload(frame) for ticker, frame in bars.items()}
+            elif url.path == "/info":
+                info = provider.info(params["ticker"])
+                body = {key: value for key, value in info.items() if isinstance(value, (int, float, str, type(None)))}
+            else:
+                self.send_error(404)
+                return
+        except Exception as exc:
+            self.send_error(503, f"{type(exc).__name__}: {exc}")
+            return
+
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        # Request logs would swamp load tests
+        pass
+
+
+def make_server(provider, host="127.0.0.1", port=0):
+    """Create a threaded server for provider (port 0 picks a free port)"""
+    server = ThreadingHTTPServer((host, port), MarketDataHandler)
+    server.daemon_threads = True
+    server.provider = provider
+    return server
+
+
+def start_server_thread(provider, host="127.0.0.1", port=0):
+    """Serve provider on a daemon thread; returns (server, base_url)"""
+    server = make_server(provider, host, port)
+    threading.Thread(target=server.serve_forever, name="market-data-server", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main(argv=None):
+    import fake_market_data
+    from scan_engine import EXTENDED_UNIVERSE
+
+    parser = argparse.ArgumentParser(description="Serve fixture market data over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", help="recorded fixture file (default: synthetic fixtures)")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds slept per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="chance a request fails")
+    # Advertised capabilities, to see how scans adapt to providers unlike yfinance
+    parser.add_argument("--no-batching", action="store_true", help="advertise per-ticker bar requests only")
+    parser.add_argument("--max-batch-size", type=int, help="most tickers per grouped bar request")
+    parser.add_argument("--max-concurrency", type=int, default=YFinanceProvider.capabilities.max_concurrency)
+    parser.add_argument("--concurrent-batches", action="store_true", help="allow grouped requests in parallel")
+    args = parser.parse_args(argv)
+
+    fixtures = (fake_market_data.load_fixtures(args.fixtures) if args.fixtures
+                else fake_market_data.synthesize_fixtures(EXTENDED_UNIVERSE))
+    capabilities = ProviderCapabilities(batch_bars=not args.no_batching, max_batch_size=args.max_batch_size,
+                                        max_concurrency=args.max_concurrency,
+                                        concurrent_batches=args.concurrent_batches)
+    provider = fake_market_data.FakeMarketData(fixtures, args.latency, args.error_rate, capabilities=capabilities)
+    server = make_server(provider, args.host, args.port)
+    print(f"serving {len(fixtures)} fixture tickers on http://{args.host}:{server.server_address[1]}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
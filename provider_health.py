@@ -0,0 +1,237 @@
+"""Provider failure handling for QuantScore™ scans: a quarantine of dead or failing symbols and a circuit breaker
+
+Symbols that are delisted or renamed fail the same way on every scan. The quarantine is a
+negative cache keyed by symbol: after repeated failures a symbol is left out of scans for a
+backoff period that doubles with every further failure, so scan time is not spent proving
+again that it is dead. The circuit breaker watches the error rate of every provider request
+and refuses requests for a cool-down when it spikes, so an outage costs one fast failure per
+request instead of a timeout each.
+"""
+import threading
+import time
+import urllib.error
+from collections import deque
+
+from market_data import MarketDataError
+from scan_metrics import is_timeout
+
+# Why a request for a symbol failed: the provider had no data for it, it timed out, it answered
+# with an HTTP error, or anything else
+FAILURE_REASONS = ["no_data", "timeout", "http_error", "error"]
+
+# Consecutive failures before a symbol is quarantined, so one transient failure never drops it
+QUARANTINE_AFTER_FAILURES = 2
+
+# First quarantine period per failure reason, in seconds; missing data rarely comes back soon
+QUARANTINE_BASE_SECONDS = {
+    "no_data": 3600,
+    "timeout": 300,
+    "http_error": 600,
+    "error": 300,
+}
+# Longest quarantine, however often a symbol failed
+QUARANTINE_MAX_SECONDS = 24 * 3600
+
+# The breaker opens when BREAKER_ERROR_RATE of the requests in the last BREAKER_WINDOW_SECONDS
+# failed, once at least BREAKER_MIN_REQUESTS were made, and refuses requests for BREAKER_COOLDOWN_SECONDS
+BREAKER_WINDOW_SECONDS = 60
+BREAKER_MIN_REQUESTS = 20
+BREAKER_ERROR_RATE = 0.5
+BREAKER_COOLDOWN_SECONDS = 30
+
+
+class NoDataError(MarketDataError):
+    """The provider answered but has no data for the symbol"""
+
+
+class CircuitOpenError(MarketDataError):
+    """A request was refused because the provider's circuit breaker is open"""
+
+
+def classify_failure(exc):
+    """Failure reason (one of FAILURE_REASONS) of an exception, following its chain of causes"""
+    while exc is not None:
+        if isinstance(exc, NoDataError) or "delisted" in str(exc).lower():
+            return "no_data"
+        if is_timeout(exc):
+            return "timeout"
+        # urllib's HTTPError, or requests-style errors that carry the response
+        if isinstance(exc, urllib.error.HTTPError) or getattr(getattr(exc, "response", None), "status_code", None):
+            return "http_error"
+        exc = exc.__cause__
+    return "error"
+
+
+class _Failures:
+    """Failure history of one symbol"""
+
+    def __init__(self):
+        self.count = 0
+        self.reason = None
+        self.detail = ""
+        self.until = 0.0
+
+
+class SymbolQuarantine:
+    """Negative cache of failing symbols with exponential backoff
+
+    Every failed request is recorded against its symbol with its reason. From the
+    QUARANTINE_AFTER_FAILURES-th consecutive failure on, the symbol is quarantined for the
+    reason's base period, doubled for every further failure up to QUARANTINE_MAX_SECONDS. Once
+    a quarantine ends the next scan tries the symbol again; a success clears its history.
+    """
+
+    def __init__(self, after_failures=QUARANTINE_AFTER_FAILURES, base_seconds=None,
+                 max_seconds=QUARANTINE_MAX_SECONDS):
+        self.after_failures = after_failures
+        self.base_seconds = dict(base_seconds or QUARANTINE_BASE_SECONDS)
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+        self._failures = {}  # ticker -> _Failures
+
+    def is_quarantined(self, ticker, now=None):
+        failures = self._failures.get(ticker)
+        if failures is None:
+            return False
+        return failures.until > (time.time() if now is None else now)
+
+    def record_failure(self, ticker, reason, detail="", now=None):
+        """Count a failed request for a symbol; returns True if that quarantined it"""
+        now = time.time() if now is None else now
+        with self._lock:
+            failures = self._failures.setdefault(ticker, _Failures())
+            failures.count += 1
+            failures.reason = reason
+            failures.detail = str(detail)[:200]
+            if failures.count < self.after_failures:
+                return False
+            backoff = self.base_seconds.get(reason, self.base_seconds["error"]) * 2 ** (failures.count - self.after_failures)
+            failures.until = now + min(backoff, self.max_seconds)
+            return True
+
+    def record_success(self, tickers):
+        """Clear the failure history of symbols (one ticker or a list) that returned data"""
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        if not self._failures:
+            return
+        with self._lock:
+            for ticker in tickers:
+                self._failures.pop(ticker, None)
+
+    def entries(self, now=None):
+        """Quarantined symbols, longest quarantine first, as dicts of ticker, reason, failures, detail and until"""
+        now = time.time() if now is None else now
+        with self._lock:
+            entries = [{"ticker": ticker, "reason": failures.reason, "failures": failures.count,
+                        "detail": failures.detail, "until": failures.until}
+                       for ticker, failures in self._failures.items() if failures.until > now]
+        return sorted(entries, key=lambda entry: entry["until"], reverse=True)
+
+    def release(self, tickers=None):
+        """Forget the failures of symbols (all of them when tickers is None)"""
+        with self._lock:
+            if tickers is None:
+                self._failures.clear()
+            else:
+                for ticker in tickers:
+                    self._failures.pop(ticker, None)
+
+
+class CircuitBreaker:
+    """Provider-wide circuit breaker over a sliding window of request outcomes
+
+    Closed, requests flow and their outcomes are tracked. When the error rate of the window
+    crosses the threshold it opens: every request is refused with CircuitOpenError until the
+    cool-down ends. It is then half-open: one trial request goes through, and its success closes
+    the breaker while its failure opens it for another cool-down. allow() hands every request a
+    ticket and record() takes it back with the outcome, so outcomes of requests admitted before
+    the breaker opened (a scan has many in flight) are ignored instead of deciding the trial.
+    """
+
+    def __init__(self, window=BREAKER_WINDOW_SECONDS, min_requests=BREAKER_MIN_REQUESTS,
+                 error_rate=BREAKER_ERROR_RATE, cooldown=BREAKER_COOLDOWN_SECONDS):
+        self.window = window
+        self.min_requests = min_requests
+        self.error_rate = error_rate
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._outcomes = deque()  # (monotonic time, failed)
+        self._failed = 0
+        self._opened_at = None
+        # Bumped every time the breaker opens; the ticket of a request admitted while closed
+        self._generation = 0
+        # Ticket of the half-open trial request in flight, if any
+        self._trial = None
+        self.trips = 0
+
+    def _prune(self, now):
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            _, failed = self._outcomes.popleft()
+            self._failed -= failed
+
+    def _open(self, now):
+        self._opened_at = now
+        self._generation += 1
+        self.trips += 1
+
+    def allow(self, now=None):
+        """Ticket for a request that may be made now, or None; in half-open state only the one trial gets one"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._opened_at is None:
+                return self._generation
+            if now - self._opened_at < self.cooldown or self._trial is not None:
+                return None
+            self._trial = object()
+            return self._trial
+
+    def record(self, ticket, failed, now=None):
+        """Record the outcome of the request allow() gave ticket to"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._trial is not None and ticket is self._trial:
+                # The half-open trial decides: close on success, reopen on failure
+                self._trial = None
+                if failed:
+                    self._open(now)
+                else:
+                    self._opened_at = None
+                    self._outcomes.clear()
+                    self._failed = 0
+                return
+            if self._opened_at is not None or ticket != self._generation:
+                # Admitted before the breaker last opened; its outcome is stale
+                return
+            self._outcomes.append((now, failed))
+            self._failed += failed
+            self._prune(now)
+            if len(self._outcomes) >= self.min_requests and self._failed >= self.error_rate * len(self._outcomes):
+                self._open(now)
+
+    def call(self, fn, *args, **kwargs):
+        """fn(*args, **kwargs) as one provider request, refused with CircuitOpenError while the breaker is open"""
+        ticket = self.allow()
+        if ticket is None:
+            raise CircuitOpenError("provider circuit breaker is open")
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record(ticket, True)
+            raise
+        self.record(ticket, False)
+        return result
+
+    def status(self, now=None):
+        """State ("closed", "open" or "half-open"), window error rate and requests, seconds until a retry, trips"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._prune(now)
+            if self._opened_at is None:
+                state, retry_in = "closed", 0.0
+            else:
+                retry_in = max(0.0, self._opened_at + self.cooldown - now)
+                state = "open" if retry_in > 0 else "half-open"
+            requests = len(self._outcomes)
+            return {"state": state, "error_rate": self._failed / requests if requests else 0.0,
+                    "requests": requests, "retry_in": retry_in, "trips": self.trips}
@@ -0,0 +1,218 @@
+"""Priority-based per-ticker refresh scheduling for QuantScore™ scans under a request budget"""
+import bisect
+import heapq
+import itertools
+import math
+import threading
+import time
+
+from scan_engine import filter_proximity, float_closeness, get_session_history_requests
+
+# Refresh interval of the hottest tickers (qualified, or at the filter thresholds) and of the coldest
+HOT_REFRESH_SECONDS = 5
+COLD_REFRESH_SECONDS = 600
+
+# Provider requests the refresh loop may spend per minute, across all tickers
+REQUEST_BUDGET_PER_MINUTE = 600
+
+# How often the refresh loop wakes to scan the tickers that came due
+REFRESH_TICK_SECONDS = 5
+
+# Heat from which a ticker counts as hot, and below which as cold, in summaries
+HOT_HEAT = 0.75
+COLD_HEAT = 0.25
+
+# A move this large (change %) makes a small cap hot before it crosses the session's gap threshold
+HOT_MOVE_PCT = 10.0
+
+# Heat of the weakest qualifier on the board: qualifiers range from it up to 1 by QuantScore™
+# rank, and tickers that did not qualify from 0 up to it by how close they came
+QUALIFIED_HEAT = 0.9
+
+# Refresh intervals stretch in quieter sessions; daily-only sessions change little between scans
+SESSION_PACE = {
+    "premarket": 1.0,
+    "regular": 1.0,
+    "afterhours": 1.5,
+    "overnight": 6.0,
+    "weekend": 20.0,
+}
+
+
+def ticker_heat(data, session_type, score_rank=None):
+    """How close a ticker is to qualifying, from 0 (dormant, or ruled out early) to 1 (the best qualifier)
+
+    A qualified ticker's heat follows score_rank, its QuantScore™ percentile on the board
+    (1 = best), from QUALIFIED_HEAT up. Below that, heat combines the distance to the float, RSI
+    and session move thresholds with how volatile the ticker is, so near misses come before names
+    that are far off; data is the session data of its last scan, None if a stage screened it out.
+    """
+    if score_rank is not None:
+        return QUALIFIED_HEAT + (1.0 - QUALIFIED_HEAT) * score_rank
+    if not data:
+        return 0.0
+    volatility = min(1.0, abs(data['change_pct']) / HOT_MOVE_PCT) * float_closeness(data['float_shares'])
+    return QUALIFIED_HEAT * max(filter_proximity(data, session_type), volatility)
+
+
+def estimate_requests(tickers, session_type, fetch_mode, batch_size, shards=1):
+    """Upper bound on the provider requests a scan of this many tickers makes (fundamentals come from cache)"""
+    intraday_request, _ = get_session_history_requests(session_type)
+    intervals = 2 if intraday_request else 1
+    if fetch_mode == "per-ticker":
+        return tickers * intervals
+    # Every shard downloads its share of the tickers in groups of batch_size
+    return intervals * min(tickers, shards * math.ceil(tickers / (shards * batch_size)))
+
+
+def refresh_interval(heat, session_type, hot=HOT_REFRESH_SECONDS, cold=COLD_REFRESH_SECONDS):
+    """Seconds until a ticker with this heat is refreshed again (geometric between hot and cold)"""
+    return hot * (cold / hot) ** (1.0 - heat) * SESSION_PACE.get(session_type, 1.0)
+
+
+class RefreshQueue:
+    """Per-ticker refresh schedule: a min-heap of due times plus a token bucket of provider requests
+
+    Every ticker scanned gets its next due time from its heat, so tickers near or past the
+    filters come round every few seconds and the cold tail every few minutes. take_due() hands
+    out the most overdue tickers the request budget can pay for; the rest wait for the next tick.
+    The latest qualified row of every ticker makes up the live board.
+    """
+
+    def __init__(self, budget_per_minute=REQUEST_BUDGET_PER_MINUTE, hot=HOT_REFRESH_SECONDS,
+                 cold=COLD_REFRESH_SECONDS):
+        self.budget_per_minute = budget_per_minute
+        self.hot = hot
+        self.cold = cold
+        self._lock = threading.Lock()
+        self._heap = []      # (due monotonic time, sequence, ticker); stale entries are skipped
+        self._due = {}       # ticker -> current due time
+        self._heat = {}      # ticker -> heat at its last refresh
+        self._rows = {}      # ticker -> latest qualified row
+        self._sequence = itertools.count()
+        self._session_type = None
+        self._tokens = float(budget_per_minute)
+        self._refilled_at = None
+
+    def _schedule(self, ticker, due):
+        self._due[ticker] = due
+        heapq.heappush(self._heap, (due, next(self._sequence), ticker))
+
+    def set_universe(self, tickers, session_type, now=None):
+        """Track exactly these tickers in this session class; new ones are due immediately
+
+        A new session class changes what qualifies, so every ticker becomes due and the board is
+        cleared.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if session_type != self._session_type:
+                self._session_type = session_type
+                self._heap = []
+                self._due.clear()
+                self._heat.clear()
+                self._rows.clear()
+            wanted = set(tickers)
+            for ticker in [ticker for ticker in self._due if ticker not in wanted]:
+                # Heap entries of dropped tickers are skipped when popped
+                del self._due[ticker]
+                self._heat.pop(ticker, None)
+                self._rows.pop(ticker, None)
+            for ticker in tickers:
+                if ticker not in self._due:
+                    self._schedule(ticker, now)
+
+    def set_budget(self, budget_per_minute):
+        with self._lock:
+            self.budget_per_minute = budget_per_minute
+
+    def _refill(self, now):
+        elapsed = max(0.0, now - self._refilled_at) if self._refilled_at is not None else 0.0
+        self._refilled_at = now
+        self._tokens = min(float(self.budget_per_minute), self._tokens + elapsed * self.budget_per_minute / 60.0)
+
+    def take_due(self, request_cost, now=None):
+        """Pop the due tickers, most overdue first, whose refresh the request budget covers
+
+        request_cost(n) estimates the provider requests a scan of n tickers makes; its cost is
+        charged to the budget. Tickers that are due but unaffordable stay at the front.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._refill(now)
+            taken = []
+            while self._heap and self._heap[0][0] <= now:
+                due, _, ticker = self._heap[0]
+                if self._due.get(ticker) != due:
+                    heapq.heappop(self._heap)
+                    continue
+                if request_cost(len(taken) + 1) > self._tokens:
+                    break
+                heapq.heappop(self._heap)
+                # Parked until record() reschedules it, so a slow scan never hands it out twice
+                self._due[ticker] = math.inf
+                taken.append(ticker)
+            self._tokens -= request_cost(len(taken)) if taken else 0
+            return taken
+
+    def record(self, tickers, session_type, rows, session_data=None, skipped=(), now=None):
+        """Reschedule the tickers of a scan from their new results
+
+        rows are the qualified rows of the scan; session_data(ticker) returns the session data
+        of a ticker that did not qualify (None if unknown), so near misses stay warm. Tickers
+        the scan's time budget skipped were not scanned: they keep their row and heat and are
+        due again straight away.
+        """
+        now = time.monotonic() if now is None else now
+        qualified = {row['Ticker']: row for row in rows}
+        skipped = set(skipped)
+        with self._lock:
+            scanned = []
+            for ticker in tickers:
+                if ticker not in self._due:
+                    continue
+                if ticker in skipped:
+                    if self._due[ticker] == math.inf:
+                        self._schedule(ticker, now)
+                    continue
+                scanned.append(ticker)
+                if ticker in qualified:
+                    self._rows[ticker] = qualified[ticker]
+                else:
+                    self._rows.pop(ticker, None)
+            # Qualifiers are ranked against the whole board, not just this scan's share of it
+            board_scores = sorted(row['QuantScore™'] for row in self._rows.values())
+            for ticker in scanned:
+                row = qualified.get(ticker)
+                if row is not None:
+                    score_rank = bisect.bisect_right(board_scores, row['QuantScore™']) / len(board_scores)
+                    heat = ticker_heat(None, session_type, score_rank)
+                else:
+                    heat = ticker_heat(None if session_data is None else session_data(ticker), session_type)
+                self._heat[ticker] = heat
+                self._schedule(ticker, now + refresh_interval(heat, session_type, self.hot, self.cold))
+
+    def release(self, tickers, now=None):
+        """Make tickers whose scan failed due again"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            for ticker in tickers:
+                if self._due.get(ticker) == math.inf:
+                    self._schedule(ticker, now)
+
+    def rows(self):
+        """Latest qualified row of every tracked ticker"""
+        with self._lock:
+            return list(self._rows.values())
+
+    def summary(self, now=None):
+        """Counts of tracked, hot and cold tickers, tickers overdue, and the request budget left"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return {
+                "tracked": len(self._due),
+                "hot": sum(heat >= HOT_HEAT for heat in self._heat.values()),
+                "cold": sum(heat < COLD_HEAT for heat in self._heat.values()),
+                "due": sum(due <= now for due in self._due.values()),
+                "tokens": int(self._tokens),
+            }
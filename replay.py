@@ -0,0 +1,321 @@
+"""Historical QuantScore™ replay over stored bars
+
+Walks the bar store over a date range at a fixed step. At every step it rebuilds the inputs
+get_session_specific_data() would have produced at that moment and scores the whole universe
+in vectorized batches. Yahoo only serves a few days of 1-minute bars, so replays over months
+need a bar store that has been archiving with minute-bar retention switched off, e.g.
+BarStore(root="archive/bars", retention={"1m": None}).
+
+Example:
+    python replay.py --bars-dir archive/bars --start 2026-07-01 --end 2026-10-01 --step 5min -o replay.parquet
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from bar_store import BarStore
+from fundamentals_cache import FundamentalsCache
+from rsi_state import RSI_PERIOD
+from scan_engine import (
+    ET, EXTENDED_UNIVERSE, SESSION_LABELS, chunk_tickers, get_market_session, score_quantscore_batch
+)
+from universe import load_universe_file
+
+NS_PER_DAY = 86_400 * 10**9
+REGULAR_OPEN_MINUTE = 9 * 60 + 30
+REGULAR_CLOSE_MINUTE = 16 * 60
+
+# Tickers whose per-step inputs are built and scored together
+REPLAY_CHUNK_SIZE = 100
+
+INTRADAY_SESSIONS = ("premarket", "afterhours", "regular")
+
+
+def _et_days_and_minutes(index):
+    """Return (ET calendar day number, ET minute of day) arrays for a tz-aware DatetimeIndex"""
+    local = index.tz_convert(ET).tz_localize(None)
+    days = local.normalize().as_unit('ns').asi8 // NS_PER_DAY
+    minutes = np.asarray(local.hour * 60 + local.minute)
+    return days, minutes
+
+
+def _first_index_per_day(days):
+    """Return (distinct days, index of each day's first bar) for a sorted day array"""
+    return np.unique(days, return_index=True)
+
+
+def wilder_averages(closes, period=RSI_PERIOD):
+    """Return the Wilder (avg_gain, avg_loss, count) state after each daily close, as arrays
+
+    Mirrors rsi_state.advance_rsi_state(): a running mean over the first period changes seeds
+    the averages, after which each change is folded in with Wilder smoothing.
+    """
+    n = len(closes)
+    avg_gain = np.zeros(n)
+    avg_loss = np.zeros(n)
+    count = np.zeros(n, dtype=np.int64)
+    gain_acc = loss_acc = 0.0
+    seen = 0
+    for j in range(1, n):
+        delta = closes[j] - closes[j - 1]
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        if seen < period:
+            seen += 1
+            gain_acc = (gain_acc * (seen - 1) + gain) / seen
+            loss_acc = (loss_acc * (seen - 1) + loss) / seen
+        else:
+            gain_acc = (gain_acc * (period - 1) + gain) / period
+            loss_acc = (loss_acc * (period - 1) + loss) / period
+        avg_gain[j], avg_loss[j], count[j] = gain_acc, loss_acc, seen
+    return avg_gain, avg_loss, count
+
+
+def rsi_from_average_arrays(avg_gain, avg_loss):
+    """Vectorized rsi_state.rsi_from_averages()"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+    return np.where(avg_loss == 0, np.where(avg_gain > 0, 100.0, 50.0), rsi)
+
+
+class ReplayEngine:
+    """Rebuilds historical scan inputs from stored bars and scores them in vectorized batches"""
+
+    def __init__(self, bar_store=None, fundamentals_cache=None):
+        self.bar_store = bar_store or BarStore()
+        self.fundamentals_cache = fundamentals_cache or FundamentalsCache()
+
+    @staticmethod
+    def build_steps(start, end, step="5min", sessions=None):
+        """Return the step timestamps (ET) and their session classes, optionally limited to some sessions"""
+        steps = pd.date_range(pd.Timestamp(start, tz=ET), pd.Timestamp(end, tz=ET), freq=step)
+        session_classes = np.array([get_market_session(ts)[2] for ts in steps])
+        if sessions:
+            keep = np.isin(session_classes, list(sessions))
+            steps, session_classes = steps[keep], session_classes[keep]
+        return steps, session_classes
+
+    def build_ticker_inputs(self, ticker, steps, session_classes):
+        """Rebuild one ticker's scan inputs at every step; returns a dict of arrays or None
+
+        Follows ScanEngine.build_session_data(): the daily frame at a step holds the completed
+        daily bars plus today's bar once regular trading has started (built from the minute bars
+        seen so far), RSI is the committed Wilder state plus a provisional step for a newer price,
+        and fundamentals are today's stored values since their history is not kept.
+        """
+        info = self.fundamentals_cache.get_stored(ticker)
+        daily = self.bar_store.read(ticker, "1d")
+        if info is None or daily.empty:
+            return None
+        minute = self.bar_store.read(ticker, "1m")
+
+        step_ts = steps.tz_convert('UTC').as_unit('ns').asi8
+        step_day, step_minute = _et_days_and_minutes(steps)
+        n_steps = len(steps)
+
+        # Daily bars
+        d_day, _ = _et_days_and_minutes(daily.index)
+        d_close = daily['Close'].to_numpy(dtype=np.float64)
+        d_vol = daily['Volume'].to_numpy(dtype=np.float64)
+        avg_gain, avg_loss, rsi_count = wilder_averages(d_close)
+        completed = np.searchsorted(d_day, step_day, side='left')  # daily rows dated before the step's day
+
+        # Minute bars: all (pre/post included) and regular hours only
+        if minute.empty:
+            m_ts = np.empty(0, dtype=np.int64)
+            m_day = m_minute = np.empty(0, dtype=np.int64)
+        else:
+            m_ts = minute.index.tz_convert('UTC').as_unit('ns').asi8
+            m_day, m_minute = _et_days_and_minutes(minute.index)
+        m_open = minute['Open'].to_numpy(dtype=np.float64)
+        m_close = minute['Close'].to_numpy(dtype=np.float64)
+        m_vol = minute['Volume'].to_numpy(dtype=np.float64)
+
+        regular = (m_minute >= REGULAR_OPEN_MINUTE) & (m_minute < REGULAR_CLOSE_MINUTE)
+        r_ts, r_day = m_ts[regular], m_day[regular]
+        r_open, r_close, r_vol = m_open[regular], m_close[regular], m_vol[regular]
+        r_days, r_first = _first_index_per_day(r_day)
+        # Cumulative regular-hours volume within each day, for today's forming daily bar
+        r_cumvol = np.cumsum(r_vol)
+        if len(r_vol):
+            r_day_start = r_first[np.searchsorted(r_days, r_day)]
+            r_cumvol = r_cumvol - np.concatenate([[0.0], np.cumsum(r_vol)])[r_day_start]
+
+        ia = np.searchsorted(m_ts, step_ts, side='right') - 1   # last bar (any session) at or before the step
+        ir = np.searchsorted(r_ts, step_ts, side='right') - 1   # last regular-hours bar at or before the step
+        has_a = ia >= 0
+        has_r = ir >= 0
+        ia_safe = np.maximum(ia, 0)
+        ir_safe = np.maximum(ir, 0)
+
+        # Today's daily bar: forming from regular minutes, or the stored bar once the session is over
+        today_from_minutes = has_r & (r_day[ir_safe] == step_day) if len(r_ts) else np.zeros(n_steps, bool)
+        next_daily = np.minimum(completed, max(len(d_day) - 1, 0))
+        today_from_daily = (~today_from_minutes & (completed < len(d_day)) &
+                            (d_day[next_daily] == step_day) & (step_minute >= REGULAR_CLOSE_MINUTE))
+        has_today = today_from_minutes | today_from_daily
+
+        daily_len = completed + has_today
+        valid = daily_len >= 2
+
+        last_completed = np.maximum(completed - 1, 0)
+        prev_completed = np.maximum(completed - 2, 0)
+        daily_last_close = np.where(today_from_minutes, r_close[ir_safe] if len(r_ts) else np.nan,
+                                    np.where(today_from_daily, d_close[next_daily], d_close[last_completed]))
+        daily_last_vol = np.where(today_from_minutes, r_cumvol[ir_safe] if len(r_ts) else np.nan,
+                                  np.where(today_from_daily, d_vol[next_daily], d_vol[last_completed]))
+        daily_last_day = np.where(has_today, step_day, d_day[last_completed])
+        prev_close = np.where(has_today, d_close[last_completed], d_close[prev_completed])
+
+        # Intraday window the session would read: prepost bars over the last two dates, or today's regular bars
+        is_extended = np.isin(session_classes, ("premarket", "afterhours"))
+        is_regular = session_classes == "regular"
+        hist_present = np.where(is_extended, has_a, np.where(is_regular, has_r, False))
+
+        if len(m_ts):
+            a_days, a_first = _first_index_per_day(m_day)
+            a_pos = np.searchsorted(a_days, m_day[ia_safe])
+            extended_open = m_open[a_first[np.maximum(a_pos - 1, 0)]]
+            extended_price, extended_vol, extended_day = m_close[ia_safe], m_vol[ia_safe], m_day[ia_safe]
+        else:
+            extended_open = extended_price = extended_vol = np.full(n_steps, np.nan)
+            extended_day = np.zeros(n_steps, dtype=np.int64)
+        if len(r_ts):
+            regular_open = r_open[r_first[np.searchsorted(r_days, r_day[ir_safe])]]
+            regular_price, regular_vol, regular_day = r_close[ir_safe], r_vol[ir_safe], r_day[ir_safe]
+        else:
+            regular_open = regular_price = regular_vol = np.full(n_steps, np.nan)
+            regular_day = np.zeros(n_steps, dtype=np.int64)
+
+        hist_price = np.where(is_extended, extended_price, regular_price)
+        hist_vol = np.where(is_extended, extended_vol, regular_vol)
+        hist_day = np.where(is_extended, extended_day, regular_day)
+        hist_open = np.where(is_extended, extended_open, regular_open)
+
+        use_hist = hist_present & np.isin(session_classes, INTRADAY_SESSIONS)
+        current_price = np.where(use_hist, hist_price, daily_last_close)
+        current_volume = np.where(use_hist, np.where(hist_vol > 0, hist_vol, daily_last_vol), daily_last_vol)
+        price_day = np.where(use_hist, hist_day, daily_last_day)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change_pct = ((current_price - prev_close) / prev_close) * 100
+            gap_from_open = ((hist_open - prev_close) / prev_close) * 100
+        gap_pct = np.where(hist_present & np.isin(session_classes, ("premarket", "regular")), gap_from_open, change_pct)
+
+        # RSI: committed state after the last completed close, plus a provisional step for a newer price
+        state_gain, state_loss = avg_gain[last_completed], avg_loss[last_completed]
+        delta = current_price - d_close[last_completed]
+        step_gain = (state_gain * (RSI_PERIOD - 1) + np.where(delta > 0, delta, 0.0)) / RSI_PERIOD
+        step_loss = (state_loss * (RSI_PERIOD - 1) + np.where(delta < 0, -delta, 0.0)) / RSI_PERIOD
+        provisional = price_day > d_day[last_completed]
+        rsi = np.where(provisional, rsi_from_average_arrays(step_gain, step_loss),
+                       rsi_from_average_arrays(state_gain, state_loss))
+        rsi = np.where((completed >= 1) & (rsi_count[last_completed] >= RSI_PERIOD), rsi, 50.0)
+        rsi = np.where(np.isnan(rsi), 50.0, rsi)
+
+        # Fundamentals, with the same fallbacks build_session_data() applies
+        market_cap = float(info.get('marketCap', 0))
+        float_shares = float(info.get('floatShares', 0))
+        shares_outstanding = float(info.get('sharesOutstanding', 0))
+        market_caps = np.full(n_steps, market_cap)
+        if market_cap == 0 and shares_outstanding > 0:
+            market_caps = current_price * shares_outstanding
+        if float_shares == 0:
+            float_shares = shares_outstanding * 0.75 if shares_outstanding > 0 else 0
+
+        return {
+            'step': np.flatnonzero(valid),
+            'current_price': current_price[valid],
+            'change_pct': change_pct[valid],
+            'gap_pct': gap_pct[valid],
+            'volume': np.where(current_volume > 0, np.trunc(current_volume), 0)[valid],
+            'market_cap': np.where(market_caps > 0, np.trunc(market_caps), 0)[valid],
+            'float_shares': np.full(valid.sum(), np.trunc(float_shares) if float_shares > 0 else 0),
+            'rsi': rsi[valid],
+        }
+
+    def run(self, tickers, start, end, step="5min", sessions=None, chunk_size=REPLAY_CHUNK_SIZE, on_progress=None):
+        """Replay the universe over [start, end]; returns the qualified rows ranked within each step"""
+        steps, session_classes = self.build_steps(start, end, step, sessions)
+        qualified_frames = []
+        done = 0
+
+        for chunk in chunk_tickers(list(tickers), chunk_size):
+            columns = {}
+            for ticker in chunk:
+                inputs = self.build_ticker_inputs(ticker, steps, session_classes)
+                if inputs is None:
+                    continue
+                inputs['ticker'] = np.full(len(inputs['step']), ticker, dtype=object)
+                for key, values in inputs.items():
+                    columns.setdefault(key, []).append(values)
+
+            done += len(chunk)
+            if on_progress:
+                on_progress(done, len(tickers), chunk[-1])
+            if not columns:
+                continue
+
+            batch = pd.DataFrame({key: np.concatenate(parts) for key, parts in columns.items()})
+            batch['session_class'] = session_classes[batch['step'].to_numpy()]
+
+            # Session multipliers and gap rules are per session, so score each session class together
+            for session_type, group in batch.groupby('session_class', sort=False):
+                scores, qualified = score_quantscore_batch(group, session_type)
+                if qualified.any():
+                    hits = group[qualified].copy()
+                    hits['QuantScore™'] = scores[qualified]
+                    qualified_frames.append(hits)
+
+        if not qualified_frames:
+            return pd.DataFrame(columns=['timestamp', 'session', 'rank', 'ticker', 'QuantScore™'])
+
+        results = pd.concat(qualified_frames, ignore_index=True)
+        results['timestamp'] = steps[results['step'].to_numpy()]
+        results['session'] = results['session_class'].map(SESSION_LABELS)
+        results = results.sort_values(['step', 'QuantScore™'], ascending=[True, False])
+        results['rank'] = results.groupby('step').cumcount() + 1
+        ordered = ['timestamp', 'session', 'rank', 'ticker', 'QuantScore™', 'current_price', 'change_pct',
+                   'gap_pct', 'volume', 'market_cap', 'float_shares', 'rsi']
+        return results[ordered].reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay QuantScore™ rankings over stored bars.")
+    parser.add_argument("--start", required=True, help="first step (ET), e.g. 2026-07-01")
+    parser.add_argument("--end", required=True, help="last step (ET), e.g. 2026-10-01 16:00")
+    parser.add_argument("--step", default="5min", help="pandas frequency between steps (default: 5min)")
+    parser.add_argument("--sessions", nargs="*", choices=list(SESSION_LABELS), help="only replay these session classes")
+    parser.add_argument("--bars-dir", help="bar store root (default: the app's cache)")
+    parser.add_argument("--universe", help="ticker file (.txt, .csv or .parquet); defaults to the built-in universe")
+    parser.add_argument("--output", "-o", help="write results to .csv or .parquet instead of printing a summary")
+    args = parser.parse_args(argv)
+
+    if args.universe:
+        tickers = load_universe_file(args.universe)
+    else:
+        tickers = list(EXTENDED_UNIVERSE)
+
+    engine = ReplayEngine(bar_store=BarStore(root=args.bars_dir, retention={"1m": None}) if args.bars_dir else None)
+    start = time.perf_counter()
+    results = engine.run(tickers, args.start, args.end, args.step, args.sessions)
+    elapsed = time.perf_counter() - start
+
+    if args.output:
+        if args.output.lower().endswith(".parquet"):
+            results.to_parquet(args.output, index=False)
+        else:
+            results.to_csv(args.output, index=False)
+    else:
+        print(results[results['rank'] <= 3].to_string(index=False))
+
+    print(f"replayed {len(tickers)} tickers over {results['timestamp'].nunique()} qualifying steps "
+          f"in {elapsed:.2f}s; {len(results)} qualified rows", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""Incremental Wilder RSI state per ticker for QuantScore™ scans"""
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+from datetime import date
+
+from fundamentals_cache import CACHE_DIR
+
+RSI_PERIOD = 14
+
+# count is the number of close-to-close changes folded in; the RSI is valid once it reaches RSI_PERIOD
+RSIState = namedtuple('RSIState', ['last_date', 'last_close', 'avg_gain', 'avg_loss', 'count'])
+
+
+def advance_rsi_state(state, close_date, close, period=RSI_PERIOD):
+    """Fold one new daily close into the state (SMA seed for the first period, Wilder after)"""
+    if state is None:
+        return RSIState(close_date, close, 0.0, 0.0, 0)
+
+    delta = close - state.last_close
+    gain = delta if delta > 0 else 0.0
+    loss = -delta if delta < 0 else 0.0
+
+    if state.count < period:
+        # Running mean of the first period changes seeds the averages
+        count = state.count + 1
+        avg_gain = (state.avg_gain * state.count + gain) / count
+        avg_loss = (state.avg_loss * state.count + loss) / count
+    else:
+        count = state.count
+        avg_gain = (state.avg_gain * (period - 1) + gain) / period
+        avg_loss = (state.avg_loss * (period - 1) + loss) / period
+
+    return RSIState(close_date, close, avg_gain, avg_loss, count)
+
+
+def rsi_from_averages(avg_gain, avg_loss):
+    """Convert Wilder averages to an RSI value"""
+    if avg_loss == 0:
+        # Matches the old rolling calculation: all gains is 100, no movement at all is neutral
+        return 100.0 if avg_gain > 0 else 50.0
+    return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+class RSITracker:
+    """Persisted Wilder RSI state per ticker, updated in O(1) from each new daily close"""
+
+    def __init__(self, path=None, period=RSI_PERIOD):
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, "rsi_state.sqlite")
+        self.path = path
+        self.period = period
+        self._lock = threading.Lock()
+        self._states = {}
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS rsi_state (
+                    ticker TEXT PRIMARY KEY,
+                    last_date TEXT NOT NULL,
+                    last_close REAL NOT NULL,
+                    avg_gain REAL NOT NULL,
+                    avg_loss REAL NOT NULL,
+                    count INTEGER NOT NULL
+                )
+            """)
+            for ticker, last_date, last_close, avg_gain, avg_loss, count in self._conn.execute(
+                "SELECT ticker, last_date, last_close, avg_gain, avg_loss, count FROM rsi_state"
+            ):
+                self._states[ticker] = RSIState(date.fromisoformat(last_date), last_close, avg_gain, avg_loss, count)
+
+    def get(self, ticker):
+        """Return the committed state for a ticker, or None"""
+        with self._lock:
+            return self._states.get(ticker)
+
+    def _save(self, ticker, state):
+        with self._lock, self._conn:
+            self._states[ticker] = state
+            self._conn.execute(
+                "INSERT OR REPLACE INTO rsi_state (ticker, last_date, last_close, avg_gain, avg_loss, count) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (ticker, state.last_date.isoformat(), state.last_close, state.avg_gain, state.avg_loss, state.count)
+            )
+
+    def update(self, ticker, closes, today):
+        """Commit daily closes dated before today; returns False if closes do not connect to the state
+
+        closes is a Series of daily closes indexed by date/timestamp. Today's bar is still forming,
+        so it is left for provisional_rsi(). A False return means the window skips past the stored
+        state (or there is no state yet) and rebuild() needs the full stored history instead.
+        """
+        state = self.get(ticker)
+        completed = [(ts.date(), float(close)) for ts, close in closes.dropna().items() if ts.date() < today]
+        if not completed:
+            return state is not None
+
+        if state is None or completed[0][0] > state.last_date:
+            return False
+
+        new_state = state
+        for close_date, close in completed:
+            if close_date > new_state.last_date:
+                new_state = advance_rsi_state(new_state, close_date, close, self.period)
+
+        if new_state is not state:
+            self._save(ticker, new_state)
+        return True
+
+    def rebuild(self, ticker, closes, today):
+        """Recompute a ticker's state from its full daily close history"""
+        state = None
+        for ts, close in closes.dropna().items():
+            if ts.date() < today:
+                state = advance_rsi_state(state, ts.date(), float(close), self.period)
+        if state is not None:
+            self._save(ticker, state)
+        return state
+
+    def rsi(self, ticker, price, price_date):
+        """Return the RSI at price; a price newer than the last committed close is a provisional step"""
+        state = self.get(ticker)
+        if state is None or state.count < self.period:
+            return 50.0
+
+        if price_date <= state.last_date:
+            return rsi_from_averages(state.avg_gain, state.avg_loss)
+
+        provisional = advance_rsi_state(state, price_date, float(price), self.period)
+        return rsi_from_averages(provisional.avg_gain, provisional.avg_loss)
@@ -0,0 +1,150 @@
+"""Process-wide shared QuantScore™ scan cache"""
+import threading
+import time
+import concurrent.futures
+from datetime import datetime
+
+from universe import universe_fingerprint
+
+# Finished scans older than this are dropped from the cache
+ENTRY_RETENTION_SECONDS = 3600
+
+# How often attached viewers poll an in-flight scan for progress
+ATTACH_POLL_SECONDS = 0.25
+
+
+class ScanAbandoned(Exception):
+    """The viewer that owned an in-flight scan stopped before it finished"""
+
+
+class _InflightScan:
+    """A scan currently running for one key, with progress and partial results visible to attached viewers"""
+
+    def __init__(self):
+        self.future = concurrent.futures.Future()
+        self.progress = (0, 0, "")
+        # Qualified rows published so far; only ever appended to, so viewers can read past their last index
+        self.rows = []
+
+
+class SharedScanCache:
+    """Scan results shared by every viewer in the process, keyed by session, universe and parameters
+
+    A viewer asking for a key that already has a fresh result gets that result. If a scan for
+    the key is running, the viewer attaches to it instead of starting a duplicate. Only when
+    neither exists does the viewer run the scan itself.
+    """
+
+    def __init__(self, retention=ENTRY_RETENTION_SECONDS):
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._entries = {}   # key -> (finished_at datetime, finished_at monotonic, results)
+        self._inflight = {}  # key -> _InflightScan
+
+    @staticmethod
+    def make_key(session_class, tickers, **params):
+        """Build a cache key from the session class, scan universe and result-affecting parameters"""
+        # A digest keeps keys small and cheap to hash for universes of thousands of tickers
+        return (session_class, universe_fingerprint(tickers), tuple(sorted(params.items())))
+
+    def peek(self, key):
+        """Return (results, finished_at) of the latest finished scan for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+        return (entry[2], entry[0]) if entry else None
+
+    def is_scanning(self, key):
+        """Check whether a scan for key is in flight"""
+        with self._lock:
+            return key in self._inflight
+
+    def _purge(self, now):
+        expired = [key for key, entry in self._entries.items() if now - entry[1] > self.retention]
+        for key in expired:
+            del self._entries[key]
+
+    def get_or_scan(self, key, scan_fn, max_age, on_progress=None, on_results=None):
+        """Return (results, finished_at) for key, reusing a fresh result or attaching to a running scan
+
+        scan_fn(report, publish) runs the scan and returns its results; it should call
+        report(done, total, current) as it goes, and may call publish(rows) with newly qualified
+        rows, so attached viewers can mirror its progress and partial results. on_progress and
+        on_results receive the same updates whether this viewer owns the scan or is attached to
+        another viewer's scan (an attaching viewer first gets every row published so far).
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry and time.monotonic() - entry[1] < max_age:
+                    return entry[2], entry[0]
+
+                inflight = self._inflight.get(key)
+                owner = inflight is None
+                if owner:
+                    inflight = _InflightScan()
+                    self._inflight[key] = inflight
+
+            if owner:
+                return self._run(key, inflight, scan_fn, on_progress, on_results)
+
+            try:
+                return self._attach(inflight, on_progress, on_results)
+            except ScanAbandoned:
+                # The owner went away mid-scan; loop round and take the scan over
+                continue
+
+    def _run(self, key, inflight, scan_fn, on_progress, on_results):
+        def report(done, total, current):
+            inflight.progress = (done, total, current)
+            if on_progress:
+                on_progress(done, total, current)
+
+        def publish(rows):
+            inflight.rows.extend(rows)
+            if on_results:
+                on_results(rows)
+
+        try:
+            results = scan_fn(report, publish)
+        except Exception as exc:
+            with self._lock:
+                self._inflight.pop(key, None)
+            inflight.future.set_exception(exc)
+            raise
+        except BaseException:
+            # Script stop/rerun in the owning viewer: let an attached viewer finish the scan
+            with self._lock:
+                self._inflight.pop(key, None)
+            inflight.future.set_exception(ScanAbandoned())
+            raise
+
+        finished_at = datetime.now()
+        with self._lock:
+            now = time.monotonic()
+            self._entries[key] = (finished_at, now, results)
+            self._inflight.pop(key, None)
+            self._purge(now)
+        inflight.future.set_result((results, finished_at))
+        return results, finished_at
+
+    def _attach(self, inflight, on_progress, on_results):
+        seen = 0
+
+        def deliver_rows():
+            nonlocal seen
+            rows = inflight.rows[seen:]
+            seen += len(rows)
+            if rows and on_results:
+                on_results(rows)
+
+        while True:
+            try:
+                result = inflight.future.result(timeout=ATTACH_POLL_SECONDS)
+            except concurrent.futures.TimeoutError:
+                deliver_rows()
+                if on_progress:
+                    on_progress(*inflight.progress)
+                continue
+            # Rows from the owner's last scoring pass land just before the result
+            deliver_rows()
+            return result
@@ -0,0 +1,194 @@
+"""Command-line QuantScore™ scans for cron/batch runs without Streamlit
+
+Example:
+    python scan_cli.py --session auto --universe tickers.txt --output results.csv
+"""
+import argparse
+import functools
+import os
+import sys
+import time
+
+from market_data import HTTPProvider, MarketDataError, YFinanceProvider, default_provider
+from scan_engine import (
+    DEFAULT_BATCH_SIZE, DEFAULT_MAX_WORKERS, EXTENDED_UNIVERSE, FETCH_MODES, SESSION_LABELS,
+    ScanEngine, get_market_session, rank_results
+)
+from scan_shards import ShardedScanner, make_engine
+from universe import BUILTIN_UNIVERSE, UniverseStore, load_universe_file
+
+OUTPUT_FORMATS = ["csv", "parquet", "json"]
+
+
+def resolve_universe(spec, store):
+    """Load tickers from a universe file, or a stored universe given as NAME or NAME@VERSION"""
+    if not spec:
+        return store.load(BUILTIN_UNIVERSE)
+    if os.path.exists(spec):
+        return load_universe_file(spec)
+    name, _, version = spec.partition("@")
+    return store.load(name, int(version) if version else None)
+
+
+def write_results(ranked, path, output_format):
+    """Write ranked results as CSV, Parquet or JSON"""
+    if output_format == "csv":
+        ranked.to_csv(path)
+    elif output_format == "parquet":
+        ranked.to_parquet(path)
+    else:
+        ranked.reset_index().to_json(path, orient="records", indent=2, force_ascii=False)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run a headless QuantScore™ scan and write ranked results.")
+    parser.add_argument("--session", default="auto", choices=["auto"] + list(SESSION_LABELS),
+                        help="session class to scan for (default: detect from the current ET time)")
+    parser.add_argument("--universe", help="ticker file (.txt, .csv or .parquet) or stored universe NAME[@VERSION]; "
+                                           "defaults to the built-in universe")
+    parser.add_argument("--save-universe", metavar="NAME", help="store the --universe file as a new version of NAME")
+    parser.add_argument("--max-tickers", type=int, help="scan only the first N tickers of the universe")
+    parser.add_argument("--output", "-o", help="result file; the format follows the extension unless --format is set")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, help="output format (default: from --output, else csv)")
+    parser.add_argument("--provider", help="market data source: yfinance, or the base URL of a market-data "
+                                           "HTTP server (default: $QUANTSCORE_PROVIDER_URL, else yfinance)")
+    parser.add_argument("--fetch-mode", default="auto", choices=FETCH_MODES,
+                        help="auto picks batched or per-ticker fetching from the provider's capabilities")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--max-workers", type=int, default=DEFAULT_MAX_WORKERS)
+    parser.add_argument("--metrics", help="write the scan's per-phase metrics as JSON, or Prometheus text for "
+                                          "a .prom file (e.g. for node_exporter's textfile collector)")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="split the universe across this many worker processes (max-workers applies per shard)")
+    parser.add_argument("--queue-dir", help="hand shards to `scan_shards.py worker` processes (on any host) through "
+                                            "this work-queue directory instead of local processes")
+    parser.add_argument("--top-k", type=int, help="keep only the K best-scoring tickers")
+    parser.add_argument("--time-budget", type=float, metavar="SECONDS",
+                        help="stop starting fetches after this long and report the tickers left unscanned")
+    parser.add_argument("--stream", action="store_true",
+                        help="print each qualified ticker to stderr as soon as it is scored, before the final ranking")
+    parser.add_argument("--quiet", "-q", action="store_true", help="do not print progress")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    store = UniverseStore(builtin=EXTENDED_UNIVERSE)
+    try:
+        universe = resolve_universe(args.universe, store)
+    except (OSError, KeyError, ValueError) as exc:
+        print(f"error: cannot load universe: {exc}", file=sys.stderr)
+        return 2
+    if args.save_universe:
+        try:
+            version, universe = store.save(args.save_universe, universe, note=f"from {args.universe}")
+        except ValueError as exc:
+            print(f"error: cannot save universe: {exc}", file=sys.stderr)
+            return 2
+        print(f"universe: saved {len(universe)} tickers as {args.save_universe} v{version}", file=sys.stderr)
+    if args.max_tickers:
+        universe = universe[:args.max_tickers]
+    if not universe:
+        print("error: universe is empty", file=sys.stderr)
+        return 2
+
+    if args.session == "auto":
+        session, _, session_class = get_market_session()
+    else:
+        session_class = args.session
+        session = SESSION_LABELS[session_class]
+
+    output_format = args.format
+    if output_format is None and args.output:
+        extension = os.path.splitext(args.output)[1].lstrip(".").lower()
+        output_format = extension if extension in OUTPUT_FORMATS else "csv"
+    output_format = output_format or "csv"
+
+    def show_progress(done, total, current):
+        if not args.quiet:
+            print(f"\r[{done}/{total}] {current:<40}", end="", file=sys.stderr, flush=True)
+
+    def show_results(rows):
+        for row in rows:
+            print(f"\rqualified after {time.perf_counter() - start:6.2f}s: {row['Ticker']:<8} "
+                  f"QuantScore™ {row['QuantScore™']:.8f}" + " " * 20, file=sys.stderr, flush=True)
+
+    on_results = show_results if args.stream else None
+
+    try:
+        if args.provider is None:
+            provider = default_provider()
+        else:
+            provider = YFinanceProvider() if args.provider == "yfinance" else HTTPProvider(args.provider)
+    except MarketDataError as exc:
+        print(f"error: cannot reach market data provider: {exc}", file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    if args.shards > 1 or args.queue_dir:
+        engine = ShardedScanner(args.shards, args.queue_dir, functools.partial(make_engine, args.provider))
+        try:
+            results = engine.run_quantscore_scan(universe, session_class, args.fetch_mode, args.batch_size,
+                                                 args.max_workers, show_progress, top_k=args.top_k,
+                                                 on_results=on_results, time_budget=args.time_budget)
+        except (TimeoutError, RuntimeError) as exc:
+            print(f"\nerror: sharded scan failed: {exc}", file=sys.stderr)
+            return 1
+        finally:
+            engine.close()
+    else:
+        engine = ScanEngine(provider=provider)
+        results = engine.run_quantscore_scan(universe, session_class, args.fetch_mode, args.batch_size,
+                                             args.max_workers, show_progress, on_results=on_results,
+                                             time_budget=args.time_budget)
+    scan_seconds = time.perf_counter() - start
+    if not args.quiet:
+        print(file=sys.stderr)
+
+    ranked = rank_results(results, args.top_k)
+    if args.output:
+        write_results(ranked, args.output, output_format)
+    else:
+        print(ranked.to_string())
+
+    # Timing stats go to stderr so stdout stays clean for piping results
+    print(f"session: {session} ({session_class})", file=sys.stderr)
+    print(f"scanned: {len(universe)} tickers in {scan_seconds:.2f}s "
+          f"({len(universe) / scan_seconds if scan_seconds else 0:.1f} tickers/s)", file=sys.stderr)
+    last_scan = engine.metrics_registry.last
+    print(f"qualified: {last_scan.qualified}" + (f" (kept top {len(ranked)})" if len(ranked) < last_scan.qualified else ""),
+          file=sys.stderr)
+    for phase, stats in last_scan.phase_summary().items():
+        print(f"  {phase:<15} {stats['total_seconds']:8.2f}s over {stats['calls']:>5} calls  "
+              f"(p50 {stats['p50_seconds'] * 1000:.1f}ms, p99 {stats['p99_seconds'] * 1000:.1f}ms)", file=sys.stderr)
+    stages = last_scan.stage_summary()
+    if stages:
+        print("stages: " + " -> ".join(f"{stage} {counts['entered']} (-{counts['eliminated']})"
+                                       for stage, counts in stages.items()), file=sys.stderr)
+    delta = last_scan.delta_summary()
+    if delta:
+        print("delta: " + ", ".join(f"{kind} {count}" for kind, count in delta.items()), file=sys.stderr)
+    if results.skipped:
+        print(f"partial: {results.coverage:.1%} coverage, {len(results.skipped)} tickers skipped at the time budget: "
+              + " ".join(results.skipped), file=sys.stderr)
+    failures = last_scan.failure_summary()
+    if failures:
+        print("provider failures: " + ", ".join(f"{kind} {count}" for kind, count in failures.items()), file=sys.stderr)
+    if last_scan.errors:
+        print("errors: " + ", ".join(f"{phase}/{kind} {count}" for (phase, kind), count in last_scan.errors.items()),
+              file=sys.stderr)
+    if args.output:
+        print(f"wrote: {args.output} ({output_format})", file=sys.stderr)
+
+    if args.metrics:
+        with open(args.metrics, "w") as f:
+            if args.metrics.lower().endswith(".prom"):
+                f.write(engine.metrics_registry.to_prometheus())
+            else:
+                f.write(engine.metrics_registry.to_json())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Delta scanning: per-ticker input fingerprints so unchanged tickers are not rebuilt or rescored"""
+import hashlib
+import threading
+from datetime import datetime, timedelta
+
+import pytz
+
+ET = pytz.timezone('US/Eastern')
+
+# Post-market trading ends at 20:00 ET; a daily bar fetched after that is final for the day
+SETTLE_HOUR = 20
+
+
+def settled_since(now=None):
+    """Start of the current quiet period: the last weekday 20:00 ET at or before now"""
+    now = now.astimezone(ET) if now is not None else datetime.now(ET)
+    day = now.date() if now.hour >= SETTLE_HOUR else now.date() - timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return ET.localize(datetime(day.year, day.month, day.day, SETTLE_HOUR))
+
+
+def input_fingerprint(session_type, info, daily, hist, today):
+    """Digest of everything build_session_data() reads for a ticker
+
+    Covers the fundamentals values, the daily bars' last timestamp, the two closes and the
+    volume the change and RSI come from, the intraday bars' open, last price and volume, and
+    the date the RSI is stepped to. Revisions of older bars are not covered.
+    """
+    parts = [session_type, str(today), sorted(info.items()), len(daily)]
+    if len(daily):
+        parts += [daily.index[-1], daily['Close'].iloc[-2:].tolist(), daily['Volume'].iloc[-1]]
+    if hist is not daily:
+        parts.append(len(hist))
+        if len(hist):
+            parts += [hist.index[0], hist.index[-1], hist['Open'].iloc[0], hist['Close'].iloc[-1],
+                      hist['Volume'].iloc[-1]]
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).digest()
+
+
+class _Entry:
+    """Last inputs seen for one ticker in one session class and what they produced"""
+
+    def __init__(self, fingerprint, data):
+        self.fingerprint = fingerprint
+        self.data = data
+        self.scored = False
+        self.row = None
+
+
+class DeltaTracker:
+    """Dirty tracking across scans: input fingerprints, the data and score they produced, and bar syncs
+
+    A ticker whose fingerprint matches its previous scan in the same session class gets its
+    previous session data back, which skips the RSI step and the build, and its previous
+    QuantScore and filter result, which skips scoring. Daily bars synced after the last close
+    are final, so ScanEngine.plan_bar_fetches() leaves them out. State lives in memory, so a
+    long-lived engine (the dashboard's, a shard worker's) gets the benefit from its second scan on.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # (session_type, ticker) -> _Entry
+        self._synced = {}   # (ticker, interval) -> when its last successful sync started
+
+    def mark_synced(self, tickers, interval, started_at):
+        """Record a successful bar sync for tickers (one ticker or a list) that started at started_at"""
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        with self._lock:
+            for ticker in tickers:
+                self._synced[(ticker, interval)] = started_at
+
+    def is_settled(self, ticker, interval, now=None):
+        """Whether the stored bars of every completed day are final (daily bars synced after the last close)"""
+        if interval != "1d":
+            return False
+        synced = self._synced.get((ticker, interval))
+        return synced is not None and synced >= settled_since(now)
+
+    def lookup(self, session_type, ticker, fingerprint):
+        """Previous session data of a ticker if its inputs are unchanged, else None"""
+        entry = self._entries.get((session_type, ticker))
+        return entry.data if entry is not None and entry.fingerprint == fingerprint else None
+
+    def latest(self, session_type, ticker):
+        """Session data of a ticker's last successful build in a session class, or None"""
+        entry = self._entries.get((session_type, ticker))
+        return entry.data if entry is not None else None
+
+    def store(self, session_type, ticker, fingerprint, data):
+        """Remember the session data built from a ticker's inputs"""
+        with self._lock:
+            self._entries[(session_type, ticker)] = _Entry(fingerprint, data)
+
+    def score_of(self, session_type, data):
+        """(True, result row or None) if this exact session data was scored before, else (False, None)"""
+        entry = self._entries.get((session_type, data['ticker']))
+        if entry is None or entry.data is not data or not entry.scored:
+            return False, None
+        return True, entry.row
+
+    def store_score(self, session_type, data, row):
+        """Remember the result row (None when filtered out) scored from session data"""
+        entry = self._entries.get((session_type, data['ticker']))
+        if entry is not None and entry.data is data:
+            entry.row = row
+            entry.scored = True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._synced.clear()
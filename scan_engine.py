@@ -0,0 +1,1031 @@
+"""Headless QuantScore™ scan engine: session detection, fetching, filtering and scoring"""
+import heapq
+import itertools
+import math
+import queue
+import threading
+import time
+import concurrent.futures
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytz
+
+from bar_store import BarStore
+from fundamentals_cache import FundamentalsCache
+from market_data import default_provider
+from provider_health import CircuitBreaker, CircuitOpenError, SymbolQuarantine, classify_failure
+from rsi_state import RSITracker
+from scan_delta import DeltaTracker, input_fingerprint
+from scan_metrics import MetricsRegistry, ScanMetrics, count_delta, count_failure, count_stage, timed
+from scan_order import YieldTracker
+
+# Set timezone
+ET = pytz.timezone('US/Eastern')
+
+# Tickers per grouped download request in batched scans
+DEFAULT_BATCH_SIZE = 50
+# Worker threads used to fan out per-ticker fetches
+DEFAULT_MAX_WORKERS = 8
+# "auto" picks batched or per-ticker fetching from the provider's capabilities
+FETCH_MODES = ["auto", "batched", "per-ticker"]
+# Least time between two on_progress calls, so UI updates do not scale with the universe
+PROGRESS_INTERVAL_SECONDS = 0.25
+# Columns of a result row, in display order
+RESULT_COLUMNS = ['Ticker', 'QuantScore™', 'Price', 'Change%', 'Gap%', 'Volume', 'Float (M)', 'RSI', 'Session', 'Updated']
+# How the Updated column shows a row's scan timestamp
+UPDATED_FORMAT = '%H:%M:%S'
+# Rows kept in a streamed scan's live ranking
+LIVE_RANKING_SIZE = 20
+# Metrics phase each bar interval's fetches are timed under
+FETCH_PHASES = {"1d": "daily_fetch", "1m": "intraday_fetch"}
+
+# Display label for each session class
+SESSION_LABELS = {
+    "weekend": "WEEKEND",
+    "overnight": "OVERNIGHT",
+    "premarket": "PRE-MARKET",
+    "regular": "REGULAR HOURS",
+    "afterhours": "AFTER-HOURS",
+}
+
+# Comprehensive ticker universe for all sessions
+EXTENDED_UNIVERSE = [
+    # High-volume stocks for extended hours
+    "AAPL", "MSFT", "GOOGL", "AMZN", "TSLA", "META", "NVDA", "NFLX",
+
+    # Popular small caps with extended trading
+    "PHUN", "SNTI", "HUBC", "BBIG", "PROG", "ATER", "SPRT", "IRNT", "RDBX", "NILE",
+    "MULN", "GFAI", "BMRA", "RELI", "BGFV", "CLOV", "WISH", "WKHS", "RIDE", "GOEV",
+    "ARVL", "NAKD", "SNDL", "EXPR", "AMC", "GME", "MMAT", "TRCH", "VERB", "VXRT",
+    "OCGN", "XELA", "GNUS", "JAGX", "INPX", "MARK", "UAMY", "TOPS", "SHIP", "GLBS",
+
+    # Tech/AI with active extended hours
+    "CXAI", "HOLO", "TRNR", "QUBT", "RGTI", "RR", "BNAI", "BOX", "APLD", "SERV",
+    "SOFI", "PLTR", "HOOD", "RBLX", "DKNG", "FUBO", "SKLZ", "OPEN", "UPST", "AFRM",
+    "COIN", "SQ", "PYPL", "ROKU", "ZM", "SHOP", "NET", "SNOW", "CRWD", "ZS",
+
+    # Biotech with news-driven extended activity
+    "ADTX", "ADMA", "AGIO", "AKRO", "ALEC", "ANAB", "ANIK", "APLS", "ARDX", "ARQT",
+    "ASND", "AUPH", "AVIR", "BEAM", "BCAB", "BCRX", "BFRI", "BNGO", "BOLD", "BPMC",
+    "BTTX", "CAPR", "CARA", "CBAY", "CDNA", "CDTX", "CHRS", "CTIC", "CTMX", "CPRX",
+
+    # Energy/Mining with overnight futures correlation
+    "TELL", "FCEL", "PLUG", "BE", "BLDP", "HYMC", "GOLD", "AG", "HL", "PAAS",
+    "CDE", "SSRM", "WPM", "FNV", "SAND", "GORO", "FSM", "EGO", "AUY", "NEM",
+
+    # Cannabis with international influence
+    "TLRY", "CRON", "ACB", "HEXO", "OGI", "CGC", "GRWG", "SMG", "HYFM",
+
+    # Crypto miners with 24/7 correlation
+    "MARA", "RIOT", "HUT", "BITF", "EBON", "CAN", "BTBT", "WULF", "CIFR", "CORZ",
+    "GRIID", "LGHL", "ANY", "BTCS", "DPRO", "ARBK", "EQOS", "HVBT", "IDEX"
+]
+
+# Session-specific multipliers for different trading conditions
+SESSION_MULTIPLIERS = {
+    "premarket": 1.5,   # Premium for pre-market moves
+    "afterhours": 1.3,  # Premium for after-hours moves
+    "overnight": 0.8,   # Discounted for overnight (limited data)
+    "weekend": 0.5,     # Heavily discounted for weekend analysis
+    "regular": 1.0,
+}
+
+# Session-specific move requirement: (field, minimum absolute %)
+SESSION_GAP_FILTERS = {
+    "premarket": ('gap_pct', 2.0),     # Standard gap requirement
+    "regular": ('gap_pct', 2.0),
+    "afterhours": ('gap_pct', 1.5),    # Slightly lower for after-hours
+    "overnight": ('change_pct', 1.0),  # Use change instead of gap
+    "weekend": ('change_pct', 0.5),    # Very low threshold for weekend
+}
+
+# Base filter thresholds shared by the scalar and batch paths
+MAX_FLOAT_SHARES = 10_000_000
+MIN_RSI = 55
+
+
+def get_market_session(now=None):
+    """Determine current market session with full 24/7 coverage"""
+    now = now.astimezone(ET) if now is not None else datetime.now(ET)
+    hour = now.hour
+    minute = now.minute
+    weekday = now.weekday()  # 0=Monday, 6=Sunday
+
+    # Weekend handling
+    if weekday == 5 and hour >= 18:  # Saturday after 6 PM
+        return "WEEKEND", "🏠", "weekend"
+    elif weekday == 6:  # Sunday
+        return "WEEKEND", "🏠", "weekend"
+    elif weekday == 0 and hour < 4:  # Monday before 4 AM
+        return "WEEKEND", "🏠", "weekend"
+
+    # Weekday sessions
+    if hour < 4:
+        return "OVERNIGHT", "🌙", "overnight"
+    elif 4 <= hour < 9 or (hour == 9 and minute < 30):
+        return "PRE-MARKET", "🌅", "premarket"
+    elif (hour == 9 and minute >= 30) or (10 <= hour < 16):
+        return "REGULAR HOURS", "🔔", "regular"
+    elif 16 <= hour < 20:
+        return "AFTER-HOURS", "🌆", "afterhours"
+    else:
+        return "OVERNIGHT", "🌙", "overnight"
+
+
+def get_session_history_requests(session_type):
+    """Return the intraday and daily bar windows a session reads from the bar store"""
+    daily_request = {"period": "5d", "interval": "1d"}
+
+    if session_type in ["premarket", "afterhours"]:
+        # Get intraday data with prepost for extended hours
+        intraday_request = {"period": "2d", "interval": "1m", "prepost": True}
+    elif session_type == "regular":
+        # Get standard market hours data
+        intraday_request = {"period": "1d", "interval": "1m", "prepost": False}
+    else:  # overnight / weekend
+        # Use daily data only
+        intraday_request = None
+
+    return intraday_request, daily_request
+
+
+def with_session_bar(daily, hist, today, days):
+    """Daily bars plus today's bar built from today's regular-hours 1-minute bars, when the store has none yet
+
+    Lets intraday sessions skip the daily request once the completed days are stored: price,
+    volume and gap open come from the minute bars, and today's daily bar only backs the volume
+    fallback (the RSI commits completed days only). The window is kept to the last days bars.
+    """
+    if hist is daily or hist.empty or daily.empty or daily.index[-1].date() >= today:
+        return daily
+    minutes = hist.index.hour * 60 + hist.index.minute
+    regular = hist[(hist.index.date == today) & (minutes >= 9 * 60 + 30) & (minutes < 16 * 60)]
+    if regular.empty:
+        return daily
+    bar = pd.DataFrame({
+        'Open': [regular['Open'].iloc[0]],
+        'High': [regular['High'].max()],
+        'Low': [regular['Low'].min()],
+        'Close': [regular['Close'].iloc[-1]],
+        'Volume': [regular['Volume'].sum()],
+    }, index=[regular.index[0].normalize()])
+    return pd.concat([daily, bar]).iloc[-days:]
+
+
+def seconds_left(deadline):
+    """Seconds until a time.monotonic() deadline (never negative), or None without one"""
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+
+def future_data(future):
+    """Session data a finished per-ticker future produced, None if it raised"""
+    try:
+        return future.result()
+    except Exception:
+        return None
+
+
+def chunk_tickers(tickers, batch_size):
+    """Split a ticker list into consecutive batches of at most batch_size"""
+    return [tickers[i:i + batch_size] for i in range(0, len(tickers), batch_size)]
+
+
+def calculate_quantscore_24_7(data, session_type):
+    """Calculate QuantScore with session-specific adjustments"""
+    try:
+        change_pct = abs(data['change_pct'])
+        volume = data['volume']
+        market_cap = data['market_cap']
+
+        if market_cap <= 0 or volume <= 0:
+            return 0
+
+        # Base QuantScore formula
+        base_score = (change_pct * (volume ** 1.3)) / (market_cap ** 0.7)
+
+        # Unknown sessions score like regular hours
+        return base_score * SESSION_MULTIPLIERS.get(session_type, 1.0)
+
+    except:
+        return 0
+
+
+def apply_quantscore_filters_24_7(data, session_type):
+    """Apply QuantScore filters with session awareness"""
+    try:
+        base_filters = (
+            data['float_shares'] < MAX_FLOAT_SHARES and  # Float < 10M
+            data['rsi'] > MIN_RSI and                    # RSI > 55
+            data['volume'] > 0 and                       # Volume check
+            data['market_cap'] > 0                       # Market cap check
+        )
+
+        # Adjust gap requirement based on session (unknown sessions use the weekend rule)
+        gap_field, gap_threshold = SESSION_GAP_FILTERS.get(session_type, SESSION_GAP_FILTERS["weekend"])
+        gap_filter = abs(data[gap_field]) > gap_threshold
+
+        return base_filters and gap_filter
+
+    except:
+        return False
+
+
+def float_closeness(float_shares):
+    """1 for a float under MAX_FLOAT_SHARES, falling off in proportion past it (0 when unknown)"""
+    return min(1.0, MAX_FLOAT_SHARES / float_shares) if float_shares > 0 else 0.0
+
+
+def filter_proximity(data, session_type):
+    """How close session data is to the float, RSI and session move thresholds of apply_quantscore_filters_24_7(),
+    from 0 (far from all of them) to 1 (past every one)"""
+    move_field, move_threshold = SESSION_GAP_FILTERS.get(session_type, SESSION_GAP_FILTERS["weekend"])
+    return (min(1.0, abs(data[move_field]) / move_threshold) * float_closeness(data['float_shares']) *
+            min(1.0, max(0.0, data['rsi']) / MIN_RSI))
+
+
+def screen_fundamentals(info):
+    """Check whether fundamentals alone leave a ticker a chance to pass the float and market-cap filters
+
+    Mirrors the fallbacks in build_session_data(). A zero marketCap with shares outstanding is
+    priced later, so it passes.
+    """
+    try:
+        market_cap = info.get('marketCap', 0)
+        float_shares = info.get('floatShares', 0)
+        shares_outstanding = info.get('sharesOutstanding', 0)
+
+        if float_shares == 0:
+            float_shares = shares_outstanding * 0.75 if shares_outstanding > 0 else 0
+        if not (float_shares if float_shares > 0 else 0) < MAX_FLOAT_SHARES:
+            return False
+
+        return market_cap > 0 or (market_cap == 0 and shares_outstanding > 0)
+
+    except:
+        return False
+
+
+def screen_daily_bars(daily, session_type):
+    """Check whether a ticker's daily bars leave it a chance to qualify in a session
+
+    Sessions without intraday data measure change% and volume on the daily bars, so those
+    filters are final here. Intraday sessions measure them (and the RSI step) at the live
+    intraday price, so only the bar history requirement can be checked before that fetch.
+    """
+    if daily.empty or len(daily) < 2:
+        return False
+
+    intraday_request, _ = get_session_history_requests(session_type)
+    if intraday_request:
+        return True
+
+    current_price = daily['Close'].iloc[-1]
+    prev_close = daily['Close'].iloc[-2]
+    change_pct = ((current_price - prev_close) / prev_close) * 100
+    # Daily-only sessions compare change% whichever move field they name, since gap% == change% there
+    _, gap_threshold = SESSION_GAP_FILTERS.get(session_type, SESSION_GAP_FILTERS["weekend"])
+    return abs(float(change_pct)) > gap_threshold and daily['Volume'].iloc[-1] > 0
+
+
+# numpy's SIMD power can differ from libm pow() in the last bit, so the two exponentials
+# go through math.pow elementwise to stay bit-identical with the scalar ** operator
+_libm_pow = np.frompyfunc(math.pow, 2, 1)
+
+
+def _exact_power(values, exponent):
+    """Elementwise values ** exponent, rounded exactly like Python float pow"""
+    return _libm_pow(values, exponent).astype(np.float64)
+
+
+def score_quantscore_batch(batch, session_type):
+    """Score and filter a whole universe at once; returns (scores, qualified mask) as NumPy arrays
+
+    batch is a DataFrame (or dict of arrays) with change_pct, gap_pct, volume, market_cap,
+    float_shares and rsi columns. Scores match calculate_quantscore_24_7 element for element and
+    the mask matches apply_quantscore_filters_24_7 combined with the scan's quantscore > 0 check.
+    """
+    change_pct = np.asarray(batch['change_pct'], dtype=np.float64)
+    gap_pct = np.asarray(batch['gap_pct'], dtype=np.float64)
+    volume = np.asarray(batch['volume'], dtype=np.float64)
+    market_cap = np.asarray(batch['market_cap'], dtype=np.float64)
+    float_shares = np.asarray(batch['float_shares'], dtype=np.float64)
+    rsi = np.asarray(batch['rsi'], dtype=np.float64)
+
+    # Zero/negative market cap or volume scores 0, exactly like the scalar early return
+    scorable = ~((market_cap <= 0) | (volume <= 0))
+    scores = np.zeros(len(volume), dtype=np.float64)
+    base_score = (np.abs(change_pct[scorable]) * _exact_power(volume[scorable], 1.3)) / _exact_power(market_cap[scorable], 0.7)
+    scores[scorable] = base_score * SESSION_MULTIPLIERS.get(session_type, 1.0)
+
+    gap_field, gap_threshold = SESSION_GAP_FILTERS.get(session_type, SESSION_GAP_FILTERS["weekend"])
+    gap_values = gap_pct if gap_field == 'gap_pct' else change_pct
+    passed = (
+        (float_shares < MAX_FLOAT_SHARES) &
+        (rsi > MIN_RSI) &
+        (volume > 0) &
+        (market_cap > 0) &
+        (np.abs(gap_values) > gap_threshold)
+    )
+
+    return scores, passed & (scores > 0)
+
+
+class ResultRow:
+    """One qualified stock of a scan, as a typed record with its fields in __slots__
+
+    Rows have no per-row dict and no preformatted strings: updated is the timestamp of the scan
+    that returned the row, one datetime shared by all of that scan's rows (a row reused from an
+    earlier scan comes back as a restamped copy), and only rank_results() formats it.
+    row[column] reads a field by its RESULT_COLUMNS name, so rows index like the dicts they
+    replaced.
+    """
+
+    __slots__ = ('ticker', 'quantscore', 'price', 'change_pct', 'gap_pct', 'volume', 'float_m', 'rsi', 'session',
+                 'updated')
+
+    def __init__(self, ticker, quantscore, price, change_pct, gap_pct, volume, float_m, rsi, session, updated):
+        self.ticker = ticker
+        self.quantscore = quantscore
+        self.price = price
+        self.change_pct = change_pct
+        self.gap_pct = gap_pct
+        self.volume = volume
+        self.float_m = float_m
+        self.rsi = rsi
+        self.session = session
+        self.updated = updated
+
+    def __getitem__(self, column):
+        if column == 'Updated':
+            return self.updated.strftime(UPDATED_FORMAT)
+        return getattr(self, RESULT_FIELDS[column])
+
+    def __repr__(self):
+        return f"ResultRow({self.ticker!r}, {self.quantscore!r})"
+
+    def stamped(self, updated):
+        """A copy of the row with another scan's timestamp"""
+        return ResultRow(*self.values()[:-1], updated)
+
+    def values(self):
+        """Field values in RESULT_COLUMNS order, Updated as the scan timestamp"""
+        return tuple(getattr(self, field) for field in self.__slots__)
+
+    def to_list(self):
+        """Field values as a JSON-safe list, the scan timestamp in ISO format"""
+        return list(self.values()[:-1]) + [self.updated.isoformat()]
+
+    @classmethod
+    def from_list(cls, values, timestamps=None):
+        """Row from to_list() output; rows parsed with the same timestamps dict share their timestamp objects"""
+        *fields, updated = values
+        timestamps = {} if timestamps is None else timestamps
+        if updated not in timestamps:
+            timestamps[updated] = datetime.fromisoformat(updated)
+        return cls(*fields, timestamps[updated])
+
+
+# Result column -> ResultRow field
+RESULT_FIELDS = dict(zip(RESULT_COLUMNS, ResultRow.__slots__))
+
+
+def build_result_row(data, quantscore, scanned_at):
+    """Build the result row for a qualified stock, stamped with its scan's timestamp"""
+    return ResultRow(data['ticker'], quantscore, data['current_price'], data['change_pct'], data['gap_pct'],
+                     data['volume'], data['float_shares'] / 1_000_000, data['rsi'], data['session'], scanned_at)
+
+
+class ScanEngine:
+    """Fetches, filters and scores tickers for a session, independent of any UI
+
+    The engine owns the persistent stores a scan reads from: fundamentals, OHLCV bars and
+    per-ticker RSI state, all filled from one market-data provider (see market_data.default_provider()),
+    plus the delta tracker that lets repeated scans skip tickers whose inputs did not change and
+    the yield tracker that orders each scan's tickers likeliest qualifiers first. Provider
+    requests go through a circuit breaker, and symbols that keep failing are quarantined. One
+    engine per process is enough; it is safe to share across threads.
+    """
+
+    def __init__(self, fundamentals_cache=None, bar_store=None, rsi_tracker=None, provider=None, metrics_registry=None,
+                 delta_tracker=None, quarantine=None, circuit_breaker=None, yield_tracker=None):
+        self.provider = provider or default_provider()
+        self.quarantine = quarantine or SymbolQuarantine()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.fundamentals_cache = fundamentals_cache or FundamentalsCache(fetch_info=self.fetch_info)
+        self.bar_store = bar_store or BarStore()
+        self.rsi_tracker = rsi_tracker or RSITracker()
+        self.metrics_registry = metrics_registry or MetricsRegistry()
+        self.delta_tracker = delta_tracker or DeltaTracker()
+        self.yield_tracker = yield_tracker or YieldTracker()
+        # Tickers the last scans skipped when their time budget ran out; the next scan takes them first
+        self._skipped = set()
+        self._skipped_lock = threading.Lock()
+
+    def resolve_fetch_strategy(self, fetch_mode="auto", batch_size=DEFAULT_BATCH_SIZE, max_workers=DEFAULT_MAX_WORKERS):
+        """Fit a requested fetch strategy to the provider; returns (fetch_mode, batch_size, max_workers)"""
+        capabilities = self.provider.capabilities
+        if fetch_mode == "auto" or (fetch_mode == "batched" and not capabilities.batch_bars):
+            fetch_mode = "batched" if capabilities.batch_bars else "per-ticker"
+        if capabilities.max_batch_size:
+            batch_size = min(batch_size, capabilities.max_batch_size)
+        return fetch_mode, batch_size, max(1, min(max_workers, capabilities.max_concurrency))
+
+    def fetch_info(self, ticker):
+        """provider.info() through the circuit breaker"""
+        return self.circuit_breaker.call(self.provider.info, ticker)
+
+    def record_failure(self, ticker, exc, metrics=None):
+        """Classify a failed request for one ticker and count it toward the ticker's quarantine"""
+        if isinstance(exc, CircuitOpenError):
+            # The provider is failing as a whole, which says nothing about this symbol
+            count_failure(metrics, "circuit_open")
+            return
+        reason = classify_failure(exc)
+        count_failure(metrics, reason)
+        self.quarantine.record_failure(ticker, reason, exc)
+
+    def plan_bar_fetches(self, ticker, session_type):
+        """Bar intervals to request for a ticker this scan: the fewest that yield every field the filters and score use
+
+        Intraday sessions take price, volume and the gap open from the 1-minute bars; the daily
+        bars only add the completed days (previous close, RSI), which are final once synced after
+        the last close, so one request per ticker is left. Daily-only sessions need the daily bars
+        until they are final, then none at all. Fundamentals come from their own cache.
+        """
+        intraday_request, _ = get_session_history_requests(session_type)
+        plan = [] if self.delta_tracker.is_settled(ticker, "1d") else ["1d"]
+        if intraday_request:
+            plan.append(intraday_request["interval"])
+        return plan
+
+    def load_daily_bars(self, ticker, session_type, metrics=None):
+        """Read a session's daily bars from the bar store"""
+        _, daily_request = get_session_history_requests(session_type)
+        with timed(metrics, "bar_read", ticker):
+            return self.bar_store.read_period(ticker, **daily_request)
+
+    def load_intraday_bars(self, ticker, session_type, daily, metrics=None):
+        """Read a session's intraday bars from the bar store (sessions without any use the daily bars)"""
+        intraday_request, _ = get_session_history_requests(session_type)
+        if not intraday_request:
+            return daily
+        with timed(metrics, "bar_read", ticker):
+            return self.bar_store.read_period(ticker, **intraday_request)
+
+    def sync_ticker_bars(self, ticker, interval, session_type, metrics=None):
+        """Fetch only the bars newer than the store for one ticker and merge them in (nothing once they are final)"""
+        if interval not in self.plan_bar_fetches(ticker, session_type):
+            count_delta(metrics, "fetch_skipped")
+            return
+        started_at = datetime.now(ET)
+        try:
+            with timed(metrics, FETCH_PHASES[interval], ticker):
+                fetch_args = self.bar_store.fetch_args(ticker, interval)
+                # Intraday bars are always stored with pre/post data; regular-hours reads filter them
+                bars = self.circuit_breaker.call(self.provider.history, ticker, interval, prepost=interval != "1d",
+                                                 **fetch_args)
+                self.bar_store.merge(ticker, interval, bars)
+        except Exception as exc:
+            self.record_failure(ticker, exc, metrics)
+            raise
+        if self.record_bar_outcome(ticker, interval, fetch_args, bars, metrics):
+            self.delta_tracker.mark_synced(ticker, interval, started_at)
+
+    def record_bar_outcome(self, ticker, interval, fetch_args, bars, metrics=None):
+        """Clear a ticker's failures when a fetch returned bars, or count a daily backfill that returned none
+
+        Only a daily backfill proves a symbol has no data: an incremental fetch may have nothing
+        new, and a quiet ticker may have no minute bars. Returns False for a backfill without data.
+        """
+        if bars is not None and not bars.empty:
+            self.quarantine.record_success(ticker)
+        elif interval == "1d" and "period" in fetch_args:
+            count_failure(metrics, "no_data")
+            self.quarantine.record_failure(ticker, "no_data", f"no {interval} bars for {fetch_args['period']}")
+            return False
+        return True
+
+    def get_ticker_rsi(self, ticker, daily, current_price, price_date):
+        """Get the RSI at the latest price, folding new daily closes into the ticker's RSI state"""
+        today = datetime.now(ET).date()
+        if not self.rsi_tracker.update(ticker, daily['Close'], today):
+            # No state yet, or the recent window skips past it: replay the stored daily history once
+            self.rsi_tracker.rebuild(ticker, self.bar_store.read(ticker, "1d")['Close'], today)
+        return self.rsi_tracker.rsi(ticker, current_price, price_date)
+
+    def build_session_data(self, ticker, session_type, hist, daily, info, metrics=None):
+        """Build the per-ticker data dict from intraday bars, daily bars and fundamentals"""
+        try:
+            if daily.empty or len(daily) < 2:
+                return None
+
+            # Calculate current/latest price
+            if not hist.empty and session_type in ["premarket", "afterhours", "regular"]:
+                current_price = hist['Close'].iloc[-1]
+                current_volume = hist['Volume'].iloc[-1] if hist['Volume'].iloc[-1] > 0 else daily['Volume'].iloc[-1]
+                price_date = hist.index[-1].date()
+            else:
+                current_price = daily['Close'].iloc[-1]
+                current_volume = daily['Volume'].iloc[-1]
+                price_date = daily.index[-1].date()
+
+            prev_close = daily['Close'].iloc[-2]
+            change_pct = ((current_price - prev_close) / prev_close) * 100
+
+            # Calculate gap based on session
+            if session_type in ["premarket", "regular"] and not hist.empty:
+                try:
+                    today_open = hist['Open'].iloc[0]
+                    gap_pct = ((today_open - prev_close) / prev_close) * 100
+                except:
+                    gap_pct = change_pct
+            else:
+                gap_pct = change_pct
+
+            # Fundamental data, looked up by the fundamentals stage
+            try:
+                market_cap = info.get('marketCap', 0)
+                float_shares = info.get('floatShares', 0)
+                shares_outstanding = info.get('sharesOutstanding', 0)
+
+                if market_cap == 0 and shares_outstanding > 0:
+                    market_cap = current_price * shares_outstanding
+
+                if float_shares == 0:
+                    float_shares = shares_outstanding * 0.75 if shares_outstanding > 0 else 0
+
+            except:
+                return None
+
+            # Wilder RSI from the persisted state, with a provisional step for the latest price
+            with timed(metrics, "rsi", ticker):
+                rsi = self.get_ticker_rsi(ticker, daily, current_price, price_date)
+
+            return {
+                'ticker': ticker,
+                'current_price': float(current_price),
+                'change_pct': float(change_pct),
+                'gap_pct': float(gap_pct),
+                'volume': int(current_volume) if current_volume > 0 else 0,
+                'market_cap': int(market_cap) if market_cap > 0 else 0,
+                'float_shares': int(float_shares) if float_shares > 0 else 0,
+                'rsi': float(rsi) if not pd.isna(rsi) else 50,
+                'session': SESSION_LABELS.get(session_type, session_type.upper()),
+            }
+
+        except Exception as exc:
+            if metrics:
+                metrics.record_error("build", exc)
+            return None
+
+    def build_changed_session_data(self, ticker, session_type, hist, daily, info, metrics=None):
+        """build_session_data(), or the ticker's previous session data when none of its inputs changed"""
+        today = datetime.now(ET).date()
+        _, daily_request = get_session_history_requests(session_type)
+        daily = with_session_bar(daily, hist, today, int(daily_request["period"].rstrip("d")))
+        fingerprint = input_fingerprint(session_type, info, daily, hist, today)
+        data = self.delta_tracker.lookup(session_type, ticker, fingerprint)
+        if data is not None:
+            count_delta(metrics, "unchanged")
+            return data
+        count_delta(metrics, "changed")
+        data = self.build_session_data(ticker, session_type, hist, daily, info, metrics)
+        if data is not None:
+            self.delta_tracker.store(session_type, ticker, fingerprint, data)
+        return data
+
+    def screen_ticker_fundamentals(self, ticker, metrics=None):
+        """Return a ticker's fundamentals (served from the local store, fetched only when expired) if
+        they leave it a chance to qualify, else None; quarantined tickers are ruled out without a request"""
+        if self.quarantine.is_quarantined(ticker):
+            count_failure(metrics, "quarantined")
+            return None
+        try:
+            with timed(metrics, "fundamentals", ticker):
+                info = self.fundamentals_cache.get_info(ticker)
+        except Exception as exc:
+            # Only raised when nothing is stored for the ticker and the fetch failed
+            self.record_failure(ticker, exc, metrics)
+            return None
+        return info if screen_fundamentals(info) else None
+
+    def get_session_specific_data(self, ticker, session_type, metrics=None):
+        """Get session-specific stock data with extended hours, one pipeline stage at a time
+
+        Returns None as soon as a stage rules the ticker out, so its later fetches are never made.
+        """
+        intraday_request, _ = get_session_history_requests(session_type)
+        stage = "fundamentals"
+        try:
+            count_stage(metrics, stage, entered=1)
+            info = self.screen_ticker_fundamentals(ticker, metrics)
+            if info is not None:
+                stage = "daily"
+                count_stage(metrics, stage, entered=1)
+                self.sync_ticker_bars(ticker, "1d", session_type, metrics)
+                daily = self.load_daily_bars(ticker, session_type, metrics)
+
+                if screen_daily_bars(daily, session_type):
+                    if intraday_request:
+                        stage = "intraday"
+                        count_stage(metrics, stage, entered=1)
+                        self.sync_ticker_bars(ticker, "1m", session_type, metrics)
+                    hist = self.load_intraday_bars(ticker, session_type, daily, metrics)
+
+                    stage = "score"
+                    count_stage(metrics, stage, entered=1)
+                    data = self.build_changed_session_data(ticker, session_type, hist, daily, info, metrics)
+                    if data is not None:
+                        return data
+
+        except Exception as exc:
+            if metrics:
+                metrics.record_error("build", exc)
+        count_stage(metrics, stage, eliminated=1)
+        return None
+
+    def sync_batch_bars(self, tickers, interval, session_type, metrics=None):
+        """Fetch only the bars newer than the store for a group of tickers in grouped downloads"""
+        # Tickers seen before share one incremental request; new ones share one backfill request
+        incremental, backfill = [], {}
+        start = None
+        for ticker in tickers:
+            if interval not in self.plan_bar_fetches(ticker, session_type):
+                count_delta(metrics, "fetch_skipped")
+                continue
+            fetch_args = self.bar_store.fetch_args(ticker, interval)
+            if "start" in fetch_args:
+                incremental.append(ticker)
+                start = fetch_args["start"] if start is None else min(start, fetch_args["start"])
+            else:
+                backfill.setdefault(fetch_args["period"], []).append(ticker)
+
+        requests = [(group, {"period": period}) for period, group in backfill.items()]
+        if incremental:
+            requests.append((incremental, {"start": start}))
+
+        for group, fetch_args in requests:
+            started_at = datetime.now(ET)
+            try:
+                with timed(metrics, FETCH_PHASES[interval], group):
+                    bars = self.circuit_breaker.call(self.provider.download, group, interval,
+                                                     prepost=interval != "1d", **fetch_args)
+                    for ticker in group:
+                        self.bar_store.merge(ticker, interval, bars.get(ticker))
+            except Exception as exc:
+                # A failed grouped download is not any one symbol's fault
+                count_failure(metrics, "circuit_open" if isinstance(exc, CircuitOpenError) else classify_failure(exc))
+                continue
+            synced = [ticker for ticker in group
+                      if self.record_bar_outcome(ticker, interval, fetch_args, bars.get(ticker), metrics)]
+            self.delta_tracker.mark_synced(synced, interval, started_at)
+
+    def sync_daily_stage(self, tickers, session_type, metrics=None):
+        """Bring a group's daily bars up to date; returns {ticker: daily bars} for the tickers that pass them"""
+        self.sync_batch_bars(tickers, "1d", session_type, metrics)
+        survivors = {}
+        for ticker in tickers:
+            try:
+                daily = self.load_daily_bars(ticker, session_type, metrics)
+            except Exception as exc:
+                if metrics:
+                    metrics.record_error("build", exc)
+                continue
+            if screen_daily_bars(daily, session_type):
+                survivors[ticker] = daily
+        return survivors
+
+    def sync_intraday_stage(self, tickers, session_type, metrics=None):
+        """Bring a group's intraday bars up to date; returns {ticker: intraday bars} for the tickers read"""
+        self.sync_batch_bars(tickers, "1m", session_type, metrics)
+        bars = {}
+        for ticker in tickers:
+            try:
+                bars[ticker] = self.load_intraday_bars(ticker, session_type, None, metrics)
+            except Exception as exc:
+                if metrics:
+                    metrics.record_error("build", exc)
+        return bars
+
+    def iter_session_data(self, scan_tickers, session_type, fetch_mode="auto", batch_size=DEFAULT_BATCH_SIZE,
+                          max_workers=DEFAULT_MAX_WORKERS, on_batch=None, metrics=None, deadline=None):
+        """Run tickers through the scan stages on a bounded thread pool, yielding (ticker, data) as each finishes
+
+        Stages run cheapest first: the fundamentals screen, the daily bars, the intraday bars, then
+        the full build (RSI included). data is None for tickers a stage ruled out; they are yielded
+        straight away and never reach the later, costlier fetches. Past deadline (a time.monotonic()
+        value) no more fetches are started; requests in flight finish, and tickers that never got
+        one are not yielded at all.
+        """
+        fetch_mode, batch_size, max_workers = self.resolve_fetch_strategy(fetch_mode, batch_size, max_workers)
+        if metrics:
+            metrics.fetch_mode = fetch_mode
+
+        if fetch_mode != "batched":
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {executor.submit(self.get_session_specific_data, ticker, session_type, metrics): ticker
+                           for ticker in scan_tickers}
+                done = set()
+                try:
+                    for future in concurrent.futures.as_completed(futures, timeout=seconds_left(deadline)):
+                        done.add(future)
+                        yield futures[future], future_data(future)
+                except concurrent.futures.TimeoutError:
+                    # Out of time: tickers not started yet are skipped, the ones in flight still finish
+                    running = [future for future in futures if future not in done and not future.cancel()]
+                    for future in concurrent.futures.as_completed(running):
+                        yield futures[future], future_data(future)
+            return
+
+        # Grouped downloads get their own threads so they never queue behind per-ticker work; the two
+        # pools together stay within max_workers (from 2 up)
+        download_workers = max(1, max_workers // 2) if self.provider.capabilities.concurrent_batches else 1
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, max_workers - download_workers)) as executor, \
+                concurrent.futures.ThreadPoolExecutor(max_workers=download_workers) as downloader:
+            yield from self.iter_batched_stages(executor, downloader, scan_tickers, session_type, batch_size,
+                                                on_batch, metrics, deadline)
+
+    def iter_batched_stages(self, executor, downloader, scan_tickers, session_type, batch_size, on_batch=None,
+                            metrics=None, deadline=None):
+        """Batched fetching for iter_session_data()
+
+        Fundamentals lookups fan out per ticker. Their survivors are regrouped into full batches for
+        grouped daily downloads, and the daily survivors into full batches for grouped intraday
+        downloads, so screened-out tickers do not leave short, wasteful requests behind. Past
+        deadline, lookups not started yet are cancelled and no download is started; the tickers
+        still waiting for one are dropped.
+        """
+        intraday_request, _ = get_session_history_requests(session_type)
+        concurrent_batches = self.provider.capabilities.concurrent_batches
+        # Futures land on a queue as they finish, so waiting stays O(1) however many are in flight
+        finished = queue.Queue()
+        pending = {}
+        running = Counter()
+        queues = {"daily": [], "intraday": []}
+        infos, dailies = {}, {}
+        expired = False
+
+        def submit(stage, key, fn, *args):
+            future = (downloader if stage in queues else executor).submit(fn, *args)
+            pending[future] = (stage, key)
+            running[stage] += 1
+            future.add_done_callback(finished.put)
+
+        def submit_build(ticker, hist, daily):
+            count_stage(metrics, "score", entered=1)
+            submit("score", ticker, self.build_changed_session_data, ticker, session_type, hist, daily, infos.pop(ticker),
+                   metrics)
+
+        def can_grow(stage):
+            # Whether an upstream stage may still add tickers to a stage's queue
+            if stage == "daily":
+                return running["fundamentals"] > 0
+            return running["fundamentals"] > 0 or running["daily"] > 0 or bool(queues["daily"])
+
+        def expire():
+            nonlocal expired
+            expired = True
+            # Cancelled lookups still land on the queue; fetches already running and local builds carry on
+            for future, (stage, _) in list(pending.items()):
+                if stage == "fundamentals":
+                    future.cancel()
+
+        def start_downloads():
+            while not expired and (concurrent_batches or not (running["daily"] or running["intraday"])):
+                # Full batches go first; a short batch only once its queue can no longer fill up
+                ready = [stage for stage in ("intraday", "daily")
+                         if len(queues[stage]) >= batch_size or (queues[stage] and not can_grow(stage))]
+                if not ready:
+                    return
+                stage = ready[0]
+                batch, queues[stage] = queues[stage][:batch_size], queues[stage][batch_size:]
+                count_stage(metrics, stage, entered=len(batch))
+                if on_batch:
+                    on_batch(batch)
+                stage_fn = self.sync_daily_stage if stage == "daily" else self.sync_intraday_stage
+                submit(stage, batch, stage_fn, batch, session_type, metrics)
+
+        count_stage(metrics, "fundamentals", entered=len(scan_tickers))
+        for ticker in scan_tickers:
+            submit("fundamentals", ticker, self.screen_ticker_fundamentals, ticker, metrics)
+
+        while pending:
+            if deadline is not None and not expired:
+                try:
+                    future = finished.get(timeout=seconds_left(deadline))
+                except queue.Empty:
+                    expire()
+                    continue
+                if time.monotonic() >= deadline:
+                    expire()
+            else:
+                future = finished.get()
+            stage, key = pending.pop(future)
+            running[stage] -= 1
+            if future.cancelled():
+                continue
+            try:
+                result = future.result()
+            except Exception:
+                result = None
+
+            if stage == "fundamentals":
+                if result is None:
+                    count_stage(metrics, stage, eliminated=1)
+                    yield key, None
+                else:
+                    infos[key] = result
+                    queues["daily"].append(key)
+            elif stage in ("daily", "intraday"):
+                passed = result or {}
+                for ticker in key:
+                    if ticker not in passed:
+                        count_stage(metrics, stage, eliminated=1)
+                        infos.pop(ticker, None)
+                        dailies.pop(ticker, None)
+                        yield ticker, None
+                    elif stage == "daily" and intraday_request:
+                        dailies[ticker] = passed[ticker]
+                        queues["intraday"].append(ticker)
+                    elif stage == "daily":
+                        submit_build(ticker, passed[ticker], passed[ticker])
+                    else:
+                        submit_build(ticker, passed[ticker], dailies.pop(ticker))
+            else:
+                if result is None:
+                    count_stage(metrics, stage, eliminated=1)
+                yield key, result
+
+            start_downloads()
+
+    def run_quantscore_scan(self, scan_tickers, session_type, fetch_mode="auto", batch_size=DEFAULT_BATCH_SIZE,
+                            max_workers=DEFAULT_MAX_WORKERS, on_progress=None, progress_interval=PROGRESS_INTERVAL_SECONDS,
+                            on_results=None, time_budget=None):
+        """Scan tickers concurrently and return the qualified result rows as ScanResults
+
+        on_progress(done, total, current) is called at most once per progress_interval seconds,
+        plus once when the last ticker completes. With on_results, the scan streams: tickers
+        that came in are scored at the same cadence and on_results(rows) receives each batch of
+        newly qualified rows, so the first results arrive long before the scan ends. Per-phase
+        timings, errors and timeouts of the scan are recorded in metrics_registry.
+
+        With time_budget (seconds) the scan stops starting fetches once the budget is spent and
+        returns what it completed; the tickers it never got to are in the results' skipped list,
+        and this engine's next scan takes them first. Otherwise tickers go in yield order (see
+        YieldTracker), so likely qualifiers are fetched and streamed first.
+        """
+        metrics = ScanMetrics(session_type, fetch_mode, len(scan_tickers))
+        # One timestamp for every row this scan scores
+        scanned_at = datetime.now(ET)
+        deadline = None if time_budget is None else time.monotonic() + time_budget
+        scan_tickers = self.skipped_first(self.yield_tracker.order(session_type, scan_tickers))
+        scanned = set()
+        # (ticker, threshold proximity, QuantScore™ or None) of every ticker scanned, for the yield tracker
+        outcomes = []
+        pending = []
+        results = []
+        completed = 0
+        total = len(scan_tickers)
+        last_report = [float("-inf")]
+
+        def score_pending():
+            # Scores are elementwise, so scoring in pieces gives exactly the one-pass results
+            if not pending:
+                return
+            # Session data reused from the previous scan keeps its previous score and filter result
+            scored = [self.delta_tracker.score_of(session_type, data) for data in pending]
+            fresh = [i for i, (hit, _) in enumerate(scored) if not hit]
+            if fresh:
+                with metrics.phase("filter_score", [pending[i]['ticker'] for i in fresh]):
+                    scores, qualified = score_quantscore_batch(pd.DataFrame([pending[i] for i in fresh]), session_type)
+                    for i, score, passed in zip(fresh, scores, qualified):
+                        row = build_result_row(pending[i], float(score), scanned_at) if passed else None
+                        self.delta_tracker.store_score(session_type, pending[i], row)
+                        scored[i] = (True, row)
+            # Rows reused from an earlier scan are restamped, so every row of this scan shares its timestamp
+            rows = [row if row.updated is scanned_at else row.stamped(scanned_at) for _, row in scored if row is not None]
+            outcomes.extend((data['ticker'], filter_proximity(data, session_type), row and row['QuantScore™'])
+                            for data, (_, row) in zip(pending, scored))
+            count_stage(metrics, "score", eliminated=len(pending) - len(rows))
+            pending.clear()
+            results.extend(rows)
+            if rows and on_results:
+                on_results(rows)
+
+        def report(current):
+            if not (on_progress or on_results):
+                return
+            now = time.monotonic()
+            if now - last_report[0] >= progress_interval or completed == total:
+                last_report[0] = now
+                if on_results:
+                    score_pending()
+                if on_progress:
+                    with metrics.phase("progress"):
+                        on_progress(completed, total, current)
+
+        def report_batch(batch):
+            report(f"{batch[0]}…{batch[-1]} ({len(batch)} tickers)")
+
+        try:
+            for ticker, data in self.iter_session_data(scan_tickers, session_type, fetch_mode, batch_size, max_workers,
+                                                       report_batch, metrics, deadline):
+                completed += 1
+                scanned.add(ticker)
+                if data:
+                    pending.append(data)
+                else:
+                    outcomes.append((ticker, 0.0, None))
+                report(ticker)
+
+            # Score whatever is left (everything, when not streaming) in one vectorized pass
+            score_pending()
+            skipped = [ticker for ticker in scan_tickers if ticker not in scanned] if completed < total else []
+            self.remember_skipped(scanned, skipped)
+            self.yield_tracker.record(session_type, outcomes)
+        finally:
+            # Aborted scans are recorded too, with what they got through
+            metrics.finish(len(results), total - completed)
+            self.metrics_registry.record(metrics)
+        return ScanResults(results, total, skipped)
+
+    def skipped_first(self, scan_tickers):
+        """scan_tickers with the ones earlier scans skipped for lack of time moved to the front, in order"""
+        with self._skipped_lock:
+            if not self._skipped:
+                return scan_tickers
+            return ([ticker for ticker in scan_tickers if ticker in self._skipped] +
+                    [ticker for ticker in scan_tickers if ticker not in self._skipped])
+
+    def remember_skipped(self, scanned, skipped):
+        """Forget the skipped tickers a scan got through and remember the ones it skipped"""
+        with self._skipped_lock:
+            self._skipped.difference_update(scanned)
+            self._skipped.update(skipped)
+
+
+class ScanResults(list):
+    """Qualified result rows of a scan, plus the tickers it skipped when its time budget ran out
+
+    It is the plain list of rows to anything that only wants those. tickers is how many the
+    scan was given and coverage the share of them it got through.
+    """
+
+    def __init__(self, rows=(), tickers=0, skipped=()):
+        super().__init__(rows)
+        self.tickers = tickers
+        self.skipped = list(skipped)
+
+    @property
+    def coverage(self):
+        return 1.0 - len(self.skipped) / self.tickers if self.tickers else 1.0
+
+
+class LiveRanking:
+    """Top-N qualified rows of a scan in progress, updated as rows stream in; safe to read from other threads
+
+    Rows are keyed by ticker: a ticker that arrives again (a viewer that took over an abandoned
+    shared scan gets its rows republished) replaces its earlier row and is counted once. The
+    latest row of every ticker is kept, so a ticker rescored lower makes room for the next best.
+    """
+
+    def __init__(self, limit=LIVE_RANKING_SIZE):
+        self.limit = limit
+        self._lock = threading.Lock()
+        # ticker -> (score, arrival, row) of its latest row; arrival breaks score ties
+        self._latest = {}
+        self._arrivals = itertools.count()
+
+    @property
+    def qualified(self):
+        return len(self._latest)
+
+    def add(self, rows):
+        with self._lock:
+            for row in rows:
+                self._latest[row['Ticker']] = (row['QuantScore™'], next(self._arrivals), row)
+
+    def rows(self):
+        """The current top rows, best first"""
+        with self._lock:
+            return [row for _, _, row in heapq.nlargest(self.limit, self._latest.values())]
+
+
+def rank_results(results, top_k=None):
+    """Return qualified rows as a DataFrame ranked by QuantScore (rank 1 = best), only the top_k best when given"""
+    df = pd.DataFrame([row.values() for row in results], columns=RESULT_COLUMNS)
+    if top_k is not None and top_k < len(df):
+        # Partial selection: only the kept rows get sorted
+        scores = df['QuantScore™'].to_numpy()
+        df = df.iloc[np.argpartition(-scores, top_k - 1)[:top_k]] if top_k > 0 else df.iloc[:0]
+    df = df.sort_values('QuantScore™', ascending=False)
+    # Rows share their scan's timestamp, so each distinct one is formatted once, for the kept rows only
+    labels = {}
+    df['Updated'] = [labels[stamp] if stamp in labels else labels.setdefault(stamp, stamp.strftime(UPDATED_FORMAT))
+                     for stamp in df['Updated'].tolist()]
+    df.index = range(1, len(df) + 1)
+    df.index.name = 'Rank'
+    return df
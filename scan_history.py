@@ -0,0 +1,70 @@
+"""Bounded in-memory history of finished QuantScore™ scans, shared by every dashboard viewer"""
+import itertools
+import threading
+from collections import deque, namedtuple
+
+# Finished scans kept per session class; the oldest drops out when a new one lands
+SCAN_HISTORY_SIZE = 10
+
+
+class ScanRecord(namedtuple('ScanRecord', ['scan_id', 'session_class', 'finished_at', 'results', 'tickers', 'skipped'])):
+    """One finished scan; results is a tuple of ResultRows and skipped a tuple of tickers, neither to be mutated"""
+
+    __slots__ = ()
+
+    @property
+    def coverage(self):
+        return 1.0 - len(self.skipped) / self.tickers if self.tickers else 1.0
+
+
+class ScanHistory:
+    """The last N finished scans of each session class, in fixed-size ring buffers
+
+    Viewers keep a reference to the ScanRecord they show instead of a copy of its rows, so
+    the process holds at most N scans per session class plus any older record a viewer still
+    shows, however many viewers there are. A scan is identified by its session class and
+    finish time: adding it again (another viewer served from the scan cache or loading the
+    same snapshot) returns the record already kept.
+    """
+
+    def __init__(self, size=SCAN_HISTORY_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._scans = {}  # session_class -> deque of ScanRecord, oldest first
+        self._ids = itertools.count(1)
+
+    def add(self, session_class, results, finished_at, tickers=None, skipped=None):
+        """Record a finished scan and return its ScanRecord
+
+        tickers and skipped default to those of results when it is a ScanResults.
+        """
+        with self._lock:
+            scans = self._scans.setdefault(session_class, deque(maxlen=self.size))
+            for record in reversed(scans):
+                if record.finished_at == finished_at:
+                    return record
+            record = ScanRecord(
+                scan_id=next(self._ids),
+                session_class=session_class,
+                finished_at=finished_at,
+                results=tuple(results),
+                tickers=getattr(results, "tickers", len(results)) if tickers is None else tickers,
+                skipped=tuple(getattr(results, "skipped", ()) if skipped is None else skipped),
+            )
+            scans.append(record)
+            return record
+
+    def scans(self, session_class):
+        """Kept scans of a session class, newest first"""
+        with self._lock:
+            return list(reversed(self._scans.get(session_class, ())))
+
+    def latest(self, session_class):
+        """Newest kept scan of a session class, or None"""
+        with self._lock:
+            scans = self._scans.get(session_class)
+            return scans[-1] if scans else None
+
+    def clear(self):
+        with self._lock:
+            self._scans.clear()
@@ -0,0 +1,364 @@
+"""Per-phase QuantScore™ scan instrumentation with Prometheus text and JSON export"""
+import contextlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Phases in pipeline order; "bar_read" is the local bar store, "progress" the on_progress callbacks (UI updates)
+PHASES = ["daily_fetch", "intraday_fetch", "bar_read", "fundamentals", "rsi", "filter_score", "progress"]
+
+# Scan pipeline stages, cheapest first; a ticker leaves the scan at the first stage it cannot pass
+STAGES = ["fundamentals", "daily", "intraday", "score"]
+
+# Delta-scan outcomes: tickers rebuilt because an input changed, tickers whose previous result was
+# reused, and bar fetches skipped because the stored bars were already final
+DELTA_KINDS = ["changed", "unchanged", "fetch_skipped"]
+
+# Provider failures by reason (see provider_health.classify_failure()), tickers skipped because
+# they were quarantined, and requests refused while the provider's circuit breaker was open
+FAILURE_KINDS = ["no_data", "timeout", "http_error", "error", "quarantined", "circuit_open"]
+
+# Port for the /metrics endpoint; it is off unless a port is set
+METRICS_PORT = os.environ.get("QUANTSCORE_METRICS_PORT", "")
+# Interface the endpoint listens on; it has no authentication, so only the local host by default
+METRICS_HOST = os.environ.get("QUANTSCORE_METRICS_HOST", "127.0.0.1")
+
+SLOWEST_TICKERS = 10
+
+
+def is_timeout(exc):
+    """Best-effort check whether an exception is a request timeout, whichever HTTP stack raised it"""
+    if isinstance(exc, TimeoutError):
+        return True
+    reason = getattr(exc, "reason", None)
+    if isinstance(reason, TimeoutError):
+        return True
+    return "timeout" in type(exc).__name__.lower() or "timed out" in str(exc).lower()
+
+
+def timed(metrics, phase, tickers=None):
+    """metrics.phase(...) when a scan is being measured, else a no-op context"""
+    return metrics.phase(phase, tickers) if metrics is not None else contextlib.nullcontext()
+
+
+def count_stage(metrics, stage, entered=0, eliminated=0):
+    """metrics.count_stage(...) when a scan is being measured"""
+    if metrics is not None:
+        metrics.count_stage(stage, entered, eliminated)
+
+
+def count_delta(metrics, kind, count=1):
+    """metrics.count_delta(...) when a scan is being measured"""
+    if metrics is not None:
+        metrics.count_delta(kind, count)
+
+
+def count_failure(metrics, kind, count=1):
+    """metrics.count_failure(...) when a scan is being measured"""
+    if metrics is not None:
+        metrics.count_failure(kind, count)
+
+
+class ScanMetrics:
+    """Timings, errors and timeouts of one scan, broken down by phase and by ticker
+
+    Work done for a group of tickers (a grouped download, the vectorized scoring pass) is
+    charged to each of them in equal shares. Every exception is counted once, in the
+    innermost phase it passed through, even when the engine swallows it afterwards.
+    """
+
+    def __init__(self, session_type, fetch_mode, tickers):
+        self.session_type = session_type
+        self.fetch_mode = fetch_mode
+        self.tickers = tickers
+        self.qualified = 0
+        self.skipped = 0
+        self.started_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self.phase_samples = {phase: [] for phase in PHASES}
+        self.ticker_phases = {}
+        self.errors = Counter()
+        self.timeouts = Counter()
+        self.stage_entered = Counter()
+        self.stage_eliminated = Counter()
+        self.delta = Counter()
+        self.failures = Counter()
+
+    @contextlib.contextmanager
+    def phase(self, name, tickers=None):
+        """Time the block as one call of phase name, charged to tickers (one ticker or a list)"""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as exc:
+            self.record_error(name, exc)
+            raise
+        finally:
+            self.record(name, time.perf_counter() - start, tickers)
+
+    def record(self, name, seconds, tickers=None):
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        with self._lock:
+            self.phase_samples.setdefault(name, []).append(seconds)
+            if tickers:
+                share = seconds / len(tickers)
+                for ticker in tickers:
+                    phases = self.ticker_phases.setdefault(ticker, {})
+                    phases[name] = phases.get(name, 0.0) + share
+
+    def record_error(self, name, exc):
+        """Count an exception against a phase unless an inner phase already counted it"""
+        if getattr(exc, "_scan_metrics_counted", False):
+            return
+        try:
+            exc._scan_metrics_counted = True
+        except AttributeError:
+            pass
+        with self._lock:
+            self.errors[(name, type(exc).__name__)] += 1
+            if is_timeout(exc):
+                self.timeouts[name] += 1
+
+    def count_stage(self, stage, entered=0, eliminated=0):
+        """Count tickers reaching a pipeline stage and tickers the stage dropped"""
+        with self._lock:
+            self.stage_entered[stage] += entered
+            self.stage_eliminated[stage] += eliminated
+
+    def stage_summary(self):
+        """Return {stage: {"entered", "eliminated"}} for stages tickers reached, in pipeline order"""
+        with self._lock:
+            return {stage: {"entered": self.stage_entered[stage], "eliminated": self.stage_eliminated[stage]}
+                    for stage in STAGES if stage in self.stage_entered}
+
+    def count_delta(self, kind, count=1):
+        """Count a delta-scan outcome (one of DELTA_KINDS)"""
+        with self._lock:
+            self.delta[kind] += count
+
+    def delta_summary(self):
+        """Return {kind: count} for the delta-scan outcomes that occurred"""
+        with self._lock:
+            return {kind: self.delta[kind] for kind in DELTA_KINDS if self.delta[kind]}
+
+    def count_failure(self, kind, count=1):
+        """Count a provider failure or a skip it caused (one of FAILURE_KINDS)"""
+        with self._lock:
+            self.failures[kind] += count
+
+    def failure_summary(self):
+        """Return {kind: count} for the provider failures and skips that occurred"""
+        with self._lock:
+            return {kind: self.failures[kind] for kind in FAILURE_KINDS if self.failures[kind]}
+
+    def finish(self, qualified, skipped=0):
+        """Close the scan with its qualified count and the tickers its time budget left unscanned"""
+        self.qualified = qualified
+        self.skipped = skipped
+        self.finished_at = time.time()
+
+    @property
+    def seconds(self):
+        return (self.finished_at or time.time()) - self.started_at
+
+    def phase_summary(self):
+        """Return {phase: calls, total/mean/p50/p99/max seconds} for phases that ran"""
+        with self._lock:
+            samples = {name: list(values) for name, values in self.phase_samples.items() if values}
+        summary = {}
+        for name, values in samples.items():
+            values = np.asarray(values)
+            summary[name] = {
+                "calls": len(values),
+                "total_seconds": float(values.sum()),
+                "mean_seconds": float(values.mean()),
+                "p50_seconds": float(np.percentile(values, 50)),
+                "p99_seconds": float(np.percentile(values, 99)),
+                "max_seconds": float(values.max()),
+            }
+        return summary
+
+    def slowest_tickers(self, limit=SLOWEST_TICKERS):
+        """Return [(ticker, total seconds, {phase: seconds})] for the slowest tickers"""
+        with self._lock:
+            totals = [(ticker, sum(phases.values()), dict(phases)) for ticker, phases in self.ticker_phases.items()]
+        return sorted(totals, key=lambda item: item[1], reverse=True)[:limit]
+
+    def to_dict(self):
+        with self._lock:
+            errors = [{"phase": phase, "type": kind, "count": count} for (phase, kind), count in self.errors.items()]
+            timeouts = dict(self.timeouts)
+        return {
+            "session": self.session_type,
+            "fetch_mode": self.fetch_mode,
+            "tickers": self.tickers,
+            "qualified": self.qualified,
+            "skipped": self.skipped,
+            "started_at": self.started_at,
+            "seconds": self.seconds,
+            "phases": self.phase_summary(),
+            "stages": self.stage_summary(),
+            "delta": self.delta_summary(),
+            "failures": self.failure_summary(),
+            "errors": errors,
+            "timeouts": timeouts,
+            "slowest_tickers": [{"ticker": ticker, "seconds": total, "phases": phases}
+                                for ticker, total, phases in self.slowest_tickers()],
+        }
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}" if labels else ""
+
+
+class MetricsRegistry:
+    """Process-wide totals over every finished scan plus the last scan's full breakdown"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.scans = Counter()
+        self.tickers = 0
+        self.skipped = 0
+        self.phase_seconds = Counter()
+        self.phase_calls = Counter()
+        self.errors = Counter()
+        self.timeouts = Counter()
+        self.stage_eliminated = Counter()
+        self.delta = Counter()
+        self.failures = Counter()
+        self.last = None
+
+    def record(self, metrics):
+        phases = metrics.phase_summary()
+        with self._lock:
+            self.scans[metrics.session_type] += 1
+            self.tickers += metrics.tickers
+            self.skipped += metrics.skipped
+            for name, stats in phases.items():
+                self.phase_seconds[name] += stats["total_seconds"]
+                self.phase_calls[name] += stats["calls"]
+            self.errors.update(metrics.errors)
+            self.timeouts.update(metrics.timeouts)
+            self.stage_eliminated.update(metrics.stage_eliminated)
+            self.delta.update(metrics.delta)
+            self.failures.update(metrics.failures)
+            self.last = metrics
+
+    def to_dict(self):
+        with self._lock:
+            last = self.last
+            totals = {
+                "scans": dict(self.scans),
+                "tickers": self.tickers,
+                "skipped": self.skipped,
+                "phase_seconds": dict(self.phase_seconds),
+                "phase_calls": dict(self.phase_calls),
+                "errors": [{"phase": phase, "type": kind, "count": count}
+                           for (phase, kind), count in self.errors.items()],
+                "timeouts": dict(self.timeouts),
+                "stage_eliminated": dict(self.stage_eliminated),
+                "delta": dict(self.delta),
+                "failures": dict(self.failures),
+            }
+        return {"totals": totals, "last_scan": last.to_dict() if last else None}
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self):
+        """Render the Prometheus text exposition format"""
+        snapshot = self.to_dict()
+        totals, last = snapshot["totals"], snapshot["last_scan"]
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(**labels)} {value}")
+
+        metric("quantscore_scans_total", "counter", "Finished scans by session class.",
+               [({"session": session}, count) for session, count in totals["scans"].items()])
+        metric("quantscore_tickers_scanned_total", "counter", "Tickers scanned across all scans.",
+               [({}, totals["tickers"])])
+        metric("quantscore_tickers_skipped_total", "counter",
+               "Tickers left unscanned because a scan ran out of its time budget.", [({}, totals["skipped"])])
+        metric("quantscore_phase_seconds_total", "counter", "Time spent per scan phase.",
+               [({"phase": phase}, seconds) for phase, seconds in totals["phase_seconds"].items()])
+        metric("quantscore_phase_calls_total", "counter", "Calls per scan phase.",
+               [({"phase": phase}, calls) for phase, calls in totals["phase_calls"].items()])
+        metric("quantscore_errors_total", "counter", "Exceptions raised inside scan phases, including swallowed ones.",
+               [({"phase": error["phase"], "type": error["type"]}, error["count"]) for error in totals["errors"]])
+        metric("quantscore_timeouts_total", "counter", "Request timeouts per scan phase.",
+               [({"phase": phase}, count) for phase, count in totals["timeouts"].items()])
+        metric("quantscore_stage_eliminated_total", "counter", "Tickers dropped per scan pipeline stage.",
+               [({"stage": stage}, count) for stage, count in totals["stage_eliminated"].items()])
+        metric("quantscore_delta_total", "counter",
+               "Tickers rebuilt (changed) or reused (unchanged) and bar fetches skipped by delta scanning.",
+               [({"kind": kind}, count) for kind, count in totals["delta"].items()])
+        metric("quantscore_provider_failures_total", "counter",
+               "Provider failures by reason, quarantined tickers skipped and requests refused by the circuit breaker.",
+               [({"kind": kind}, count) for kind, count in totals["failures"].items()])
+
+        if last:
+            metric("quantscore_last_scan_seconds", "gauge", "Wall time of the last scan.", [({}, last["seconds"])])
+            metric("quantscore_last_scan_tickers", "gauge", "Tickers in the last scan.", [({}, last["tickers"])])
+            metric("quantscore_last_scan_qualified", "gauge", "Qualified tickers in the last scan.",
+                   [({}, last["qualified"])])
+            metric("quantscore_last_scan_skipped", "gauge", "Tickers the last scan skipped when its time budget ran out.",
+                   [({}, last["skipped"])])
+            metric("quantscore_last_scan_timestamp_seconds", "gauge", "Start of the last scan (Unix time).",
+                   [({}, last["started_at"])])
+            metric("quantscore_last_scan_phase_seconds", "gauge", "Per-call phase latency quantiles in the last scan.",
+                   [({"phase": phase, "quantile": quantile}, stats[key])
+                    for phase, stats in last["phases"].items()
+                    for quantile, key in (("0.5", "p50_seconds"), ("0.99", "p99_seconds"))])
+            metric("quantscore_last_scan_stage_tickers", "gauge", "Tickers entering each pipeline stage in the last scan.",
+                   [({"stage": stage}, counts["entered"]) for stage, counts in last["stages"].items()])
+        return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves /metrics (Prometheus text) and /metrics.json"""
+
+    def do_GET(self):
+        registry = self.server.registry
+        if self.path.split("?")[0] == "/metrics":
+            body, content_type = registry.to_prometheus(), "text/plain; version=0.0.4"
+        elif self.path.split("?")[0] == "/metrics.json":
+            body, content_type = registry.to_json(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        payload = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(registry, host=None, port=None):
+    """Serve registry on a daemon thread; returns the server, or None when disabled or the port is taken"""
+    host = METRICS_HOST if host is None else host
+    port = METRICS_PORT if port is None else port
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, int(port)), MetricsHandler)
+    except OSError:
+        return None
+    server.daemon_threads = True
+    server.registry = registry
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
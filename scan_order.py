@@ -0,0 +1,62 @@
+"""Yield-ordered scan sequencing: the tickers most likely to qualify are fetched first"""
+import threading
+
+# Likelihood of a ticker never scanned in a session class, so it goes after near misses but
+# before tickers known to fall well short
+UNSEEN_LIKELIHOOD = 0.5
+
+
+class _Yield:
+    """Scan history of one ticker in one session class"""
+
+    def __init__(self):
+        self.scans = 0
+        self.hits = 0
+        self.proximity = 0.0
+        self.score = None
+
+
+class YieldTracker:
+    """Per-ticker, per-session-class record of how close each scan came to qualifying
+
+    For every scanned ticker it keeps how often it was scanned and qualified, how close its last
+    session data came to the filter thresholds (0 when a stage screened it out), and its last
+    QuantScore™ if it qualified. order() puts last scan's qualifiers first, best score first,
+    then the rest by likelihood: the mean of the threshold proximity and the hit rate
+    (Laplace-smoothed, so one scan is not a verdict). State lives in memory, like DeltaTracker's.
+    """
+
+    def __init__(self, unseen_likelihood=UNSEEN_LIKELIHOOD):
+        self.unseen_likelihood = unseen_likelihood
+        self._lock = threading.Lock()
+        self._entries = {}  # (session_type, ticker) -> _Yield
+
+    def record(self, session_type, outcomes):
+        """Record a scan's outcomes: (ticker, threshold proximity, QuantScore™ or None if it did not qualify)"""
+        with self._lock:
+            for ticker, proximity, score in outcomes:
+                entry = self._entries.setdefault((session_type, ticker), _Yield())
+                entry.scans += 1
+                entry.hits += score is not None
+                entry.proximity = proximity
+                entry.score = score
+
+    def _sort_key(self, entry):
+        # Qualifiers first by score; everyone else has score 0.0, so likelihood decides
+        if entry is None:
+            return (False, 0.0, self.unseen_likelihood)
+        likelihood = (entry.proximity + (entry.hits + 1) / (entry.scans + 2)) / 2
+        return (entry.score is not None, entry.score or 0.0, likelihood)
+
+    def order(self, session_type, tickers):
+        """tickers, likeliest qualifiers first; ties (and a session class with no history) keep their order"""
+        with self._lock:
+            if not self._entries:
+                return list(tickers)
+            keys = {ticker: self._sort_key(self._entries.get((session_type, ticker))) for ticker in tickers}
+        # reverse=True keeps equal keys in their original order
+        return sorted(tickers, key=keys.__getitem__, reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,152 @@
+"""Background QuantScore™ scan scheduler decoupled from the Streamlit rerun loop"""
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from scan_engine import LiveRanking
+
+# Immutable result of one finished scan; results is a tuple of ResultRows that readers must not mutate,
+# skipped the tickers the scan left out when its time budget ran out
+ScanSnapshot = namedtuple('ScanSnapshot', [
+    'version', 'session', 'session_class', 'results', 'finished_at', 'scan_seconds', 'scanned', 'skipped'
+])
+
+
+class ScanScheduler:
+    """Long-lived thread that runs a scan job every interval seconds and publishes snapshots
+
+    scan_job(report, publish) runs one scan and returns (session, session_class, results, scanned),
+    or None when it had nothing to scan (no snapshot is published then); results may be
+    ScanResults, whose skipped tickers the snapshot keeps. report(done, total,
+    current) exposes progress to readers and publish(rows) feeds newly qualified rows into the
+    live ranking readers see while the scan runs. The job and interval can be
+    swapped at any time with configure(); the next cycle picks them up.
+    """
+
+    def __init__(self, name="quantscore-scanner"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._job = None
+        self._interval = None
+        self._last_started = None
+        self._forced = False
+        self._snapshot = None
+        self._progress = None
+        self._live = None
+        self._last_error = None
+
+    def configure(self, scan_job, interval):
+        """Set the scan job and interval; the schedule is re-derived from the last scan's start"""
+        with self._lock:
+            self._job = scan_job
+            self._interval = interval
+        self._wake.set()
+
+    def start(self):
+        """Start the scheduler thread if it is not already running"""
+        with self._lock:
+            self._stop.clear()
+            if self._thread and self._thread.is_alive():
+                # A stopped thread still finishing its last scan simply carries on
+                return
+            self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop scheduling; a scan already running finishes and is still published"""
+        self._stop.set()
+        self._wake.set()
+
+    def trigger(self):
+        """Run the next scan now instead of waiting for the interval"""
+        with self._lock:
+            self._forced = True
+        self._wake.set()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def latest(self):
+        """Return the most recently published snapshot, or None"""
+        return self._snapshot
+
+    @property
+    def progress(self):
+        """(done, total, current) of the scan in flight, or None when idle"""
+        return self._progress
+
+    @property
+    def live_ranking(self):
+        """LiveRanking of the scan in flight, or None when idle"""
+        return self._live
+
+    @property
+    def next_run_at(self):
+        """When the next scan is due (fixed rate: interval seconds after the last one started)"""
+        with self._lock:
+            if self._last_started is None or self._interval is None or self._forced:
+                return datetime.now()
+            return self._last_started + timedelta(seconds=self._interval)
+
+    @property
+    def last_error(self):
+        return self._last_error
+
+    def _loop(self):
+        while not self._stop.is_set():
+            with self._lock:
+                job = self._job
+            if job is None:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+
+            wait_seconds = (self.next_run_at - datetime.now()).total_seconds()
+            if wait_seconds > 0:
+                # Wake early if reconfigured, triggered or stopped
+                self._wake.wait(wait_seconds)
+                self._wake.clear()
+                continue
+
+            with self._lock:
+                self._last_started = datetime.now()
+                self._forced = False
+            self._run_once(job)
+
+    def _run_once(self, job):
+        def report(done, total, current):
+            self._progress = (done, total, current)
+
+        live = LiveRanking()
+        self._progress = (0, 0, "")
+        self._live = live
+        start = time.time()
+        try:
+            outcome = job(report, live.add)
+        except Exception as exc:
+            self._last_error = f"{type(exc).__name__}: {exc}"
+            return
+        finally:
+            self._progress = None
+            self._live = None
+        if outcome is None:
+            return
+        session, session_class, results, scanned = outcome
+
+        previous = self._snapshot
+        self._snapshot = ScanSnapshot(
+            version=(previous.version + 1) if previous else 1,
+            session=session,
+            session_class=session_class,
+            results=tuple(results),
+            finished_at=datetime.now(),
+            scan_seconds=time.time() - start,
+            scanned=scanned,
+            skipped=tuple(getattr(results, "skipped", ())),
+        )
+        self._last_error = None
@@ -0,0 +1,338 @@
+"""Sharded QuantScore™ scans across worker processes, on this host or on several
+
+The universe is split into shards by a stable hash of each ticker, so a shard always holds the
+same tickers and the worker that scans it keeps its caches warm. Every shard is scanned by a
+full ScanEngine in its own process and returns its qualified rows; the coordinator merges them
+into the global QuantScore ranking.
+
+Shards run either in local worker processes (one long-lived process per shard) or through a
+work-queue directory: the coordinator drops one job file per shard there, and workers on any
+host that shares the directory claim jobs, scan them and write results back.
+
+Example:
+    python scan_shards.py worker --queue-dir /shared/quantscore-queue --shard 0 --shard 1
+    python scan_cli.py --shards 4 --queue-dir /shared/quantscore-queue
+"""
+import argparse
+import concurrent.futures
+import functools
+import hashlib
+import heapq
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import socket
+import sys
+import time
+import uuid
+
+from market_data import HTTPProvider, YFinanceProvider
+from scan_engine import DEFAULT_BATCH_SIZE, DEFAULT_MAX_WORKERS, ResultRow, ScanEngine, ScanResults
+from scan_metrics import MetricsRegistry, ScanMetrics
+
+# Work-queue directory the dashboard hands shards to (local worker processes when unset)
+SHARD_QUEUE_DIR = os.environ.get("QUANTSCORE_SHARD_QUEUE_DIR")
+
+# How long a coordinator waits for a queued shard before giving up on the scan
+SHARD_TIMEOUT_SECONDS = 300
+# How often queue workers look for jobs and coordinators for results
+QUEUE_POLL_SECONDS = 0.1
+
+SCORE_COLUMN = 'QuantScore™'
+JOB_FILE = re.compile(r"^.+-s(\d+)\.json$")
+
+
+def shard_of(ticker, shards):
+    """Stable shard index of a ticker (the same in every process and on every host)"""
+    digest = hashlib.blake2b(ticker.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shards
+
+
+def partition_universe(tickers, shards):
+    """Split tickers into shards lists, keeping each shard in universe order"""
+    partitions = [[] for _ in range(shards)]
+    for ticker in tickers:
+        partitions[shard_of(ticker, shards)].append(ticker)
+    return partitions
+
+
+def rank_rows(rows, top_k=None):
+    """Qualified rows by QuantScore, best first, cut to the top_k best when given"""
+    if top_k is not None:
+        return heapq.nlargest(top_k, rows, key=lambda row: row[SCORE_COLUMN])
+    return sorted(rows, key=lambda row: row[SCORE_COLUMN], reverse=True)
+
+
+def merge_top_k(shard_rows, top_k=None):
+    """Merge per-shard rankings (each best first) into the global ranking"""
+    merged = heapq.merge(*shard_rows, key=lambda row: row[SCORE_COLUMN], reverse=True)
+    return list(itertools.islice(merged, top_k))
+
+
+def make_engine(provider=None):
+    """Default worker engine; provider is "yfinance", a market-data server URL, or None for the default"""
+    if provider is None:
+        return ScanEngine()
+    return ScanEngine(provider=YFinanceProvider() if provider == "yfinance" else HTTPProvider(provider))
+
+
+def scan_shard(engine, job):
+    """Scan one shard job with engine; returns its ranked rows (as ResultRow.to_list() lists) and scan summary"""
+    start = time.perf_counter()
+    rows = engine.run_quantscore_scan(job["tickers"], job["session_type"], job["fetch_mode"], job["batch_size"],
+                                      job["max_workers"], time_budget=job.get("time_budget"))
+    last_scan = engine.metrics_registry.last
+    return {
+        "shard": job["shard"],
+        "tickers": len(job["tickers"]),
+        "qualified": len(rows),
+        # Plain lists travel as JSON to queue coordinators and pickle cheaply to local ones
+        "rows": [row.to_list() for row in rank_rows(rows, job.get("top_k"))],
+        "skipped": rows.skipped,
+        "seconds": time.perf_counter() - start,
+        "fetch_mode": last_scan.fetch_mode,
+        "stages": last_scan.stage_summary(),
+        "delta": last_scan.delta_summary(),
+        "failures": last_scan.failure_summary(),
+        "quarantine": engine.quarantine.entries(),
+        "circuit": engine.circuit_breaker.status(),
+        "errors": [[phase, kind, count] for (phase, kind), count in last_scan.errors.items()],
+        "worker": f"{socket.gethostname()}:{os.getpid()}",
+    }
+
+
+# Engine of a local worker process, built once by its pool initializer
+_worker_engine = None
+
+
+def _init_worker(engine_factory):
+    global _worker_engine
+    _worker_engine = engine_factory()
+
+
+def _scan_local_shard(job):
+    return scan_shard(_worker_engine, job)
+
+
+def _write_json(path, payload):
+    # Write then rename so pollers never read a partial file
+    with open(path + ".tmp", "w") as f:
+        json.dump(payload, f)
+    os.replace(path + ".tmp", path)
+
+
+def queue_dirs(queue_dir):
+    """(jobs, claimed, results) subdirectories of a work-queue directory, created if missing"""
+    dirs = tuple(os.path.join(queue_dir, name) for name in ("jobs", "claimed", "results"))
+    for directory in dirs:
+        os.makedirs(directory, exist_ok=True)
+    return dirs
+
+
+class ShardedScanner:
+    """Coordinator with ScanEngine's run_quantscore_scan() interface that fans shards out to workers
+
+    Local worker processes are started on first use and kept, one per shard, so each shard's
+    tickers keep landing in the same process. With queue_dir set, shards go to whichever queue
+    workers serve them instead.
+    """
+
+    def __init__(self, shards, queue_dir=None, engine_factory=make_engine, shard_timeout=SHARD_TIMEOUT_SECONDS,
+                 metrics_registry=None):
+        self.shards = shards
+        self.queue_dir = queue_dir
+        self.engine_factory = engine_factory
+        self.shard_timeout = shard_timeout
+        self.metrics_registry = metrics_registry or MetricsRegistry()
+        self.provider_health = {}  # shard -> {"quarantine", "circuit"} as of its last scan
+        self._pools = None
+
+    def start(self):
+        """Start the local worker processes and wait until every engine is built"""
+        if self.queue_dir or self._pools:
+            return
+        context = multiprocessing.get_context("spawn")
+        self._pools = [
+            concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context,
+                                                   initializer=_init_worker, initargs=(self.engine_factory,))
+            for _ in range(self.shards)
+        ]
+        for future in [pool.submit(os.getpid) for pool in self._pools]:
+            future.result()
+
+    def close(self):
+        for pool in self._pools or []:
+            pool.shutdown(cancel_futures=True)
+        self._pools = None
+
+    def run_quantscore_scan(self, scan_tickers, session_type, fetch_mode="auto", batch_size=DEFAULT_BATCH_SIZE,
+                            max_workers=DEFAULT_MAX_WORKERS, on_progress=None, top_k=None, on_results=None,
+                            time_budget=None):
+        """Scan every shard and return the merged qualified rows as ScanResults, best first (the top_k best when given)
+
+        on_progress(done, total, current) is called as each shard finishes, and on_results(rows)
+        with that shard's ranked rows. max_workers is per shard, so the provider sees up to
+        shards x max_workers requests in flight. time_budget applies to every shard's scan, and
+        the tickers the shards skipped are merged into the results' skipped list.
+        """
+        metrics = ScanMetrics(session_type, fetch_mode, len(scan_tickers))
+        jobs = [{
+            "shard": shard, "shards": self.shards, "tickers": tickers, "session_type": session_type,
+            "fetch_mode": fetch_mode, "batch_size": batch_size, "max_workers": max_workers, "top_k": top_k,
+            "time_budget": time_budget,
+        } for shard, tickers in enumerate(partition_universe(scan_tickers, self.shards)) if tickers]
+
+        shard_results = []
+        done = 0
+        # Shards' rows of one scan share its parsed timestamps
+        timestamps = {}
+        try:
+            run_jobs = self._run_queued if self.queue_dir else self._run_local
+            for result in run_jobs(jobs):
+                result["rows"] = [ResultRow.from_list(values, timestamps) for values in result["rows"]]
+                shard_results.append(result)
+                done += result["tickers"]
+                self._record_shard(metrics, result)
+                if on_results and result["rows"]:
+                    on_results(result["rows"])
+                if on_progress:
+                    with metrics.phase("progress"):
+                        on_progress(done, len(scan_tickers), f"shard {result['shard']} ({result['worker']})")
+            results = merge_top_k([result["rows"] for result in shard_results], top_k)
+            skipped = [ticker for result in shard_results for ticker in result["skipped"]]
+        finally:
+            metrics.finish(sum(result["qualified"] for result in shard_results),
+                           sum(len(result["skipped"]) for result in shard_results))
+            self.metrics_registry.record(metrics)
+        return ScanResults(results, len(scan_tickers), skipped)
+
+    def quarantine_entries(self):
+        """Symbols quarantined by any shard's engine as of its last scan, longest quarantine first"""
+        now = time.time()
+        entries = [entry for health in self.provider_health.values() for entry in health["quarantine"]
+                   if entry["until"] > now]
+        return sorted(entries, key=lambda entry: entry["until"], reverse=True)
+
+    def _record_shard(self, metrics, result):
+        """Fold a shard's summary into the coordinator's scan metrics"""
+        self.provider_health[result["shard"]] = {"quarantine": result["quarantine"], "circuit": result["circuit"]}
+        metrics.fetch_mode = result["fetch_mode"]
+        metrics.record("shard", result["seconds"])
+        for stage, counts in result["stages"].items():
+            metrics.count_stage(stage, counts["entered"], counts["eliminated"])
+        for kind, count in result["delta"].items():
+            metrics.count_delta(kind, count)
+        for kind, count in result["failures"].items():
+            metrics.count_failure(kind, count)
+        for phase, kind, count in result["errors"]:
+            metrics.errors[(phase, kind)] += count
+
+    def _run_local(self, jobs):
+        self.start()
+        futures = [self._pools[job["shard"]].submit(_scan_local_shard, job) for job in jobs]
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+    def _run_queued(self, jobs):
+        jobs_dir, _, results_dir = queue_dirs(self.queue_dir)
+        # Job names start with the submit time in ms, so workers take jobs oldest first by name
+        scan_id = f"{int(time.time() * 1000):013d}-{uuid.uuid4().hex[:8]}"
+        waiting = {}
+        for job in jobs:
+            job_id = f"{scan_id}-s{job['shard']:03d}"
+            _write_json(os.path.join(jobs_dir, job_id + ".json"), dict(job, job_id=job_id))
+            waiting[job_id] = job
+
+        deadline = time.monotonic() + self.shard_timeout
+        try:
+            while waiting:
+                for job_id in list(waiting):
+                    path = os.path.join(results_dir, job_id + ".json")
+                    if os.path.exists(path):
+                        with open(path) as f:
+                            result = json.load(f)
+                        os.remove(path)
+                        del waiting[job_id]
+                        if "error" in result:
+                            raise RuntimeError(f"shard {result['shard']} failed on {result['worker']}: {result['error']}")
+                        yield result
+                if waiting and time.monotonic() > deadline:
+                    shards = ", ".join(str(job["shard"]) for job in waiting.values())
+                    raise TimeoutError(f"no queue worker finished shard(s) {shards} within {self.shard_timeout}s")
+                if waiting:
+                    time.sleep(QUEUE_POLL_SECONDS)
+        finally:
+            # Withdraw jobs nobody claimed so late workers do not scan for a coordinator that left
+            for job_id in waiting:
+                try:
+                    os.remove(os.path.join(jobs_dir, job_id + ".json"))
+                except FileNotFoundError:
+                    pass
+
+
+def claim_job(queue_dir, shards=None):
+    """Claim the oldest queued job (of the given shard indexes, if any); returns it or None"""
+    jobs_dir, claimed_dir, _ = queue_dirs(queue_dir)
+    for name in sorted(os.listdir(jobs_dir)):
+        match = JOB_FILE.match(name)
+        if not match or (shards is not None and int(match.group(1)) not in shards):
+            continue
+        claimed = os.path.join(claimed_dir, name)
+        try:
+            # rename is atomic, so exactly one worker wins each job
+            os.rename(os.path.join(jobs_dir, name), claimed)
+        except FileNotFoundError:
+            continue
+        with open(claimed) as f:
+            job = json.load(f)
+        os.remove(claimed)
+        return job
+    return None
+
+
+def run_queue_worker(queue_dir, shards=None, engine_factory=make_engine, poll=QUEUE_POLL_SECONDS, once=False):
+    """Serve jobs from a work-queue directory until interrupted (or until it is empty, with once)"""
+    engine = engine_factory()
+    _, _, results_dir = queue_dirs(queue_dir)
+    while True:
+        job = claim_job(queue_dir, shards)
+        if job is None:
+            if once:
+                return
+            time.sleep(poll)
+            continue
+        try:
+            result = scan_shard(engine, job)
+        except Exception as exc:
+            # Report the failure instead of leaving the coordinator waiting for the timeout
+            result = {"shard": job["shard"], "worker": f"{socket.gethostname()}:{os.getpid()}",
+                      "error": f"{type(exc).__name__}: {exc}"}
+        _write_json(os.path.join(results_dir, job["job_id"] + ".json"), result)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve sharded QuantScore™ scan jobs from a work-queue directory.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    worker = subparsers.add_parser("worker", help="scan shard jobs from a work-queue directory")
+    worker.add_argument("--queue-dir", required=True, help="work-queue directory shared with the coordinator")
+    worker.add_argument("--shard", type=int, action="append",
+                        help="only take jobs for this shard index (repeatable); pinning keeps caches warm")
+    worker.add_argument("--provider", help="'yfinance' or a market-data HTTP server URL "
+                                           "(default: $QUANTSCORE_PROVIDER_URL, else yfinance)")
+    worker.add_argument("--once", action="store_true", help="exit once the queue is empty")
+    args = parser.parse_args(argv)
+
+    shards = set(args.shard) if args.shard else None
+    print(f"serving shard jobs from {args.queue_dir}" + (f" for shards {sorted(shards)}" if shards else ""),
+          file=sys.stderr)
+    try:
+        run_queue_worker(args.queue_dir, shards, functools.partial(make_engine, args.provider), once=args.once)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
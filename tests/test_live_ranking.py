@@ -0,0 +1,37 @@
+from scan_engine import LiveRanking
+
+
+def row(ticker, score):
+    return {'Ticker': ticker, 'QuantScore™': score}
+
+
+def test_keeps_best_rows_first():
+    live = LiveRanking(limit=2)
+    live.add([row("AAA", 1.0), row("BBB", 3.0), row("CCC", 2.0)])
+    assert [r['Ticker'] for r in live.rows()] == ["BBB", "CCC"]
+    assert live.qualified == 3
+
+
+def test_republished_rows_replace_earlier_ones():
+    # A viewer that takes over an abandoned shared scan gets the rows it already has again
+    live = LiveRanking(limit=3)
+    live.add([row("AAA", 1.0), row("BBB", 3.0)])
+    live.add([row("AAA", 1.0), row("BBB", 3.0), row("CCC", 2.0)])
+    assert [r['Ticker'] for r in live.rows()] == ["BBB", "CCC", "AAA"]
+    assert live.qualified == 3
+
+
+def test_rescored_ticker_moves_to_its_new_rank():
+    live = LiveRanking(limit=2)
+    live.add([row("AAA", 1.0), row("BBB", 3.0)])
+    live.add([row("AAA", 5.0)])
+    assert [(r['Ticker'], r['QuantScore™']) for r in live.rows()] == [("AAA", 5.0), ("BBB", 3.0)]
+    assert live.qualified == 2
+
+
+def test_rescored_ticker_down_makes_room_for_the_next_best():
+    live = LiveRanking(limit=2)
+    live.add([row("AAA", 5.0), row("BBB", 4.0), row("CCC", 3.0)])
+    live.add([row("AAA", 1.0)])
+    assert [(r['Ticker'], r['QuantScore™']) for r in live.rows()] == [("BBB", 4.0), ("CCC", 3.0)]
+    assert live.qualified == 3
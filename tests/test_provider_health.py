@@ -0,0 +1,120 @@
+import time
+
+import pytest
+
+from provider_health import CircuitBreaker, CircuitOpenError, NoDataError, SymbolQuarantine, classify_failure
+
+
+def make_breaker():
+    return CircuitBreaker(window=60, min_requests=4, error_rate=0.5, cooldown=30)
+
+
+def trip(breaker, now=0.0):
+    for _ in range(4):
+        breaker.record(breaker.allow(now), True, now)
+    assert breaker.status(now)["state"] == "open"
+
+
+def test_stays_closed_below_min_requests_or_error_rate():
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record(breaker.allow(0.0), True, 0.0)
+    assert breaker.status(0.0)["state"] == "closed"
+
+    breaker = make_breaker()
+    for failed in (True, False, False, False, True, False):
+        breaker.record(breaker.allow(0.0), failed, 0.0)
+    assert breaker.status(0.0)["state"] == "closed"
+
+
+def test_old_outcomes_leave_the_window():
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record(breaker.allow(0.0), True, 0.0)
+    breaker.record(breaker.allow(61.0), True, 61.0)
+    assert breaker.status(61.0)["state"] == "closed"
+
+
+def test_open_breaker_refuses_until_the_cooldown_ends():
+    breaker = make_breaker()
+    opened_at = time.monotonic()
+    trip(breaker, opened_at)
+    assert breaker.allow(opened_at + 10) is None
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: None)
+    assert breaker.status(opened_at + 30)["state"] == "half-open"
+
+
+def test_half_open_trial_decides():
+    breaker = make_breaker()
+    trip(breaker)
+    trial = breaker.allow(30.0)
+    assert trial is not None
+    # Only one trial at a time
+    assert breaker.allow(30.0) is None
+    breaker.record(trial, True, 30.0)
+    assert breaker.status(31.0)["state"] == "open"
+    assert breaker.trips == 2
+
+    trial = breaker.allow(60.0)
+    breaker.record(trial, False, 60.0)
+    assert breaker.status(60.0)["state"] == "closed"
+    assert breaker.allow(60.0) is not None
+
+
+def test_in_flight_outcomes_do_not_decide_the_trial():
+    breaker = make_breaker()
+    # Requests admitted before the spike that are still in flight when the breaker opens
+    in_flight = [breaker.allow(0.0) for _ in range(8)]
+    trip(breaker)
+
+    # A late success does not close the breaker, and late failures do not reopen or re-count it
+    breaker.record(in_flight[0], False, 1.0)
+    assert breaker.status(1.0)["state"] == "open"
+    for ticket in in_flight[1:]:
+        breaker.record(ticket, True, 25.0)
+    assert breaker.trips == 1
+    assert breaker.status(30.0)["state"] == "half-open"
+
+    # Nor do they settle a trial in flight
+    trial = breaker.allow(30.0)
+    breaker.record(in_flight[0], False, 31.0)
+    assert breaker.allow(31.0) is None
+    breaker.record(trial, False, 32.0)
+    assert breaker.status(32.0)["state"] == "closed"
+
+    # Outcomes from before the trip do not count against the fresh window either
+    for ticket in in_flight:
+        breaker.record(ticket, True, 33.0)
+    assert breaker.status(33.0) == {"state": "closed", "error_rate": 0.0, "requests": 0, "retry_in": 0.0,
+                                    "trips": 1}
+
+
+def test_quarantine_after_repeated_failures_with_backoff():
+    quarantine = SymbolQuarantine(after_failures=2, base_seconds={"no_data": 100, "error": 10}, max_seconds=250)
+    assert not quarantine.record_failure("DEAD", "no_data", now=0.0)
+    assert not quarantine.is_quarantined("DEAD", now=0.0)
+    assert quarantine.record_failure("DEAD", "no_data", now=0.0)
+    assert quarantine.is_quarantined("DEAD", now=99.0)
+    assert not quarantine.is_quarantined("DEAD", now=100.0)
+    # Each further failure doubles the backoff, up to the maximum
+    quarantine.record_failure("DEAD", "no_data", now=100.0)
+    assert quarantine.entries(now=100.0)[0]["until"] == 300.0
+    quarantine.record_failure("DEAD", "no_data", now=300.0)
+    assert quarantine.entries(now=300.0)[0]["until"] == 550.0
+
+    quarantine.record_success("DEAD")
+    assert not quarantine.is_quarantined("DEAD", now=300.0)
+    assert quarantine.entries(now=300.0) == []
+
+
+def test_classify_failure_follows_the_cause_chain():
+    try:
+        try:
+            raise NoDataError("no bars")
+        except NoDataError as exc:
+            raise RuntimeError("history failed") from exc
+    except RuntimeError as exc:
+        assert classify_failure(exc) == "no_data"
+    assert classify_failure(TimeoutError("slow")) == "timeout"
+    assert classify_failure(ValueError("bad")) == "error"
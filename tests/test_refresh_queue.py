@@ -0,0 +1,126 @@
+from refresh_queue import HOT_REFRESH_SECONDS, QUALIFIED_HEAT, RefreshQueue, refresh_interval, ticker_heat
+
+
+def per_ticker(n):
+    return n
+
+
+def row(ticker, score=1.0):
+    return {'Ticker': ticker, 'QuantScore™': score}
+
+
+def session_data(change_pct, float_shares, rsi):
+    return {'change_pct': change_pct, 'gap_pct': change_pct, 'float_shares': float_shares, 'rsi': rsi}
+
+
+def make_queue(tickers, budget_per_minute=600, session_type="regular"):
+    queue = RefreshQueue(budget_per_minute=budget_per_minute)
+    queue.set_universe(tickers, session_type, now=0.0)
+    return queue
+
+
+def test_new_tickers_are_due_in_universe_order():
+    queue = make_queue(["AAA", "BBB", "CCC"])
+    assert queue.take_due(per_ticker, now=0.0) == ["AAA", "BBB", "CCC"]
+
+
+def test_budget_exhaustion_keeps_due_tickers_at_the_front():
+    queue = make_queue(["AAA", "BBB", "CCC", "DDD", "EEE"], budget_per_minute=3)
+    assert queue.take_due(per_ticker, now=0.0) == ["AAA", "BBB", "CCC"]
+    assert queue.take_due(per_ticker, now=0.0) == []
+    assert queue.summary(now=0.0)["due"] == 2
+
+    # A ticker added later is due later, so it queues behind the ones the budget held back
+    queue.set_universe(["AAA", "BBB", "CCC", "DDD", "EEE", "FFF"], "regular", now=10.0)
+    # 3 requests a minute refill one token every 20 seconds
+    assert queue.take_due(per_ticker, now=20.0) == ["DDD"]
+    assert queue.take_due(per_ticker, now=40.0) == ["EEE"]
+    assert queue.take_due(per_ticker, now=60.0) == ["FFF"]
+
+
+def test_taken_tickers_are_parked_until_recorded():
+    queue = make_queue(["AAA", "BBB"])
+    assert queue.take_due(per_ticker, now=0.0) == ["AAA", "BBB"]
+    # A slow scan must not have its tickers handed out again
+    assert queue.take_due(per_ticker, now=3600.0) == []
+
+    queue.record(["AAA", "BBB"], "regular", [row("AAA")], now=3600.0)
+    assert queue.rows() == [row("AAA")]
+    # Qualified tickers come round at the hot interval; BBB has no session data, so it is cold
+    assert queue.take_due(per_ticker, now=3600.0 + HOT_REFRESH_SECONDS) == ["AAA"]
+
+
+def test_failed_scan_releases_its_tickers():
+    queue = make_queue(["AAA", "BBB", "CCC"])
+    taken = queue.take_due(per_ticker, now=0.0)
+    queue.release(taken, now=1.0)
+    assert queue.take_due(per_ticker, now=1.0) == ["AAA", "BBB", "CCC"]
+
+
+def test_release_leaves_rescheduled_tickers_alone():
+    queue = make_queue(["AAA", "BBB"])
+    queue.take_due(per_ticker, now=0.0)
+    queue.record(["AAA"], "regular", [row("AAA")], now=1.0)
+    queue.release(["AAA", "BBB"], now=1.0)
+    assert queue.take_due(per_ticker, now=1.0) == ["BBB"]
+
+
+def test_session_switch_clears_the_board():
+    queue = make_queue(["AAA", "BBB"])
+    queue.take_due(per_ticker, now=0.0)
+    queue.record(["AAA", "BBB"], "regular", [row("AAA"), row("BBB")], now=0.0)
+    assert len(queue.rows()) == 2
+
+    queue.set_universe(["AAA", "BBB"], "afterhours", now=1.0)
+    assert queue.rows() == []
+    assert queue.summary(now=1.0)["hot"] == 0
+    assert queue.take_due(per_ticker, now=1.0) == ["AAA", "BBB"]
+
+
+def test_same_session_keeps_the_board_and_drops_removed_tickers():
+    queue = make_queue(["AAA", "BBB"])
+    queue.take_due(per_ticker, now=0.0)
+    queue.record(["AAA", "BBB"], "regular", [row("AAA"), row("BBB")], now=0.0)
+
+    queue.set_universe(["AAA"], "regular", now=1.0)
+    assert queue.rows() == [row("AAA")]
+    assert queue.summary(now=1.0)["tracked"] == 1
+
+
+def test_budget_skipped_tickers_keep_their_row_and_are_due_at_once():
+    queue = make_queue(["AAA", "BBB", "CCC"])
+    queue.take_due(per_ticker, now=0.0)
+    queue.record(["AAA", "BBB", "CCC"], "regular", [row("AAA"), row("BBB")], now=0.0)
+    assert queue.take_due(per_ticker, now=HOT_REFRESH_SECONDS) == ["AAA", "BBB"]
+
+    # The next scan runs out of time before BBB
+    queue.record(["AAA", "BBB"], "regular", [row("AAA")], skipped=["BBB"], now=6.0)
+    assert queue.rows() == [row("AAA"), row("BBB")]
+    assert queue.summary(now=6.0)["hot"] == 2
+    assert queue.take_due(per_ticker, now=6.0) == ["BBB"]
+
+
+def test_heat_follows_distance_to_the_thresholds():
+    near_miss = ticker_heat(session_data(change_pct=1.8, float_shares=8_000_000, rsi=54), "regular")
+    halfway = ticker_heat(session_data(change_pct=1.0, float_shares=9_000_000, rsi=40), "regular")
+    far_off = ticker_heat(session_data(change_pct=0.1, float_shares=400_000_000, rsi=30), "regular")
+    assert QUALIFIED_HEAT > near_miss > halfway > far_off > 0.0
+    assert ticker_heat(None, "regular") == 0.0
+
+
+def test_qualifier_heat_follows_its_quantscore_rank():
+    assert ticker_heat(None, "regular", score_rank=1.0) == 1.0
+    assert QUALIFIED_HEAT <= ticker_heat(None, "regular", score_rank=0.25) < ticker_heat(None, "regular", score_rank=0.5)
+
+
+def test_stronger_qualifiers_and_nearer_misses_come_round_sooner():
+    queue = make_queue(["TOP", "LOW", "NEAR", "FAR"])
+    queue.take_due(per_ticker, now=0.0)
+    data = {"NEAR": session_data(1.8, 8_000_000, 54), "FAR": session_data(0.1, 400_000_000, 30)}
+    queue.record(["TOP", "LOW", "NEAR", "FAR"], "regular", [row("TOP", 900.0), row("LOW", 2.0)], data.get, now=0.0)
+
+    due_order = []
+    for second in range(0, 4000):
+        due_order += queue.take_due(per_ticker, now=float(second))
+    assert due_order[:4] == ["TOP", "LOW", "NEAR", "FAR"]
+    assert refresh_interval(1.0, "regular") == HOT_REFRESH_SECONDS
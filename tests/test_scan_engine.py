@@ -0,0 +1,147 @@
+from datetime import date, datetime, timedelta
+
+import fake_market_data
+import numpy as np
+import pandas as pd
+from bar_store import BarStore
+from fundamentals_cache import FundamentalsCache
+from rsi_state import RSITracker
+from scan_delta import settled_since
+from scan_engine import (
+    ET, EXTENDED_UNIVERSE, MAX_FLOAT_SHARES, MIN_RSI, RESULT_COLUMNS, SESSION_GAP_FILTERS, ResultRow, ScanEngine,
+    apply_quantscore_filters_24_7, build_result_row, calculate_quantscore_24_7, rank_results, score_quantscore_batch,
+    with_session_bar
+)
+
+
+def make_engine(tmp_path, fixtures):
+    provider = fake_market_data.FakeMarketData(fixtures)
+    return ScanEngine(
+        provider=provider,
+        fundamentals_cache=FundamentalsCache(str(tmp_path / "fundamentals.sqlite"), fetch_info=provider.info),
+        bar_store=BarStore(str(tmp_path / "bars"), retention={"1m": None}),
+        rsi_tracker=RSITracker(str(tmp_path / "rsi.sqlite")),
+    )
+
+
+def test_rows_of_a_repeated_scan_share_its_timestamp(tmp_path):
+    fixtures = fake_market_data.synthesize_fixtures(EXTENDED_UNIVERSE[:80])
+    engine = make_engine(tmp_path, fixtures)
+    first = engine.run_quantscore_scan(list(fixtures), "weekend", "batched")
+    second = engine.run_quantscore_scan(list(fixtures), "weekend", "batched")
+    assert first and engine.metrics_registry.last.delta_summary().get("unchanged")
+
+    # Unchanged tickers reuse their scores, but their rows carry the second scan's timestamp
+    assert len({id(row.updated) for row in first}) == 1
+    assert len({id(row.updated) for row in second}) == 1
+    assert second[0].updated > first[0].updated
+    assert sorted(row.values()[:-1] for row in first) == sorted(row.values()[:-1] for row in second)
+
+
+def test_unchanged_inputs_reuse_the_previous_data_and_score(tmp_path):
+    ticker = "GOOGL"
+    engine = make_engine(tmp_path, fake_market_data.synthesize_fixtures([ticker]))
+    daily = engine.provider.bars(ticker, "1d", period="5d")
+    hist = engine.provider.bars(ticker, "1m", period="1d")
+    info = engine.screen_ticker_fundamentals(ticker)
+
+    data = engine.build_changed_session_data(ticker, "regular", hist, daily, info)
+    assert data is not None
+    assert engine.delta_tracker.score_of("regular", data) == (False, None)
+    row = build_result_row(data, 1.0, ET.localize(datetime(2026, 10, 16, 9, 30)))
+    engine.delta_tracker.store_score("regular", data, row)
+
+    # Same inputs: same session data back, so its score is reused too
+    assert engine.build_changed_session_data(ticker, "regular", hist.copy(), daily.copy(), dict(info)) is data
+    assert engine.delta_tracker.score_of("regular", data) == (True, row)
+    # Another session class or a new last price is rebuilt and rescored
+    assert engine.build_changed_session_data(ticker, "afterhours", hist, daily, info) is not data
+    changed = engine.build_changed_session_data(ticker, "regular", hist.assign(Close=hist['Close'] + 0.01), daily,
+                                                info)
+    assert changed is not data
+    assert engine.delta_tracker.score_of("regular", changed) == (False, None)
+
+
+def test_result_rows_index_by_column():
+    row = ResultRow("AAA", 1.5, 2.0, 3.0, 4.0, 1000, 0.5, 60.0, "WEEKEND",
+                    ET.localize(datetime(2026, 10, 16, 9, 30, 5)))
+    assert [row[column] for column in RESULT_COLUMNS] == [
+        "AAA", 1.5, 2.0, 3.0, 4.0, 1000, 0.5, 60.0, "WEEKEND", "09:30:05"]
+    assert ResultRow.from_list(row.to_list()).values() == row.values()
+    assert rank_results([row])['Updated'].tolist() == ["09:30:05"]
+
+
+def test_daily_bars_synced_after_the_close_are_not_fetched_again(tmp_path):
+    fixtures = fake_market_data.synthesize_fixtures(EXTENDED_UNIVERSE[:1])
+    engine = make_engine(tmp_path, fixtures)
+    ticker = list(fixtures)[0]
+    assert engine.plan_bar_fetches(ticker, "regular") == ["1d", "1m"]
+    assert engine.plan_bar_fetches(ticker, "weekend") == ["1d"]
+
+    # A sync that started before the last 20:00 ET close may still miss that day's final bar
+    engine.delta_tracker.mark_synced(ticker, "1d", settled_since() - timedelta(minutes=1))
+    assert engine.plan_bar_fetches(ticker, "regular") == ["1d", "1m"]
+
+    engine.sync_ticker_bars(ticker, "1d", "weekend")
+    requests = engine.provider.requests
+    assert engine.plan_bar_fetches(ticker, "regular") == ["1m"]
+    assert engine.plan_bar_fetches(ticker, "weekend") == []
+    engine.sync_ticker_bars(ticker, "1d", "weekend")
+    assert engine.provider.requests == requests
+
+
+def minute_bars(day, times, closes):
+    index = pd.DatetimeIndex([ET.localize(datetime.combine(day, clock)) for clock in times])
+    return pd.DataFrame({'Open': closes, 'High': [close + 1 for close in closes], 'Low': [close - 1 for close in closes],
+                         'Close': closes, 'Volume': [100] * len(closes)}, index=index)
+
+
+def test_session_bar_is_built_from_todays_regular_hours():
+    today = date(2026, 10, 16)
+    daily = pd.DataFrame({'Open': [1.0, 2.0], 'High': [1.5, 2.5], 'Low': [0.5, 1.5], 'Close': [1.2, 2.2],
+                          'Volume': [10, 20]},
+                         index=pd.DatetimeIndex([ET.localize(datetime(2026, 10, day)) for day in (14, 15)]))
+    times = [datetime.strptime(clock, "%H:%M").time() for clock in ("04:00", "09:30", "12:00", "15:59", "16:00")]
+    hist = pd.concat([minute_bars(today - timedelta(days=1), times[2:3], [9.0]),
+                      minute_bars(today, times, [50.0, 3.0, 7.0, 5.0, 60.0])])
+
+    bars = with_session_bar(daily, hist, today, 2)
+    # Pre- and post-market bars and yesterday's minutes are left out; the window keeps the last 2 days
+    assert bars.index.tolist() == [daily.index[-1], ET.localize(datetime(2026, 10, 16))]
+    assert bars.iloc[-1].tolist() == [3.0, 8.0, 2.0, 5.0, 300]
+    assert with_session_bar(daily, hist, today, 3).index[0] == daily.index[0]
+
+    # Nothing is added once the daily bars reach today, for daily-only sessions, or without regular-hours bars
+    assert with_session_bar(bars, hist, today, 2) is bars
+    assert with_session_bar(daily, daily, today, 2) is daily
+    assert with_session_bar(daily, hist.iloc[:1], today, 2) is daily
+
+
+def scoring_inputs():
+    """Random session data plus the edge cases: zero and negative inputs, values at every threshold"""
+    rng = np.random.default_rng(5)
+    n = 2000
+    rows = [{
+        'change_pct': float(change), 'gap_pct': float(gap), 'volume': int(volume), 'market_cap': int(market_cap),
+        'float_shares': int(float_shares), 'rsi': float(rsi),
+    } for change, gap, volume, market_cap, float_shares, rsi in zip(
+        rng.normal(0, 20, n), rng.normal(0, 20, n), rng.integers(0, 10**9, n), rng.integers(0, 10**11, n),
+        rng.integers(0, 3 * MAX_FLOAT_SHARES, n), rng.uniform(0, 100, n))]
+    base = {'change_pct': 5.0, 'gap_pct': 5.0, 'volume': 1_000_000, 'market_cap': 50_000_000,
+            'float_shares': 5_000_000, 'rsi': 60.0}
+    edges = [
+        {'volume': 0}, {'volume': -10}, {'market_cap': 0}, {'market_cap': -5}, {'change_pct': 0.0},
+        {'change_pct': -7.5, 'gap_pct': -7.5}, {'gap_pct': 0.0}, {'rsi': MIN_RSI}, {'rsi': 0.0},
+        {'float_shares': MAX_FLOAT_SHARES}, {'float_shares': 0}, {'volume': 2**60, 'market_cap': 3**40},
+    ] + [{'change_pct': threshold, 'gap_pct': threshold} for _, threshold in SESSION_GAP_FILTERS.values()]
+    return rows + [dict(base, **edge) for edge in edges]
+
+
+def test_batch_scores_match_the_scalar_scorer_bit_for_bit():
+    rows = scoring_inputs()
+    for session_type in list(SESSION_GAP_FILTERS) + ["unknown"]:
+        scores, qualified = score_quantscore_batch(pd.DataFrame(rows), session_type)
+        expected = [float(calculate_quantscore_24_7(data, session_type)) for data in rows]
+        assert scores.tolist() == expected, session_type
+        assert qualified.tolist() == [apply_quantscore_filters_24_7(data, session_type) and score > 0
+                                      for data, score in zip(rows, expected)], session_type
@@ -0,0 +1,30 @@
+import importlib
+import json
+import urllib.request
+
+import scan_metrics
+from scan_metrics import MetricsRegistry, start_metrics_server
+
+
+def test_metrics_endpoint_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("QUANTSCORE_METRICS_PORT", raising=False)
+    monkeypatch.delenv("QUANTSCORE_METRICS_HOST", raising=False)
+    try:
+        defaults = importlib.reload(scan_metrics)
+        assert (defaults.METRICS_PORT, defaults.METRICS_HOST) == ("", "127.0.0.1")
+        assert defaults.start_metrics_server(defaults.MetricsRegistry()) is None
+    finally:
+        monkeypatch.undo()
+        importlib.reload(scan_metrics)
+
+
+def test_metrics_endpoint_listens_on_localhost_only():
+    server = start_metrics_server(MetricsRegistry(), port="0")
+    try:
+        host, port = server.server_address
+        assert host == "127.0.0.1"
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics.json", timeout=5) as response:
+            assert json.load(response)["last_scan"] is None
+    finally:
+        server.shutdown()
+        server.server_close()
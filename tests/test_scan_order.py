@@ -0,0 +1,29 @@
+from scan_order import YieldTracker
+
+
+def test_no_history_keeps_the_universe_order():
+    assert YieldTracker().order("regular", ["CCC", "AAA", "BBB"]) == ["CCC", "AAA", "BBB"]
+
+
+def test_qualifiers_first_best_score_first():
+    tracker = YieldTracker()
+    # AAA qualifies every scan with a low score; BBB qualified once, with a high one
+    for _ in range(5):
+        tracker.record("regular", [("AAA", 1.0, 10.0), ("BBB", 0.2, None)])
+    tracker.record("regular", [("AAA", 1.0, 10.0), ("BBB", 1.0, 500.0)])
+    assert tracker.order("regular", ["AAA", "BBB"]) == ["BBB", "AAA"]
+
+
+def test_non_qualifiers_by_likelihood_with_unseen_tickers_between():
+    tracker = YieldTracker()
+    tracker.record("regular", [("HOT", 1.0, 7.0), ("NEAR", 0.9, None), ("FAR", 0.0, None)])
+    order = tracker.order("regular", ["FAR", "NEW", "NEAR", "HOT"])
+    assert order == ["HOT", "NEAR", "NEW", "FAR"]
+
+
+def test_history_is_per_session_class():
+    tracker = YieldTracker()
+    tracker.record("regular", [("AAA", 0.0, None), ("BBB", 1.0, 3.0)])
+    assert tracker.order("regular", ["AAA", "BBB"]) == ["BBB", "AAA"]
+    # No history in this session class: both are unseen, so their order stays
+    assert tracker.order("premarket", ["AAA", "BBB"]) == ["AAA", "BBB"]
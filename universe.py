@@ -0,0 +1,182 @@
+"""Ticker universes: file loading, symbol normalization and named, versioned universe sets"""
+import csv
+import hashlib
+import os
+import re
+import threading
+import time
+
+import pandas as pd
+
+# Stored universe sets live next to the app unless QUANTSCORE_UNIVERSE_DIR points elsewhere
+UNIVERSE_DIR = os.environ.get(
+    "QUANTSCORE_UNIVERSE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "universes")
+)
+
+# Name the built-in EXTENDED_UNIVERSE list is listed under
+BUILTIN_UNIVERSE = "extended"
+
+# Columns checked, in order, for the symbols of a CSV/Parquet universe file
+SYMBOL_COLUMNS = ("ticker", "symbol", "tickers", "symbols")
+
+UNIVERSE_NAME = re.compile(r"^[A-Za-z0-9_.-]+$")
+VERSION_FILE = re.compile(r"^v(\d+)\.txt$")
+
+
+def normalize_symbol(symbol):
+    """Normalize a symbol to Yahoo's form: upper case, no $ prefix, share classes with '-' (BRK.B -> BRK-B)"""
+    symbol = str(symbol).strip().upper().lstrip("$")
+    if not symbol or symbol in ("NAN", "NONE"):
+        return ""
+    return re.sub(r"[./](?=[A-Z]{1,2}$)", "-", symbol)
+
+
+def normalize_universe(symbols):
+    """Normalize and de-duplicate symbols, keeping first-seen order"""
+    seen = set()
+    universe = []
+    for symbol in symbols:
+        symbol = normalize_symbol(symbol)
+        if symbol and symbol not in seen:
+            seen.add(symbol)
+            universe.append(symbol)
+    return universe
+
+
+def _symbol_column(columns):
+    lowered = [str(column).strip().lower() for column in columns]
+    return next((lowered.index(name) for name in SYMBOL_COLUMNS if name in lowered), None)
+
+
+def read_universe(source, kind):
+    """Read raw symbols from a file path or file-like object of kind "txt", "csv" or "parquet"
+
+    Text files hold one symbol per line (# starts a comment). CSV and Parquet files use their
+    ticker/symbol column, or the first column when there is none (a headerless CSV included).
+    """
+    if kind == "parquet":
+        frame = pd.read_parquet(source)
+        column = _symbol_column(frame.columns)
+        return frame.iloc[:, column or 0].tolist()
+
+    if hasattr(source, "read"):
+        text = source.read()
+        lines = (text.decode("utf-8-sig") if isinstance(text, bytes) else text).splitlines()
+    else:
+        with open(source, encoding="utf-8-sig") as f:
+            lines = f.read().splitlines()
+
+    if kind == "csv":
+        rows = [row for row in csv.reader(lines) if row]
+        if not rows:
+            return []
+        column = _symbol_column(rows[0])
+        body = rows[1:] if column is not None else rows
+        return [row[column or 0] for row in body if len(row) > (column or 0)]
+    return [line.split("#", 1)[0] for line in lines]
+
+
+def universe_kind(filename):
+    """File kind from a file name's extension (anything unknown is read as text)"""
+    extension = os.path.splitext(filename)[1].lower()
+    return {".csv": "csv", ".parquet": "parquet", ".pq": "parquet"}.get(extension, "txt")
+
+
+def load_universe_file(path):
+    """Load, normalize and de-duplicate tickers from a .txt, .csv or .parquet file"""
+    return normalize_universe(read_universe(path, universe_kind(path)))
+
+
+def universe_fingerprint(tickers):
+    """Short stable digest of an ordered ticker list, for cache keys and version dedupe"""
+    return hashlib.blake2b("\n".join(tickers).encode(), digest_size=12).hexdigest()
+
+
+class UniverseStore:
+    """Named universe sets with immutable numbered versions, one text file per version
+
+    <root>/<name>/v<N>.txt holds a few "# key: value" header lines (created, count, note) and
+    one symbol per line. Saving a list identical to the latest version does not add a version.
+    """
+
+    def __init__(self, root=None, builtin=None):
+        self.root = root or UNIVERSE_DIR
+        self.builtin = list(builtin or [])
+        self._lock = threading.Lock()
+
+    def names(self):
+        """Stored universe names, with the built-in universe first"""
+        stored = []
+        if os.path.isdir(self.root):
+            stored = sorted(name for name in os.listdir(self.root)
+                            if name != BUILTIN_UNIVERSE and self.versions(name))
+        return [BUILTIN_UNIVERSE] + stored
+
+    def versions(self, name):
+        """Version numbers of a stored universe, oldest first"""
+        directory = os.path.join(self.root, name)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(int(match.group(1)) for match in map(VERSION_FILE.match, os.listdir(directory)) if match)
+
+    def path(self, name, version):
+        return os.path.join(self.root, name, f"v{version}.txt")
+
+    def load(self, name, version=None):
+        """Return the tickers of a universe version (the latest when version is None)"""
+        if name == BUILTIN_UNIVERSE:
+            return list(self.builtin)
+        versions = self.versions(name)
+        if not versions:
+            raise KeyError(f"unknown universe {name!r}")
+        version = versions[-1] if version is None else version
+        return normalize_universe(read_universe(self.path(name, version), "txt"))
+
+    def describe(self, name, version=None):
+        """Return the header fields of a universe version as a dict"""
+        if name == BUILTIN_UNIVERSE:
+            return {"version": "built-in", "count": str(len(self.builtin)), "note": "EXTENDED_UNIVERSE"}
+        versions = self.versions(name)
+        version = versions[-1] if version is None else version
+        header = {"version": str(version)}
+        with open(self.path(name, version)) as f:
+            for line in f:
+                if not line.startswith("# "):
+                    break
+                key, _, value = line[2:].partition(":")
+                header[key.strip()] = value.strip()
+        return header
+
+    def save(self, name, symbols, note=""):
+        """Normalize symbols and store them as a new version of name; returns (version, tickers)"""
+        if name == BUILTIN_UNIVERSE or not UNIVERSE_NAME.match(name):
+            raise ValueError(f"invalid universe name {name!r}")
+        tickers = normalize_universe(symbols)
+        if not tickers:
+            raise ValueError("universe is empty")
+
+        with self._lock:
+            versions = self.versions(name)
+            if versions and universe_fingerprint(self.load(name, versions[-1])) == universe_fingerprint(tickers):
+                return versions[-1], tickers
+
+            version = (versions[-1] + 1) if versions else 1
+            os.makedirs(os.path.join(self.root, name), exist_ok=True)
+            path = self.path(name, version)
+            header = [
+                f"# created: {time.strftime('%Y-%m-%d %H:%M:%S')}",
+                f"# count: {len(tickers)}",
+                f"# note: {' '.join(note.split())}",
+            ]
+            # Write then rename so readers never see a partial version
+            with open(path + ".tmp", "w") as f:
+                f.write("\n".join(header + tickers) + "\n")
+            os.replace(path + ".tmp", path)
+        return version, tickers
+
+    def all_tickers(self):
+        """Union of the built-in universe and the latest version of every stored universe"""
+        return normalize_universe(
+            ticker for name in self.names() for ticker in self.load(name)
+        )